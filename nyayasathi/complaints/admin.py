@@ -1,6 +1,18 @@
 from django.contrib import admin
-from .models import CustomUser, Complaint
+from .models import CustomUser, Complaint, Incident, SeverityRuleSet
 
 # Register your models here.
 admin.site.register(CustomUser)
 admin.site.register(Complaint)
+
+
+@admin.register(SeverityRuleSet)
+class SeverityRuleSetAdmin(admin.ModelAdmin):
+    list_display = ('version', 'is_active', 'word_boundary', 'created_at')
+    list_filter = ('is_active',)
+
+
+@admin.register(Incident)
+class IncidentAdmin(admin.ModelAdmin):
+    list_display = ('id', 'location', 'member_count', 'highest_threat_level', 'last_reported_at')
+    search_fields = ('location',)
@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class ComplaintsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'complaints'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+
+        from . import signals  # noqa: F401
+        from .search import ensure_search_triggers
+        post_migrate.connect(ensure_search_triggers, sender=self)
+
+        from .knowledge_base import ENABLED, load_knowledge_base
+        if ENABLED:
+            load_knowledge_base()
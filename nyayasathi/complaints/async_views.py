@@ -0,0 +1,245 @@
+"""
+ASGI-native versions of the LLM endpoints, mounted under /api/async/.
+
+Under nyayasathi/asgi.py these wait for Groq on the event loop instead of
+holding a worker thread for the whole completion, so one process can keep
+hundreds of chatbot requests in flight. Request and response bodies match
+the sync endpoints in views.py.
+"""
+import functools
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework.authtoken.models import Token
+
+from .documents import (
+    UnsupportedDocument, check_upload, content_hash, extract_document_pages, find_document, save_document
+)
+from .knowledge_base import knowledge_base_answer
+from .llm import (
+    CHATBOT_FALLBACK_ANSWER, CHATBOT_MODEL, DEFAULT_MODEL, DOCUMENT_OPTIONS, GROQ_API_KEY, LLMError, LLMUnavailable,
+    acomplete, asse_completion, asse_text, chatbot_messages, legal_chat_messages, resolve_model, sse_response,
+    stream_requested
+)
+from .resilience import unavailable_response
+from .response_cache import cache_allowed, cache_headers, lookup, scope_key, store
+from .retrieval import document_question_prompt
+from .summarization import asummary_prompt
+from .throttling import shed_when_busy, store as throttle_store, throttle_wait, throttled_response
+
+MISSING_KEY_ERROR = 'Groq API key is not configured. Please set GROQ_API_KEY in your .env file.'
+
+
+async def _authenticated_user(request):
+    """Token or session user, like the REST framework defaults"""
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Token '):
+        token = await Token.objects.select_related('user').filter(key=header[len('Token '):].strip()).afirst()
+        return token.user if token and token.user.is_active else None
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+
+def _throttle(scope):
+    """Async counterpart of the REST framework throttle_classes for the per-user and per-IP buckets"""
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            user = await _authenticated_user(request)
+            if throttle_store.blocking:
+                wait = await sync_to_async(throttle_wait)(scope, user, request)
+            else:
+                wait = throttle_wait(scope, user, request)
+            if wait:
+                return throttled_response(wait)
+            return await view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _json_body(request):
+    try:
+        return json.loads(request.body or b'{}'), None
+    except ValueError as e:
+        return None, JsonResponse({'detail': f'JSON parse error - {e}'}, status=400)
+
+
+async def _answer(request, scope, model, messages, question):
+    """Async version of views._cached_answer_response"""
+    use_cache = cache_allowed(request.GET, request.headers)
+    cached = await sync_to_async(lookup)(model, messages, scope, question) if use_cache else None
+
+    async def remember(answer):
+        if use_cache:
+            await sync_to_async(store)(model, messages, scope, question, answer)
+
+    if stream_requested(request.GET):
+        if cached is not None:
+            events = asse_text('answer', cached.answer)
+        else:
+            events = asse_completion('answer', model, messages, on_complete=remember, **DOCUMENT_OPTIONS)
+        return cache_headers(sse_response(events), cached, use_cache)
+
+    if cached is not None:
+        return cache_headers(JsonResponse({'answer': cached.answer}), cached)
+    try:
+        answer = await acomplete(model, messages, **DOCUMENT_OPTIONS)
+    except LLMUnavailable as e:
+        cached = await sync_to_async(lookup)(model, messages, scope, question) if not use_cache else None
+        if cached is not None:
+            return cache_headers(JsonResponse({'answer': cached.answer}), cached)
+        return unavailable_response(e)
+    except LLMError as e:
+        return JsonResponse({'error': f'LLM API request failed: {str(e)}'}, status=500)
+    await remember(answer)
+    return cache_headers(JsonResponse({'answer': answer}), None, use_cache)
+
+
+def _knowledge_base_response(request, question):
+    """Async counterpart of views._knowledge_base_response; the lookup itself never blocks"""
+    local = knowledge_base_answer(question)
+    if local is None:
+        return None
+    if stream_requested(request.GET):
+        response = sse_response(asse_text('answer', local.answer))
+    else:
+        response = JsonResponse({'answer': local.answer, 'sections': local.sections})
+    response['X-Answer-Source'] = 'knowledge-base'
+    return response
+
+
+@csrf_exempt
+@require_POST
+@_throttle('llm')
+@shed_when_busy
+async def chatbot(request):
+    if await _authenticated_user(request) is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+    user_message = request.POST.get('message', '')
+    document = request.FILES.get('document')
+    document_text = None
+    if document:
+        try:
+            document_text = document.read().decode('utf-8')
+        except Exception:
+            document_text = '[Could not read document. Please upload a plain text file.]'
+
+    if document_text is None:
+        local = _knowledge_base_response(request, user_message)
+        if local is not None:
+            return local
+
+    messages = chatbot_messages(user_message, document_text)
+    if stream_requested(request.GET):
+        return sse_response(asse_completion('answer', CHATBOT_MODEL, messages, fallback=CHATBOT_FALLBACK_ANSWER))
+
+    try:
+        answer = await acomplete(CHATBOT_MODEL, messages)
+    except LLMError:
+        answer = CHATBOT_FALLBACK_ANSWER
+    return JsonResponse({"answer": answer})
+
+
+@csrf_exempt
+@require_POST
+@_throttle('llm')
+@shed_when_busy
+async def summarize_legal_document(request):
+    file = request.FILES.get('file')
+    if not file:
+        return JsonResponse({'error': 'No file uploaded.'}, status=400)
+    if not GROQ_API_KEY:
+        return JsonResponse({'error': MISSING_KEY_ERROR}, status=500)
+
+    try:
+        check_upload(file)
+        # Hashing and PDF/Word parsing are CPU-bound; keep them off the event loop
+        sha256 = await sync_to_async(content_hash, thread_sensitive=False)(file)
+        document = await sync_to_async(find_document)(sha256)
+        if document is None:
+            pages = await sync_to_async(extract_document_pages, thread_sensitive=False)(file)
+            user = await _authenticated_user(request)
+            document, _ = await sync_to_async(save_document)(file, sha256, pages, user)
+    except UnsupportedDocument as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': f'Failed to extract text: {str(e)}'}, status=500)
+
+    if not any(page.strip() for page in document.pages):
+        return JsonResponse({'error': 'No text found in the document.'}, status=400)
+
+    try:
+        messages = await asummary_prompt(document.pages, DEFAULT_MODEL)
+    except LLMUnavailable as e:
+        return unavailable_response(e)
+    except LLMError as e:
+        return JsonResponse({'error': f'LLM API request failed: {str(e)}'}, status=500)
+
+    if stream_requested(request.GET):
+        response = sse_response(asse_completion('summary', DEFAULT_MODEL, messages, **DOCUMENT_OPTIONS))
+        response['X-Document-Id'] = document.sha256
+        return response
+
+    try:
+        summary = await acomplete(DEFAULT_MODEL, messages, **DOCUMENT_OPTIONS)
+    except LLMUnavailable as e:
+        return unavailable_response(e)
+    except LLMError as e:
+        return JsonResponse({'error': f'LLM API request failed: {str(e)}'}, status=500)
+    response = JsonResponse({'summary': summary, 'document_id': document.sha256})
+    response['X-Document-Id'] = document.sha256
+    return response
+
+
+@csrf_exempt
+@require_POST
+@_throttle('llm')
+@shed_when_busy
+async def ask_legal_document(request):
+    data, error = _json_body(request)
+    if error:
+        return error
+    document_id = data.get('document_id', '')
+    document_text = data.get('document_text', '')
+    question = data.get('question', '')
+    pages, context = [document_text], document_text
+    if document_id:
+        document = await sync_to_async(find_document)(str(document_id))
+        if document is None:
+            return JsonResponse({'error': 'Document not found. Please upload it again.'}, status=404)
+        document_text, pages, context = document.text, document.pages, document.sha256
+    if not document_text or not question:
+        return JsonResponse({'error': 'Both document_text (or document_id) and question are required.'}, status=400)
+    if not GROQ_API_KEY:
+        return JsonResponse({'error': MISSING_KEY_ERROR}, status=500)
+    scope = scope_key('ask_legal_document', DEFAULT_MODEL, context)
+    messages = await sync_to_async(document_question_prompt, thread_sensitive=False)(
+        pages, question, document.sha256 if document_id else None
+    )
+    return await _answer(request, scope, DEFAULT_MODEL, messages, question)
+
+
+@csrf_exempt
+@require_POST
+@_throttle('llm')
+@shed_when_busy
+async def legal_chatbot(request):
+    data, error = _json_body(request)
+    if error:
+        return error
+    question = data.get('question', '')
+    model = data.get('model', 'llama-3.1-8b-instant')
+    if not question:
+        return JsonResponse({'error': 'Question is required.'}, status=400)
+    local = _knowledge_base_response(request, question)
+    if local is not None:
+        return local
+    if not GROQ_API_KEY:
+        return JsonResponse({'error': MISSING_KEY_ERROR}, status=500)
+    model_id = resolve_model(model)
+    scope = scope_key('legal_chatbot', model_id)
+    return await _answer(request, scope, model_id, legal_chat_messages(question), question)
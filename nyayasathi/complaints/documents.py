@@ -0,0 +1,182 @@
+"""
+Text extraction and storage for uploaded legal documents.
+
+Uploads are stored once per SHA-256 of their content as a LegalDocument
+together with the extracted pages, so summarizing the same file again or
+asking follow-up questions by document_id never re-extracts it. Large
+PDFs are extracted in parallel, a range of pages per task, in a bounded
+process pool: pdfplumber is pure Python and CPU-bound, so threads would
+not help.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from multiprocessing import get_context
+
+import docx
+import pdfplumber
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+SUPPORTED_EXTENSIONS = ['.pdf', '.docx', '.doc', '.txt']
+
+EXTRACTION_WORKERS = getattr(settings, 'DOCUMENT_EXTRACTION_WORKERS', 4)
+# Smaller PDFs are extracted in the calling thread; starting tasks costs more than it saves
+PARALLEL_MIN_PAGES = getattr(settings, 'DOCUMENT_PARALLEL_MIN_PAGES', 16)
+PAGES_PER_TASK = 8
+EXTRACTION_TIMEOUT_SECONDS = getattr(settings, 'DOCUMENT_EXTRACTION_TIMEOUT_SECONDS', 300)
+MAX_UPLOAD_BYTES = getattr(settings, 'DOCUMENT_MAX_UPLOAD_BYTES', 20 * 1024 * 1024)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class UnsupportedDocument(Exception):
+    pass
+
+
+def document_extension(file):
+    ext = os.path.splitext(file.name)[1].lower()
+    if ext not in SUPPORTED_EXTENSIONS:
+        raise UnsupportedDocument('Unsupported file type.')
+    return ext
+
+
+def check_upload(file):
+    """Reject unsupported and oversized uploads before they are hashed or extracted"""
+    document_extension(file)
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise UnsupportedDocument(f'File is too large. The maximum size is {MAX_UPLOAD_BYTES // (1024 * 1024)} MB.')
+
+
+def _extract_pdf_range(path, start, stop):
+    # Runs in a pool process
+    with pdfplumber.open(path) as pdf:
+        return [pdf.pages[number].extract_text() or '' for number in range(start, stop)]
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: never fork a web worker that already runs threads
+            _pool = ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS, mp_context=get_context('spawn'))
+        return _pool
+
+
+@contextmanager
+def _local_path(file):
+    """Path of the upload on disk, copying in-memory uploads to a temporary file"""
+    if hasattr(file, 'temporary_file_path'):
+        yield file.temporary_file_path()
+        return
+    with tempfile.NamedTemporaryFile(suffix=os.path.splitext(file.name)[1]) as tmp:
+        file.seek(0)
+        shutil.copyfileobj(file, tmp)
+        tmp.flush()
+        yield tmp.name
+
+
+def _pdf_pages(file):
+    file.seek(0)
+    with pdfplumber.open(file) as pdf:
+        count = len(pdf.pages)
+        if count < PARALLEL_MIN_PAGES or EXTRACTION_WORKERS < 2:
+            return [page.extract_text() or '' for page in pdf.pages]
+    with _local_path(file) as path:
+        pool = _get_pool()
+        futures = [
+            pool.submit(_extract_pdf_range, path, start, min(start + PAGES_PER_TASK, count))
+            for start in range(0, count, PAGES_PER_TASK)
+        ]
+        return [text for future in futures for text in future.result(timeout=EXTRACTION_TIMEOUT_SECONDS)]
+
+
+def extract_document_pages(file):
+    """
+    Text of an uploaded PDF, Word or text file as a list of pages. Word
+    files have no pages and come back as one; text files are split on form
+    feeds.
+    """
+    ext = document_extension(file)
+    if ext == '.pdf':
+        return _pdf_pages(file)
+    file.seek(0)
+    if ext in ['.docx', '.doc']:
+        doc = docx.Document(file)
+        return ['\n'.join([para.text for para in doc.paragraphs])]
+    return file.read().decode('utf-8').split('\f')
+
+
+def extract_document_text(file):
+    """Plain text of an uploaded PDF, Word or text file"""
+    return '\n'.join(extract_document_pages(file))
+
+
+def content_hash(file):
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def find_document(sha256):
+    """Stored LegalDocument with this content hash, or None"""
+    from .models import LegalDocument
+
+    document = LegalDocument.objects.filter(sha256=sha256).first()
+    # Touching every use would turn reads into writes; an hour of slack is plenty for retention
+    if document is not None and document.last_used_at < timezone.now() - timedelta(hours=1):
+        document.last_used_at = timezone.now()
+        LegalDocument.objects.filter(pk=document.pk).update(last_used_at=document.last_used_at)
+    return document
+
+
+def save_document(file, sha256, pages, user=None):
+    """Store a newly extracted upload; returns the stored row if another request got there first"""
+    from .models import LegalDocument
+
+    document = LegalDocument(
+        sha256=sha256, name=file.name[:255], size=file.size or 0, pages=pages,
+        uploaded_by=user if user is not None and user.is_authenticated else None,
+        last_used_at=timezone.now()
+    )
+    document.file.save(sha256 + document_extension(file), file, save=False)
+    try:
+        with transaction.atomic():
+            document.save()
+    except IntegrityError:
+        document.file.delete(save=False)
+        return LegalDocument.objects.get(sha256=sha256), False
+    return document, True
+
+
+def store_document(file, user=None):
+    """(LegalDocument, created) for an upload, extracting its text only the first time the content is seen"""
+    check_upload(file)
+    sha256 = content_hash(file)
+    document = find_document(sha256)
+    if document is not None:
+        return document, False
+    return save_document(file, sha256, extract_document_pages(file), user)
+
+
+def purge_documents(days):
+    """Delete documents, and their files, not used for the given number of days"""
+    from .models import LegalDocument
+
+    stale = LegalDocument.objects.filter(last_used_at__lt=timezone.now() - timedelta(days=days))
+    purged = 0
+    for document in stale.iterator():
+        document.file.delete(save=False)
+        document.delete()
+        purged += 1
+    return purged
@@ -0,0 +1,262 @@
+"""
+Asynchronous complaint ingestion.
+
+In async mode the views save the raw Complaint right away together with a
+ProcessingJob row and return 202. A pool of worker threads claims queued
+jobs from that table (no external broker) and runs the
+transcribe -> detect -> translate -> dedupe -> analyze stages, recording the
+current stage so clients can poll for progress.
+
+A complaint rejected as a duplicate, or failing every attempt, is kept with
+status 'failed' rather than deleted: its job (and the reason, in the job's
+error and result) must stay pollable by complaint id. The sync views reject
+duplicates before saving anything, so complaint lists leave 'failed' rows
+out unless ?status=failed is asked for.
+"""
+import os
+import threading
+from datetime import timedelta
+
+import langid
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import ProcessingJob
+from .throttling import UpstreamBusy
+from .transcription import TranscriptionUnavailable, transcribe
+from .translation import translate_text
+from .utils import (
+    analyze_complaint_severity, check_similar_complaints, detect_language, translate_to_english
+)
+
+WORKERS = getattr(settings, 'INGESTION_WORKERS', 2)
+LEASE_SECONDS = getattr(settings, 'INGESTION_JOB_LEASE_SECONDS', 300)
+MAX_ATTEMPTS = getattr(settings, 'INGESTION_MAX_ATTEMPTS', 3)
+POLL_SECONDS = getattr(settings, 'INGESTION_POLL_SECONDS', 5)
+
+AUDIO_STAGES = ['transcribe', 'detect', 'translate', 'dedupe', 'analyze']
+TEXT_STAGES = ['detect', 'translate', 'dedupe', 'analyze']
+
+
+def async_ingestion_requested(request):
+    """True when the client asked for async ingestion or it is the configured default"""
+    flag = request.query_params.get('async', request.data.get('async'))
+    if flag is not None:
+        return str(flag).lower() in ['1', 'true', 'yes']
+    return getattr(settings, 'COMPLAINT_INGESTION_MODE', 'sync') == 'async'
+
+
+def duplicate_error_data(existing_complaint, similarity_score):
+    return {
+        "error": f"A similar complaint has already been submitted (similarity: {similarity_score:.1%}). Please check your existing complaints or wait before submitting again.",
+        "duplicate_complaint_id": existing_complaint.id,
+        "similarity_score": similarity_score
+    }
+
+
+def enqueue_complaint(complaint, delay_seconds=None):
+    """
+    Create the processing job for a freshly saved raw complaint and wake the
+    workers; with delay_seconds the job is not claimed before then.
+    """
+    not_before = timezone.now() + timedelta(seconds=delay_seconds) if delay_seconds else None
+    job = ProcessingJob.objects.create(complaint=complaint, locked_until=not_before)
+    worker_pool.start()
+    worker_pool.wake()
+    return job
+
+
+def job_status_data(job):
+    stages = AUDIO_STAGES if job.complaint.complaint_type == 'audio' else TEXT_STAGES
+    if job.state == ProcessingJob.STATE_DONE:
+        progress = 100
+    elif job.stage in stages:
+        progress = int(100 * stages.index(job.stage) / len(stages))
+    else:
+        progress = 0
+    return {
+        'job_id': job.id,
+        'complaint_id': job.complaint_id,
+        'state': job.state,
+        'stage': job.stage,
+        'stages': stages,
+        'progress': progress,
+        'attempts': job.attempts,
+        'error': job.error,
+        'result': job.result,
+        'created_at': job.created_at,
+        'updated_at': job.updated_at,
+    }
+
+
+def claim_next_job():
+    """
+    Atomically claim the oldest queued job, or a running job whose lease
+    expired (its worker died). The conditional UPDATE makes the claim safe
+    across threads and processes.
+    """
+    now = timezone.now()
+    # locked_until of a queued job is the time it was deferred to, if any
+    claimable = (
+        Q(state=ProcessingJob.STATE_QUEUED) & (Q(locked_until__isnull=True) | Q(locked_until__lt=now))
+    ) | Q(state=ProcessingJob.STATE_RUNNING, locked_until__lt=now)
+    candidate_ids = list(
+        ProcessingJob.objects.filter(claimable).order_by('created_at').values_list('id', flat=True)[:5]
+    )
+    for job_id in candidate_ids:
+        claimed = ProcessingJob.objects.filter(claimable, id=job_id).update(
+            state=ProcessingJob.STATE_RUNNING,
+            locked_until=now + timedelta(seconds=LEASE_SECONDS),
+            attempts=F('attempts') + 1,
+            updated_at=now
+        )
+        if claimed:
+            return ProcessingJob.objects.select_related('complaint', 'complaint__user').get(id=job_id)
+    return None
+
+
+def _advance(job, stage):
+    job.stage = stage
+    job.locked_until = timezone.now() + timedelta(seconds=LEASE_SECONDS)
+    job.save(update_fields=['stage', 'locked_until', 'updated_at'])
+
+
+def _finish(job, state, result=None, error=''):
+    job.state = state
+    job.result = result or {}
+    job.error = error
+    job.locked_until = None
+    if state == ProcessingJob.STATE_DONE:
+        job.stage = 'done'
+    job.save(update_fields=['state', 'stage', 'result', 'error', 'locked_until', 'updated_at'])
+
+
+def run_job(job):
+    """Run every ingestion stage for a claimed job"""
+    complaint = job.complaint
+    try:
+        if complaint.complaint_type == 'audio':
+            _advance(job, 'transcribe')
+            with complaint.audio_file.open('rb') as audio:
+                transcript = transcribe(os.path.basename(complaint.audio_file.name), audio)
+            complaint.original_content = transcript
+
+            _advance(job, 'detect')
+            lang, _ = langid.classify(transcript)
+
+            _advance(job, 'translate')
+            translated = transcript
+            if lang != 'en':
+                translated = translate_text(transcript, source='auto', target='en')
+        else:
+            _advance(job, 'detect')
+            lang = detect_language(complaint.original_content)
+
+            _advance(job, 'translate')
+            translated = translate_to_english(complaint.original_content, lang)
+
+        _advance(job, 'dedupe')
+        existing_complaint, similarity_score = check_similar_complaints(
+            complaint.user, translated, time_window_hours=24, similarity_threshold=0.8,
+            exclude_id=complaint.id
+        )
+        if existing_complaint:
+            complaint.status = 'failed'
+            complaint.save(update_fields=['status', 'original_content', 'updated_at'])
+            data = duplicate_error_data(existing_complaint, similarity_score)
+            _finish(job, ProcessingJob.STATE_FAILED, result=data, error=data['error'])
+            return
+
+        _advance(job, 'analyze')
+        analysis = analyze_complaint_severity(translated)
+
+        complaint.language = lang
+        complaint.content = translated
+        complaint.emotion = analysis['emotion']
+        complaint.priority = analysis['priority']
+        complaint.threat_level = analysis['threat_level']
+        complaint.risk_factors = analysis['risk_factors']
+        complaint.requires_immediate_attention = analysis['requires_immediate_attention']
+        complaint.rule_version = analysis['rule_version']
+        complaint.save()
+
+        _finish(job, ProcessingJob.STATE_DONE, result={
+            'complaint_id': complaint.id,
+            'language': lang,
+            'original_content': complaint.original_content,
+            'content': translated,
+            'emotion': analysis['emotion'],
+            'priority': analysis['priority'],
+            'threat_level': analysis['threat_level'],
+            'risk_factors': analysis['risk_factors'],
+            'exact_keywords': analysis['exact_keywords'],
+            'requires_immediate_attention': analysis['requires_immediate_attention'],
+        })
+    except (TranscriptionUnavailable, UpstreamBusy) as e:
+        # Groq is known to be down or busy: try again later without spending an attempt
+        job.state = ProcessingJob.STATE_QUEUED
+        job.attempts -= 1
+        job.error = str(e)
+        job.locked_until = timezone.now() + timedelta(seconds=e.retry_after)
+        job.save(update_fields=['state', 'attempts', 'error', 'locked_until', 'updated_at'])
+    except Exception as e:
+        if job.attempts < MAX_ATTEMPTS:
+            # Leave it for another attempt
+            job.state = ProcessingJob.STATE_QUEUED
+            job.error = str(e)
+            job.locked_until = None
+            job.save(update_fields=['state', 'error', 'locked_until', 'updated_at'])
+            return
+        complaint.status = 'failed'
+        complaint.save(update_fields=['status', 'updated_at'])
+        _finish(job, ProcessingJob.STATE_FAILED, error=str(e))
+
+
+class IngestionWorkerPool:
+    """Daemon threads that drain the ProcessingJob table"""
+
+    def __init__(self, size=WORKERS):
+        self.size = size
+        self._threads = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.size):
+                thread = threading.Thread(target=self._loop, name=f'ingestion-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def wake(self):
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def run_pending(self):
+        """Process jobs until the queue is empty; returns the number processed"""
+        processed = 0
+        while True:
+            job = claim_next_job()
+            if job is None:
+                return processed
+            run_job(job)
+            processed += 1
+
+    def _loop(self):
+        while True:
+            close_old_connections()
+            try:
+                processed = self.run_pending()
+            except Exception as e:
+                print(f"Ingestion worker error: {e}")
+                processed = 0
+            if not processed:
+                with self._wakeup:
+                    self._wakeup.wait(POLL_SECONDS)
+
+
+worker_pool = IngestionWorkerPool()
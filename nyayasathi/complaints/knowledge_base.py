@@ -0,0 +1,254 @@
+"""
+Local answers to common IPC/BNS questions.
+
+data/legal_sections.json bundles the most used sections of the Indian
+Penal Code with their Bharatiya Nyaya Sanhita equivalents, punishments and
+the words people use for the offences. It is loaded once per process into
+plain dicts and tuples: section numbers map to sections, and the first word
+of every keyword phrase maps to the phrases starting with it, so a question
+is answered with one pass over its words.
+
+Two kinds of questions are answered without the LLM:
+
+* direct lookups such as "What is IPC 420?" or "BNS section 103";
+* offence queries such as "Which section covers theft?", where the
+  longest matching keyword phrases point to exactly one section.
+
+Anything else - several sections, words the index cannot account for,
+another statute ("CrPC", "IT Act", ...) or requests for advice ("bail",
+"FIR", ...) - goes to the LLM as before.
+"""
+import json
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+from .llm import gateway
+from .signatures import normalize_text
+
+ENABLED = getattr(settings, 'KNOWLEDGE_BASE_ENABLED', True)
+PATH = getattr(
+    settings, 'KNOWLEDGE_BASE_PATH', os.path.join(os.path.dirname(__file__), 'data', 'legal_sections.json')
+)
+# Words of a question that neither the keywords nor FILLER_WORDS explain; more means not confident
+MAX_UNMATCHED_WORDS = getattr(settings, 'KNOWLEDGE_BASE_MAX_UNMATCHED_WORDS', 1)
+
+# Dropped from questions and keyword phrases alike, so "attempt to murder" matches "attempt murder"
+CONNECTORS = {
+    'a', 'an', 'the', 'of', 'to', 'by', 'with', 'in', 'on', 'at', 'from', 'and', 'for', 'my', 'his', 'her',
+    'their', 'our', 'is', 'are', 'was', 'were', 'be', 'been', 'has', 'have', 'had',
+}
+# Words that say the question is about the law rather than about someone's situation
+CUE_WORDS = {
+    'section', 'sec', 'ipc', 'bns', 'punishment', 'punishable', 'penalty', 'sentence', 'law', 'offence',
+    'offense', 'crime', 'charge', 'charged', 'cover', 'covers', 'deal', 'deals', 'define', 'definition',
+    'meaning', 'dhara',
+}
+FILLER_WORDS = CUE_WORDS | {
+    'what', 'whats', 'which', 'under', 'me', 'tell', 'about', 'explain', 'describe', 'mean', 'means', 'does',
+    'do', 'say', 'says', 'indian', 'penal', 'code', 'bharatiya', 'nyaya', 'sanhita', 'applies', 'apply',
+    'applicable', 'please', 'kindly', 'i', 'want', 'know', 'can', 'you', 'give', 'detail', 'details', 's', 'u',
+    'or', 'how', 'much', 'long', 'jail', 'imprisonment', 'fine', 'new', 'old', 'equivalent', 'corresponding',
+    'number', 'it', 'this', 'that', 'kya', 'hai', 'h', 'ki', 'ka', 'ke', 'saza', 'sazaa', 'exactly',
+}
+# Questions asking for advice or procedure need the LLM even when they name a section
+ADVICE_WORDS = {
+    'bail', 'bailable', 'anticipatory', 'fir', 'lawyer', 'advocate', 'procedure', 'court', 'appeal',
+    'compoundable', 'cognizable', 'cognisable', 'should', 'help', 'difference', 'between', 'versus', 'vs',
+    'compare',
+}
+# Other statutes: their section numbers are not IPC/BNS sections, so "section 302 CrPC" is not murder.
+# Only counted outside keyword phrases, so "obscene act" is still IPC 294
+OTHER_STATUTE_WORDS = {
+    'crpc', 'bnss', 'cpc', 'bsa', 'evidence', 'act', 'acts', 'adhiniyam', 'nagarik', 'suraksha', 'sakshya',
+    'constitution', 'article', 'schedule', 'rule', 'order', 'pocso', 'ndps', 'uapa', 'mva', 'motor', 'arms',
+    'information', 'technology',
+}
+SECTION_REFERENCE = re.compile(
+    r'\b(?:ipc|bns|section|sec|dhara|u s)\s+(\d{1,3}[a-z]?)\b|\b(\d{1,3}[a-z]?)\s+(?:ipc|bns)\b'
+)
+# Any section-like number, whether or not a keyword precedes it ("section 302 and 307")
+SECTION_NUMBER = re.compile(r'\b\d{1,3}[a-z]?\b')
+# Sub-sections such as the "(2)" of "BNS 303(2)"; dropped so they do not count as another section
+SUBSECTION = re.compile(r'\(\s*(?:\d{1,2}|[a-z])\s*\)')
+BNS_NOTE = (
+    "Offences committed on or after 1 July 2024 are tried under the Bharatiya Nyaya Sanhita (BNS), 2023, "
+    "which may prescribe a different punishment. This is general information, not legal advice."
+)
+
+KnowledgeBaseAnswer = namedtuple('KnowledgeBaseAnswer', ['answer', 'match', 'sections'])
+
+_knowledge_base = None
+_load_lock = threading.Lock()
+_stats = {'lookups': 0, 'section_hits': 0, 'keyword_hits': 0, 'misses': 0, 'lookup_us': 0.0}
+_stats_lock = threading.Lock()
+
+
+def _stem(word):
+    # Enough to match "threats" with "threat"; the same is done to keywords and questions
+    if len(word) > 4 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def _words(text):
+    return [_stem(word) for word in normalize_text(text).split()]
+
+
+def _section_key(number):
+    return number.upper()
+
+
+class KnowledgeBase:
+    def __init__(self, sections):
+        self.sections = tuple(sections)
+        self.by_ipc = {_section_key(section['ipc']): index for index, section in enumerate(self.sections)}
+        by_bns = {}
+        for index, section in enumerate(self.sections):
+            # "303(2)" is found by "BNS 303"
+            by_bns.setdefault(_section_key(section['bns'].split('(')[0]), []).append(index)
+        self.by_bns = {number: tuple(indexes) for number, indexes in by_bns.items()}
+
+        phrases = {}
+        for index, section in enumerate(self.sections):
+            for keyword in section['keywords']:
+                words = tuple(word for word in _words(keyword) if word not in CONNECTORS)
+                if words:
+                    phrases.setdefault(words[0], {}).setdefault(words, set()).add(index)
+        # Longest phrases first, so "grievous hurt by dangerous weapon" wins over "grievous hurt"
+        self.phrases = {
+            first: tuple(sorted(((words, tuple(sorted(indexes))) for words, indexes in by_phrase.items()),
+                                key=lambda item: -len(item[0])))
+            for first, by_phrase in phrases.items()
+        }
+
+    @classmethod
+    def load(cls, path=PATH):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f)['sections'])
+
+    def _referenced(self, normalized, words):
+        numbers = {_section_key(a or b) for a, b in SECTION_REFERENCE.findall(normalized)}
+        # "section 302 and 307" names two sections even though only 302 follows a keyword
+        if len(numbers) != 1 or len(set(SECTION_NUMBER.findall(normalized))) > 1:
+            return None
+        number = numbers.pop()
+        if ('bns' in words or 'sanhita' in words) and 'ipc' not in words:
+            return self.by_bns.get(number)
+        index = self.by_ipc.get(number)
+        return None if index is None else (index,)
+
+    def _keyword_matches(self, words):
+        """Sections hit by the longest keyword phrases in words, with their scores, and the words left over"""
+        scores, unmatched, position = {}, [], 0
+        while position < len(words):
+            for phrase, indexes in self.phrases.get(words[position], ()):
+                if tuple(words[position:position + len(phrase)]) == phrase:
+                    for index in indexes:
+                        scores[index] = scores.get(index, 0) + len(phrase)
+                    position += len(phrase)
+                    break
+            else:
+                unmatched.append(words[position])
+                position += 1
+        return scores, unmatched
+
+    def match(self, question):
+        """(match, section indexes) when the question can be answered locally, otherwise None"""
+        normalized = normalize_text(SUBSECTION.sub(' ', question))
+        words = [word for word in _words(normalized) if word not in CONNECTORS]
+        if not words or ADVICE_WORDS.intersection(words):
+            return None
+        scores, unmatched = self._keyword_matches(words)
+        if OTHER_STATUTE_WORDS.intersection(unmatched):
+            return None
+
+        referenced = self._referenced(normalized, words)
+        if referenced:
+            unexplained = [word for word in words if word not in FILLER_WORDS and not word[:1].isdigit()]
+            if len(unexplained) <= MAX_UNMATCHED_WORDS:
+                return 'section', referenced
+            return None
+        if any(word[:1].isdigit() for word in words) or not CUE_WORDS.intersection(words):
+            return None
+
+        if not scores or len([word for word in unmatched if word not in FILLER_WORDS]) > MAX_UNMATCHED_WORDS:
+            return None
+        ranked = sorted(scores.items(), key=lambda item: -item[1])
+        if len(ranked) > 1 and ranked[0][1] == ranked[1][1]:
+            return None
+        return 'keyword', (ranked[0][0],)
+
+    def describe(self, indexes):
+        parts = []
+        for index in indexes:
+            section = self.sections[index]
+            parts.append(
+                f"IPC Section {section['ipc']} - {section['title']} "
+                f"(Bharatiya Nyaya Sanhita Section {section['bns']})\n"
+                f"{section['description']}\n"
+                f"Punishment under the IPC: {section['punishment']}"
+            )
+        return '\n\n'.join(parts + [BNS_NOTE])
+
+
+def load_knowledge_base():
+    """Load the bundled sections once per process; called from AppConfig.ready"""
+    global _knowledge_base
+    with _load_lock:
+        if _knowledge_base is None:
+            _knowledge_base = KnowledgeBase.load()
+        return _knowledge_base
+
+
+def _count(name, elapsed):
+    with _stats_lock:
+        _stats['lookups'] += 1
+        _stats[name] += 1
+        _stats['lookup_us'] += elapsed * 1e6
+
+
+def knowledge_base_answer(question):
+    """KnowledgeBaseAnswer when the bundled sections answer the question confidently, otherwise None"""
+    if not ENABLED or not question:
+        return None
+    started = time.perf_counter()
+    knowledge_base = load_knowledge_base()
+    matched = knowledge_base.match(question)
+    if matched is None:
+        _count('misses', time.perf_counter() - started)
+        return None
+    match, indexes = matched
+    answer = KnowledgeBaseAnswer(
+        knowledge_base.describe(indexes), match, [knowledge_base.sections[index]['ipc'] for index in indexes]
+    )
+    _count(f'{match}_hits', time.perf_counter() - started)
+    return answer
+
+
+def knowledge_base_stats():
+    """
+    Lookup counters of this process. Latency saved is estimated as the hits
+    times the average latency of the LLM calls made by this process.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    hits = stats['section_hits'] + stats['keyword_hits']
+    stats['hit_rate'] = hits / stats['lookups'] if stats['lookups'] else 0.0
+    stats['avg_lookup_us'] = round(stats.pop('lookup_us') / stats['lookups'], 1) if stats['lookups'] else 0.0
+
+    calls = total_ms = 0
+    for model in gateway.metrics()['models'].values():
+        latency = model['latency_ms']
+        if latency['window']:
+            calls += latency['window']
+            total_ms += latency['avg'] * latency['window']
+    llm_avg_ms = total_ms / calls if calls else 0.0
+    stats['llm_avg_latency_ms'] = round(llm_avg_ms, 1)
+    stats['estimated_latency_saved_ms'] = round(hits * max(llm_avg_ms - stats['avg_lookup_us'] / 1000, 0), 1)
+    stats['sections'] = len(_knowledge_base.sections) if _knowledge_base is not None else 0
+    return stats
@@ -0,0 +1,268 @@
+"""
+In-process publish/subscribe for live complaint updates.
+
+Complaint saves publish a small event (after the transaction commits) to
+every subscriber in this process; each server-sent-events connection to
+/api/complaints/events/ subscribes one asyncio queue.
+
+Under ASGI, nyayasathi/asgi.py hands that path to EventStreamRouter before
+Django's request handler: Django's middleware stack parks a thread per
+request for as long as the response streams, which would mean one idle
+thread per subscriber. The complaint_events view serves the same stream
+under WSGI (runserver) for development. There is no broker: a
+subscriber only sees saves made by the process it is connected to, so run
+the ingestion workers inside the ASGI server (the default) rather than as
+a separate run_ingestion_worker process when live updates matter.
+
+Publishing hands each event to every event loop once with
+call_soon_threadsafe and fans it out inside the loop, so idle subscribers
+cost a queue and a suspended coroutine each and no thread.
+"""
+import asyncio
+import contextlib
+import itertools
+import json
+import threading
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from collections import deque
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+
+HEARTBEAT_SECONDS = getattr(settings, 'LIVE_EVENTS_HEARTBEAT_SECONDS', 15)
+QUEUE_SIZE = getattr(settings, 'LIVE_EVENTS_QUEUE_SIZE', 100)
+REPLAY_SIZE = getattr(settings, 'LIVE_EVENTS_REPLAY_SIZE', 500)
+EVENT_FIELDS = [
+    'status', 'priority', 'threat_level', 'requires_immediate_attention', 'location', 'language',
+    'complaint_type', 'incident_id', 'claimed_by_id', 'submitted_at', 'updated_at',
+]
+FILTER_FIELDS = ['threat_level', 'priority', 'status']
+
+
+def event_matches(event, filters):
+    """filters maps a field to the set of accepted values"""
+    return all(event['data'].get(field) in values for field, values in filters.items())
+
+
+class Subscription:
+    def __init__(self, loop, filters):
+        self.loop = loop
+        self.filters = filters
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.dropped = 0
+
+    def deliver(self, event):
+        if not event_matches(event, self.filters):
+            return
+        if self.queue.full():
+            # A stalled client loses its oldest events rather than growing without bound
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+
+class EventBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._ids = itertools.count(1)
+        self._recent = deque(maxlen=REPLAY_SIZE)
+
+    def subscribe(self, filters):
+        """Must be called from the event loop that will read the subscription's queue"""
+        subscription = Subscription(asyncio.get_running_loop(), filters)
+        with self._lock:
+            self._subscribers.setdefault(subscription.loop, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.loop)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.loop]
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, name, data):
+        """Send an event to every subscriber; safe to call from any thread"""
+        with self._lock:
+            event = {'id': next(self._ids), 'event': name, 'data': data}
+            self._recent.append(event)
+            loops = list(self._subscribers)
+        for loop in loops:
+            try:
+                loop.call_soon_threadsafe(self._fan_out, loop, event)
+            except RuntimeError:
+                # Loop closed while subscribers were still registered
+                with self._lock:
+                    self._subscribers.pop(loop, None)
+        return event
+
+    def _fan_out(self, loop, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(loop, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+    def replay(self, after_id, filters):
+        """Recent events newer than after_id, for clients reconnecting with Last-Event-ID"""
+        with self._lock:
+            recent = list(self._recent)
+        return [event for event in recent if event['id'] > after_id and event_matches(event, filters)]
+
+
+broker = EventBroker()
+
+
+def complaint_event_data(complaint):
+    # Only fields already loaded; a deferred field would cost a query per save
+    data = {'id': complaint.pk}
+    for field in EVENT_FIELDS:
+        if field in complaint.__dict__:
+            value = complaint.__dict__[field]
+            data[field] = value.isoformat() if hasattr(value, 'isoformat') else value
+    return data
+
+
+def publish_complaint(complaint, created):
+    """Publish the complaint's current state once the surrounding transaction commits"""
+    name = 'complaint.created' if created else 'complaint.updated'
+    data = complaint_event_data(complaint)
+    transaction.on_commit(lambda: broker.publish(name, data))
+
+
+def format_event(event):
+    data = json.dumps(event['data'], cls=DjangoJSONEncoder)
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {data}\n\n"
+
+
+async def event_stream(filters, last_event_id=None):
+    """
+    Server-sent events for one client: events missed since last_event_id,
+    then live events, with a comment line every HEARTBEAT_SECONDS so
+    proxies keep the idle connection open.
+    """
+    subscription = broker.subscribe(filters)
+    try:
+        yield "retry: 5000\n\n"
+        if last_event_id is not None:
+            for event in broker.replay(last_event_id, filters):
+                yield format_event(event)
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_event(event)
+    finally:
+        # Also runs when the server cancels the stream because the client went away
+        broker.unsubscribe(subscription)
+
+
+def stream_options(params, headers):
+    """
+    Token key, filters and Last-Event-ID from query params and headers
+    (both plain dicts of strings). EventSource cannot send headers, so the
+    token may also come as ?token=.
+    """
+    key = params.get('token')
+    authorization = headers.get('authorization', '')
+    if authorization.startswith('Token '):
+        key = authorization[len('Token '):].strip()
+    filters = {field: set(params[field].split(',')) for field in FILTER_FIELDS if params.get(field)}
+    last_event_id = headers.get('last-event-id') or params.get('last_event_id')
+    last_event_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    return key, filters, last_event_id
+
+
+def _stream_user(key):
+    from rest_framework.authtoken.models import Token
+    try:
+        token = Token.objects.select_related('user').filter(key=key).first() if key else None
+        return token.user if token and token.user.is_active else None
+    finally:
+        # The stream can stay open for hours; do not hold a database connection for it
+        connections.close_all()
+
+
+async def authorize_stream(key):
+    """(status, error) for a token key; status 200 means the caller may subscribe"""
+    # Not thread-sensitive, so no thread stays reserved for the connection
+    user = await sync_to_async(_stream_user, thread_sensitive=False)(key)
+    if user is None:
+        return 401, 'Authentication credentials were not provided.'
+    if user.user_type != 'cop':
+        return 403, 'Only cops can subscribe to complaint events'
+    return 200, None
+
+
+STREAM_HEADERS = [
+    (b'content-type', b'text/event-stream'),
+    (b'cache-control', b'no-cache'),
+    (b'x-accel-buffering', b'no'),
+]
+
+
+class EventStreamRouter:
+    """ASGI app serving the event stream path itself and passing everything else to Django"""
+    path = '/api/complaints/events/'
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] != self.path:
+            return await self.application(scope, receive, send)
+
+        params = {name: values[-1] for name, values in parse_qs(scope['query_string'].decode('latin-1')).items()}
+        headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+        key, filters, last_event_id = stream_options(params, headers)
+        cors_headers = []
+        if getattr(settings, 'CORS_ALLOW_ALL_ORIGINS', False) and 'origin' in headers:
+            cors_headers.append((b'access-control-allow-origin', b'*'))
+
+        status, error = await authorize_stream(key)
+        if error:
+            body = json.dumps({'error': error}).encode('utf-8')
+            await send({
+                'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json')] + cors_headers
+            })
+            await send({'type': 'http.response.body', 'body': body})
+            return
+
+        await send({'type': 'http.response.start', 'status': 200, 'headers': STREAM_HEADERS + cors_headers})
+        stream = event_stream(filters, last_event_id)
+        disconnected = asyncio.ensure_future(self._wait_for_disconnect(receive))
+        chunk = None
+        try:
+            while True:
+                chunk = asyncio.ensure_future(stream.__anext__())
+                await asyncio.wait([chunk, disconnected], return_when=asyncio.FIRST_COMPLETED)
+                if disconnected.done():
+                    break
+                await send({'type': 'http.response.body', 'body': chunk.result().encode('utf-8'), 'more_body': True})
+        except OSError:
+            # Client went away while we were writing
+            pass
+        finally:
+            disconnected.cancel()
+            if chunk is not None and not chunk.done():
+                # The generator is still running inside chunk; let it unwind (and unsubscribe)
+                # first, as closing a running async generator raises RuntimeError
+                chunk.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await chunk
+            await stream.aclose()
+
+    async def _wait_for_disconnect(self, receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
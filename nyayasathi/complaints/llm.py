@@ -0,0 +1,532 @@
+"""
+Prompts and the gateway for every call to the Groq API.
+
+The sync views, the ASGI-native views in async_views.py and the Groq
+transcription backend all go through LLMGateway: one keep-alive pooled
+httpx.Client per process (one AsyncClient per event loop for async
+callers), timeouts, retries with jittered backoff, circuit breakers (see
+resilience.py), the per-upstream concurrency cap of throttling.py and per-model latency/error metrics
+served at /api/llm/metrics/.
+
+With ?stream=1 the endpoints relay the completion as server-sent events
+while Groq generates it: one "token" event per delta, then a "done" event
+carrying the full text under the endpoint's usual JSON key, or an "error"
+event.
+"""
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+import httpx
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .resilience import circuit_breaker, percentile
+from .throttling import UPSTREAM_CONCURRENCY, UpstreamBusy, hold_upstream
+
+GROQ_API_KEY = os.environ.get('GROQ_API_KEY', '')
+GROQ_API_URL = getattr(settings, 'GROQ_API_URL', 'https://api.groq.com/openai/v1/chat/completions')
+GROQ_TRANSCRIPTION_URL = getattr(
+    settings, 'GROQ_TRANSCRIPTION_URL', 'https://api.groq.com/openai/v1/audio/transcriptions'
+)
+
+TIMEOUT_SECONDS = getattr(settings, 'LLM_TIMEOUT_SECONDS', 60)
+CONNECT_TIMEOUT_SECONDS = getattr(settings, 'LLM_CONNECT_TIMEOUT_SECONDS', 5)
+MAX_CONNECTIONS = getattr(settings, 'LLM_MAX_CONNECTIONS', 100)
+MAX_RETRIES = getattr(settings, 'LLM_MAX_RETRIES', 2)
+RETRY_BACKOFF_SECONDS = getattr(settings, 'LLM_RETRY_BACKOFF_SECONDS', 0.5)
+RETRY_MAX_BACKOFF_SECONDS = getattr(settings, 'LLM_RETRY_MAX_BACKOFF_SECONDS', 8)
+METRICS_WINDOW = getattr(settings, 'LLM_METRICS_WINDOW', 500)
+# Completions slower than this count as failures for the circuit breaker
+SLOW_CALL_SECONDS = getattr(settings, 'LLM_SLOW_CALL_SECONDS', 20)
+
+# Worth another attempt: timeouts, rate limiting and server errors
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+DEFAULT_MODEL = 'llama-3.1-8b-instant'
+CHATBOT_MODEL = 'llama-3-70b-8192'
+# Supported models for Groq
+SUPPORTED_MODELS = [
+    'llama-3.1-8b-instant',
+    'llama-3-8b-8192',
+    'llama-3-70b-8192',
+    'llama-3.3-70b-versatile',
+    'gpt-3.5-turbo',
+    'deepseek-chat',
+]
+# Map friendly names to Groq model IDs if needed
+MODEL_ALIASES = {
+    'llama': 'llama-3.1-8b-instant',
+    'chatgpt': 'gpt-3.5-turbo',
+    'deepseek': 'deepseek-chat',
+}
+# Sampling options of the document and legal chatbot endpoints
+DOCUMENT_OPTIONS = {'temperature': 0.7, 'max_completion_tokens': 512, 'top_p': 1}
+# Partial summaries of large documents are kept shorter so many fit in the final prompt
+CHUNK_SUMMARY_OPTIONS = {'temperature': 0.3, 'max_completion_tokens': 384, 'top_p': 1}
+
+CHATBOT_CONTEXT = (
+    "You are a legal assistant for Nyayasathi. "
+    "Help users with legal questions, complaint submission, status tracking, and provide IPC-based solutions. "
+    "If a legal document is provided, summarize it and suggest solutions as per the Indian Penal Code (IPC). "
+    "If the user wants to submit a complaint or check status, guide them and ask for required details."
+)
+CHATBOT_FALLBACK_ANSWER = "Sorry, I couldn't process your request. Please try again."
+
+
+class LLMError(Exception):
+    pass
+
+
+class LLMUnavailable(LLMError):
+    """Raised without calling Groq while its circuit breaker is open"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def resolve_model(model):
+    model_id = MODEL_ALIASES.get((model or '').lower(), model)
+    return model_id if model_id in SUPPORTED_MODELS else DEFAULT_MODEL
+
+
+def chatbot_messages(user_message, document_text=None):
+    if document_text is not None:
+        user_message += f"\n\nHere is a legal document. Summarize it and suggest solutions as per IPC:\n{document_text}"
+    return [
+        {"role": "system", "content": CHATBOT_CONTEXT},
+        {"role": "user", "content": user_message}
+    ]
+
+
+def summary_messages(text):
+    prompt = f"Summarize the following legal document and extract key information such as parties involved, dates, case numbers, and main issues.\n\nDocument:\n{text}"
+    return [{"role": "user", "content": prompt}]
+
+
+def chunk_summary_messages(text, part, parts):
+    prompt = f"Summarize part {part} of {parts} of a legal document. Keep the parties involved, dates, case numbers, sections of law and main issues mentioned in this part.\n\nPart {part}:\n{text}"
+    return [{"role": "user", "content": prompt}]
+
+
+def merge_summaries_messages(summaries):
+    joined = '\n\n'.join(summaries)
+    prompt = f"The following are summaries of consecutive parts of one legal document. Merge them into one summary, keeping the parties involved, dates, case numbers, sections of law and main issues.\n\nSummaries:\n{joined}"
+    return [{"role": "user", "content": prompt}]
+
+
+def combined_summary_messages(summaries):
+    joined = '\n\n'.join(f"Part {number}:\n{summary}" for number, summary in enumerate(summaries, 1))
+    prompt = f"The following are summaries of consecutive parts of one legal document. Combine them into a single summary of the whole document and extract key information such as parties involved, dates, case numbers, and main issues.\n\nPart summaries:\n{joined}"
+    return [{"role": "user", "content": prompt}]
+
+
+def document_question_messages(document_text, question):
+    prompt = f"Given the following legal document, answer the user's question as accurately as possible.\n\nDocument:\n{document_text}\n\nQuestion: {question}\n\nAnswer:"
+    return [{"role": "user", "content": prompt}]
+
+
+def document_excerpts_question_messages(excerpts, parts, question):
+    joined = '\n\n'.join(f"Excerpt (part {part} of {parts}):\n{text}" for part, text in excerpts)
+    prompt = f"Given the following excerpts of a legal document, answer the user's question as accurately as possible. If the excerpts do not contain the answer, say so.\n\nExcerpts:\n{joined}\n\nQuestion: {question}\n\nAnswer:"
+    return [{"role": "user", "content": prompt}]
+
+
+def legal_chat_messages(question):
+    prompt = f"You are a helpful legal assistant. Answer the user's question as accurately as possible.\n\nQuestion: {question}\n\nAnswer:"
+    return [{"role": "user", "content": prompt}]
+
+
+def completion_payload(model, messages, **options):
+    return {"model": model, "messages": messages, **options}
+
+
+def completion_text(data):
+    try:
+        return data['choices'][0]['message']['content']
+    except (KeyError, IndexError, TypeError):
+        raise LLMError(f"Unexpected completion response: {str(data)[:200]}")
+
+
+def stream_requested(params):
+    return str(params.get('stream', '')).lower() in ['1', 'true', 'yes']
+
+
+# Marks the end of a streamed completion
+STREAM_DONE = object()
+
+
+def stream_line_delta(line):
+    """Text delta of one line of a streamed (SSE) completion, None or STREAM_DONE"""
+    if not line.startswith('data:'):
+        return None
+    data = line[len('data:'):].strip()
+    if data == '[DONE]':
+        return STREAM_DONE
+    try:
+        return json.loads(data)['choices'][0].get('delta', {}).get('content')
+    except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+        raise LLMError(f"Unexpected stream chunk: {data[:200]}")
+
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def sse_response(events):
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+chat_circuit = circuit_breaker('groq', timeout_seconds=TIMEOUT_SECONDS, slow_call_seconds=SLOW_CALL_SECONDS)
+transcription_circuit = circuit_breaker('groq-transcription', timeout_seconds=TIMEOUT_SECONDS)
+
+
+class ModelMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.in_flight = 0
+        self.latencies = deque(maxlen=METRICS_WINDOW)
+        self.last_error = ''
+        self.last_error_at = None
+
+
+class LLMGateway:
+    """
+    Pooled clients, retries, the concurrency cap and metrics for Groq calls.
+    Call limit()/alimit() around a call and send()/asend() inside it; a
+    streamed response keeps its upstream slot until the stream is closed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._client = None
+        # httpx async clients cannot be shared between event loops
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._metrics = {}
+
+    def _client_options(self):
+        return {
+            'timeout': httpx.Timeout(TIMEOUT_SECONDS, connect=CONNECT_TIMEOUT_SECONDS),
+            'limits': httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS),
+            'headers': {"Authorization": f"Bearer {GROQ_API_KEY}"},
+        }
+
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(**self._client_options())
+            return self._client
+
+    def async_client(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = self._async_clients[loop] = httpx.AsyncClient(**self._client_options())
+            return client
+
+    def _model_metrics(self, model):
+        metrics = self._metrics.get(model)
+        if metrics is None:
+            metrics = self._metrics[model] = ModelMetrics()
+        return metrics
+
+    def _enter(self, model):
+        with self._lock:
+            self._model_metrics(model).in_flight += 1
+
+    def _exit(self, model):
+        with self._lock:
+            self._model_metrics(model).in_flight -= 1
+
+    def record(self, model, started, error=None):
+        with self._lock:
+            metrics = self._model_metrics(model)
+            metrics.requests += 1
+            metrics.latencies.append(time.monotonic() - started)
+            if error:
+                metrics.errors += 1
+                metrics.last_error = error
+                metrics.last_error_at = timezone.now()
+
+    def record_error(self, model, error):
+        """A failure after the response started, e.g. a stream cut off midway"""
+        with self._lock:
+            metrics = self._model_metrics(model)
+            metrics.errors += 1
+            metrics.last_error = error
+            metrics.last_error_at = timezone.now()
+
+    def _record_retry(self, model):
+        with self._lock:
+            self._model_metrics(model).retries += 1
+
+    @contextmanager
+    def limit(self, model, upstream='groq'):
+        """Raises UpstreamBusy right away when the upstream's UPSTREAM_CONCURRENCY is used up"""
+        with hold_upstream(upstream):
+            self._enter(model)
+            try:
+                yield
+            finally:
+                self._exit(model)
+
+    @asynccontextmanager
+    async def alimit(self, model, upstream='groq'):
+        """Async counterpart of limit(); taking the slot never waits, so it is safe on the event loop"""
+        with hold_upstream(upstream):
+            self._enter(model)
+            try:
+                yield
+            finally:
+                self._exit(model)
+
+    def _backoff(self, attempt, response):
+        retry_after = response.headers.get('retry-after', '') if response is not None else ''
+        if retry_after.isdigit():
+            return min(int(retry_after), RETRY_MAX_BACKOFF_SECONDS)
+        # Full jitter so retrying workers do not hit the API in lockstep
+        return random.uniform(0, min(RETRY_MAX_BACKOFF_SECONDS, RETRY_BACKOFF_SECONDS * 2 ** attempt))
+
+    def _circuit(self, url):
+        circuit = transcription_circuit if url == GROQ_TRANSCRIPTION_URL else chat_circuit
+        if not circuit.allow():
+            retry_after = circuit.retry_after()
+            raise LLMUnavailable(
+                f'{circuit.name} is temporarily unavailable, please try again in {retry_after} seconds', retry_after
+            )
+        return circuit
+
+    def send(self, model, method, url, stream=False, **kwargs):
+        """
+        Response of the first successful attempt. Streamed responses must be
+        closed by the caller. Raises LLMError once the retries are used up.
+        """
+        circuit = self._circuit(url)
+        client = self.client()
+        started = time.monotonic()
+        for attempt in range(MAX_RETRIES + 1):
+            response = None
+            try:
+                response = client.send(client.build_request(method, url, **kwargs), stream=stream)
+            except httpx.HTTPError as e:
+                error = str(e) or e.__class__.__name__
+                retryable = isinstance(e, httpx.TransportError)
+            else:
+                if response.status_code < 400:
+                    self.record(model, started)
+                    circuit.record_success(time.monotonic() - started)
+                    return response
+                if stream:
+                    response.read()
+                response.close()
+                error = f"Groq API returned {response.status_code}: {response.text[:200]}"
+                retryable = response.status_code in RETRY_STATUSES
+            if not retryable or attempt == MAX_RETRIES:
+                self.record(model, started, error)
+                if retryable:
+                    circuit.record_failure(time.monotonic() - started, error)
+                else:
+                    # Groq answered; the request itself was bad
+                    circuit.record_success(time.monotonic() - started)
+                raise LLMError(error)
+            self._record_retry(model)
+            time.sleep(self._backoff(attempt, response))
+
+    async def asend(self, model, method, url, stream=False, **kwargs):
+        """Async version of send"""
+        circuit = self._circuit(url)
+        client = self.async_client()
+        started = time.monotonic()
+        for attempt in range(MAX_RETRIES + 1):
+            response = None
+            try:
+                response = await client.send(client.build_request(method, url, **kwargs), stream=stream)
+            except httpx.HTTPError as e:
+                error = str(e) or e.__class__.__name__
+                retryable = isinstance(e, httpx.TransportError)
+            else:
+                if response.status_code < 400:
+                    self.record(model, started)
+                    circuit.record_success(time.monotonic() - started)
+                    return response
+                if stream:
+                    await response.aread()
+                await response.aclose()
+                error = f"Groq API returned {response.status_code}: {response.text[:200]}"
+                retryable = response.status_code in RETRY_STATUSES
+            if not retryable or attempt == MAX_RETRIES:
+                self.record(model, started, error)
+                if retryable:
+                    circuit.record_failure(time.monotonic() - started, error)
+                else:
+                    # Groq answered; the request itself was bad
+                    circuit.record_success(time.monotonic() - started)
+                raise LLMError(error)
+            self._record_retry(model)
+            await asyncio.sleep(self._backoff(attempt, response))
+
+    def metrics(self):
+        with self._lock:
+            models = {}
+            for model, metrics in self._metrics.items():
+                latencies = sorted(metrics.latencies)
+                models[model] = {
+                    'requests': metrics.requests,
+                    'errors': metrics.errors,
+                    'retries': metrics.retries,
+                    'in_flight': metrics.in_flight,
+                    'error_rate': round(metrics.errors / metrics.requests, 4) if metrics.requests else 0.0,
+                    'latency_ms': {
+                        'window': len(latencies),
+                        'avg': round(1000 * sum(latencies) / len(latencies), 1) if latencies else None,
+                        'p50': round(1000 * percentile(latencies, 0.5), 1) if latencies else None,
+                        'p95': round(1000 * percentile(latencies, 0.95), 1) if latencies else None,
+                        'max': round(1000 * latencies[-1], 1) if latencies else None,
+                    },
+                    'last_error': metrics.last_error,
+                    'last_error_at': metrics.last_error_at,
+                }
+        return {
+            'max_concurrency': UPSTREAM_CONCURRENCY,
+            'in_flight': sum(model['in_flight'] for model in models.values()),
+            'models': models,
+        }
+
+
+gateway = LLMGateway()
+
+
+def complete(model, messages, **options):
+    """Text of a chat completion"""
+    with gateway.limit(model):
+        response = gateway.send(model, 'POST', GROQ_API_URL, json=completion_payload(model, messages, **options))
+        return completion_text(response.json())
+
+
+def stream_completion(model, messages, **options):
+    """Yield the text of a chat completion piece by piece as Groq generates it"""
+    payload = completion_payload(model, messages, stream=True, **options)
+    with gateway.limit(model):
+        response = gateway.send(model, 'POST', GROQ_API_URL, stream=True, json=payload)
+        try:
+            for line in response.iter_lines():
+                delta = stream_line_delta(line)
+                if delta is STREAM_DONE:
+                    return
+                if delta:
+                    yield delta
+        except httpx.HTTPError as e:
+            error = str(e) or e.__class__.__name__
+            gateway.record_error(model, error)
+            raise LLMError(error)
+        finally:
+            response.close()
+
+
+def transcribe_audio(model, filename, file):
+    """Transcript of an audio file; the upload is streamed from the file"""
+    with gateway.limit(model, upstream='transcription'):
+        response = gateway.send(
+            model, 'POST', GROQ_TRANSCRIPTION_URL,
+            files={'file': (filename, file)},
+            data={'model': model, 'response_format': 'verbose_json'},
+        )
+    try:
+        return response.json()['text']
+    except (ValueError, KeyError, TypeError):
+        raise LLMError(f"Unexpected transcription response: {response.text[:200]}")
+
+
+def sse_completion(key, model, messages, fallback=None, on_complete=None, **options):
+    """
+    Server-sent events for a streamed completion. On failure the fallback
+    text is sent as the answer when given, otherwise an error event.
+    on_complete is called with the full text of a successful completion.
+    """
+    parts = []
+    try:
+        for delta in stream_completion(model, messages, **options):
+            parts.append(delta)
+            yield format_sse('token', {'delta': delta})
+    except (LLMError, UpstreamBusy) as e:
+        if fallback is None:
+            yield format_sse('error', {'error': f'LLM API request failed: {str(e)}'})
+            return
+        parts = [fallback]
+        yield format_sse('token', {'delta': fallback})
+    else:
+        if on_complete is not None:
+            on_complete(''.join(parts))
+    yield format_sse('done', {key: ''.join(parts)})
+
+
+def sse_text(key, text):
+    """The events of sse_completion for an answer that is already known"""
+    yield format_sse('token', {'delta': text})
+    yield format_sse('done', {key: text})
+
+
+async def acomplete(model, messages, **options):
+    """Text of a chat completion, without blocking the event loop"""
+    async with gateway.alimit(model):
+        response = await gateway.asend(model, 'POST', GROQ_API_URL, json=completion_payload(model, messages, **options))
+        return completion_text(response.json())
+
+
+async def astream_completion(model, messages, **options):
+    """Async version of stream_completion"""
+    payload = completion_payload(model, messages, stream=True, **options)
+    async with gateway.alimit(model):
+        response = await gateway.asend(model, 'POST', GROQ_API_URL, stream=True, json=payload)
+        try:
+            async for line in response.aiter_lines():
+                delta = stream_line_delta(line)
+                if delta is STREAM_DONE:
+                    return
+                if delta:
+                    yield delta
+        except httpx.HTTPError as e:
+            error = str(e) or e.__class__.__name__
+            gateway.record_error(model, error)
+            raise LLMError(error)
+        finally:
+            await response.aclose()
+
+
+async def asse_completion(key, model, messages, fallback=None, on_complete=None, **options):
+    """Async version of sse_completion; on_complete is a coroutine function"""
+    parts = []
+    try:
+        async for delta in astream_completion(model, messages, **options):
+            parts.append(delta)
+            yield format_sse('token', {'delta': delta})
+    except (LLMError, UpstreamBusy) as e:
+        if fallback is None:
+            yield format_sse('error', {'error': f'LLM API request failed: {str(e)}'})
+            return
+        parts = [fallback]
+        yield format_sse('token', {'delta': fallback})
+    else:
+        if on_complete is not None:
+            await on_complete(''.join(parts))
+    yield format_sse('done', {key: ''.join(parts)})
+
+
+async def asse_text(key, text):
+    """Async version of sse_text"""
+    for event in sse_text(key, text):
+        yield event
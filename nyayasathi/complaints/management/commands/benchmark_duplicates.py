@@ -0,0 +1,84 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from complaints.models import Complaint, CustomUser
+from complaints.utils import check_similar_complaints, similarity_ratio
+
+WORDS = (
+    'neighbour', 'stole', 'bike', 'market', 'water', 'pipeline', 'leak', 'road', 'shop',
+    'phone', 'money', 'landlord', 'rent', 'noise', 'party', 'night', 'fight', 'school',
+    'bus', 'driver', 'rash', 'accident', 'garbage', 'street', 'light', 'power', 'cut',
+    'bribe', 'office', 'clerk', 'delay', 'document', 'land', 'dispute', 'brother', 'fence',
+)
+
+
+def legacy_check(user, content, since, similarity_threshold=0.8):
+    """The pre-index behaviour: SequenceMatcher against every recent complaint"""
+    best_match, best_similarity = None, 0
+    for complaint in Complaint.objects.filter(user=user, submitted_at__gte=since):
+        similarity = similarity_ratio(content, complaint.content)
+        if similarity > similarity_threshold and similarity > best_similarity:
+            best_match, best_similarity = complaint, similarity
+    return best_match, best_similarity
+
+
+class Command(BaseCommand):
+    help = 'Compare the full SequenceMatcher scan with the LSH duplicate lookup (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--complaints', type=int, default=2000,
+                            help='Recent complaints to create for the benchmark user')
+        parser.add_argument('--queries', type=int, default=20)
+        parser.add_argument('--words', type=int, default=60, help='Words per complaint')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        def text():
+            return ' '.join(rng.choice(WORDS) for _ in range(options['words']))
+
+        with transaction.atomic():
+            user = CustomUser.objects.create_user(username=f"benchmark-{rng.random()}", password=None)
+            stored = []
+            start = time.perf_counter()
+            for _ in range(options['complaints']):
+                stored.append(Complaint.objects.create(user=user, name='Benchmark', location='Nowhere', content=text()))
+            self.stdout.write(f"Created and indexed {len(stored)} complaints in {time.perf_counter() - start:.1f}s")
+
+            # Half the queries are light edits of stored complaints, half are new text
+            queries = []
+            for i in range(options['queries']):
+                if i % 2 == 0:
+                    words = rng.choice(stored).content.split()
+                    words[rng.randrange(len(words))] = rng.choice(WORDS)
+                    queries.append(' '.join(words))
+                else:
+                    queries.append(text())
+
+            since = stored[0].submitted_at
+            agreements = 0
+            legacy_time = indexed_time = 0.0
+            for query in queries:
+                start = time.perf_counter()
+                legacy_match, _ = legacy_check(user, query, since)
+                legacy_time += time.perf_counter() - start
+
+                start = time.perf_counter()
+                indexed_match, _ = check_similar_complaints(user, query)
+                indexed_time += time.perf_counter() - start
+
+                if (legacy_match and legacy_match.id) == (indexed_match and indexed_match.id):
+                    agreements += 1
+
+            transaction.set_rollback(True)
+
+        count = len(queries)
+        self.stdout.write(
+            f"legacy scan {legacy_time / count * 1000:.1f}ms/query, "
+            f"LSH lookup {indexed_time / count * 1000:.1f}ms/query, "
+            f"same result for {agreements}/{count} queries"
+        )
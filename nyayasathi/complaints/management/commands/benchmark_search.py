@@ -0,0 +1,88 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from complaints.models import Complaint, CustomUser
+from complaints.search import SEARCH_FIELDS, search_backend, search_complaints, search_terms
+from complaints.management.commands.benchmark_duplicates import WORDS
+
+HINDI_WORDS = (
+    'चोरी', 'बाइक', 'बाजार', 'पानी', 'सड़क', 'पड़ोसी', 'झगड़ा', 'रिश्वत', 'दफ्तर', 'जमीन',
+    'किराया', 'मकान', 'मालिक', 'बिजली', 'कटौती', 'शोर', 'रात', 'स्कूल', 'बस', 'दुर्घटना',
+)
+PLACES = ('Pune', 'Delhi', 'Lucknow', 'Patna', 'Jaipur', 'Nagpur', 'Indore', 'Bhopal', 'Surat', 'Agra')
+# Vehicle numbers, names and similar rare tokens; most real search terms are like these
+RARE_WORDS = tuple(f'mh{number:05d}' for number in range(50000))
+QUERIES = (
+    'mh00042', 'mh31337 bribe', 'ravi mh12345', 'चोरी', 'बिजली कटौती', 'Patna',
+    'water leak', 'landlord rent', 'acc', 'nonexistent',
+)
+
+
+def legacy_search(queryset, query):
+    """The pre-index behaviour: substring filters over every row"""
+    for term in search_terms(query):
+        matches_term = Q()
+        for field in SEARCH_FIELDS:
+            matches_term |= Q(**{f'{field}__icontains': term})
+        queryset = queryset.filter(matches_term)
+    return queryset.order_by('-submitted_at', '-id')
+
+
+class Command(BaseCommand):
+    help = 'Time ranked full-text search against substring scans over a generated table (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--words', type=int, default=40, help='Words per complaint')
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        backend = search_backend()
+        if backend == 'fallback':
+            self.stdout.write(self.style.WARNING('No full-text index on this database; timing the fallback only'))
+
+        with transaction.atomic():
+            user = CustomUser.objects.create_user(username=f"benchmark-{rng.random()}", password=None)
+            start = time.perf_counter()
+            created = 0
+            while created < options['rows']:
+                batch = []
+                for _ in range(min(options['batch_size'], options['rows'] - created)):
+                    words = [rng.choice(WORDS) for _ in range(options['words'])]
+                    words[rng.randrange(len(words))] = rng.choice(RARE_WORDS)
+                    content = ' '.join(words)
+                    hindi = rng.random() < 0.3
+                    batch.append(Complaint(
+                        user=user, name=rng.choice(('Ravi', 'Asha', 'Imran', 'Priya', 'Gurpreet')), location=rng.choice(PLACES),
+                        content=content,
+                        original_content=' '.join(rng.choice(HINDI_WORDS) for _ in range(options['words'])) if hindi else content,
+                        language='hi' if hindi else 'en',
+                    ))
+                Complaint.objects.bulk_create(batch)
+                created += len(batch)
+            self.stdout.write(f"Inserted and indexed {created} complaints in {time.perf_counter() - start:.1f}s")
+
+            page = slice(0, options['page_size'])
+            queryset = Complaint.objects.filter(user=user).only('id')
+            for query in QUERIES:
+                start = time.perf_counter()
+                indexed = list(search_complaints(queryset, query)[page])
+                indexed_time = time.perf_counter() - start
+
+                start = time.perf_counter()
+                legacy = list(legacy_search(queryset, query)[page])
+                legacy_time = time.perf_counter() - start
+
+                self.stdout.write(
+                    f"{query!r:>16}: {backend} {indexed_time * 1000:.1f}ms ({len(indexed)} hits), "
+                    f"substring scan {legacy_time * 1000:.1f}ms ({len(legacy)} hits)"
+                )
+
+            transaction.set_rollback(True)
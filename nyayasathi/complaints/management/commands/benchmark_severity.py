@@ -0,0 +1,84 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from complaints.utils import DEFAULT_SEVERITY_RULES
+
+_SEVERITY_VOCABULARY = DEFAULT_SEVERITY_RULES.vocabulary
+
+FILLER_WORDS = (
+    'the', 'complaint', 'was', 'filed', 'near', 'market', 'yesterday', 'evening',
+    'my', 'neighbour', 'said', 'that', 'nobody', 'came', 'know', 'helpful',
+    'officer', 'road', 'village', 'family', 'money', 'phone', 'house', 'again',
+)
+
+
+def legacy_find(text):
+    """The pre-matcher behaviour: one substring scan per keyword"""
+    text_lower = text.lower()
+    return {keyword for keyword in _SEVERITY_VOCABULARY if keyword in text_lower}
+
+
+def build_corpus(sizes, per_size, seed, keyword_rate):
+    rng = random.Random(seed)
+    corpus = []
+    for size in sizes:
+        for _ in range(per_size):
+            words = []
+            length = 0
+            while length < size:
+                if rng.random() < keyword_rate:
+                    word = rng.choice(_SEVERITY_VOCABULARY)
+                else:
+                    word = rng.choice(FILLER_WORDS)
+                words.append(word)
+                length += len(word) + 1
+            corpus.append(' '.join(words))
+    return corpus
+
+
+def timed(func, corpus, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in corpus:
+            func(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class Command(BaseCommand):
+    help = 'Compare the legacy per-keyword substring scan against the compiled whole-word severity matcher'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,100000',
+                            help='Comma separated complaint sizes in bytes')
+        parser.add_argument('--per-size', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--keyword-rate', type=float, default=0.001,
+                            help='Fraction of words drawn from the severity vocabulary')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        for size in sizes:
+            corpus = build_corpus([size], options['per_size'], options['seed'], options['keyword_rate'])
+
+            boundary_changes = sum(
+                1 for text in corpus
+                if DEFAULT_SEVERITY_RULES.analyze(text) != DEFAULT_SEVERITY_RULES.analyze(text, word_boundary=False)
+            )
+
+            legacy = timed(legacy_find, corpus, options['repeat'])
+            word = timed(DEFAULT_SEVERITY_RULES.word_matcher.find, corpus, options['repeat'])
+            analyze = timed(DEFAULT_SEVERITY_RULES.analyze, corpus, options['repeat'])
+
+            self.stdout.write(
+                f"{size:>7} bytes x {len(corpus)}: "
+                f"legacy {legacy * 1000:.1f}ms, "
+                f"matcher(word) {word * 1000:.1f}ms, "
+                f"analyze(word) {analyze * 1000:.1f}ms, "
+                f"results changed by word boundaries {boundary_changes}"
+            )
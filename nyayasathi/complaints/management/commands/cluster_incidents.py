@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from complaints.models import Complaint
+from complaints.utils import assign_incident, index_complaint_signature
+
+
+class Command(BaseCommand):
+    help = 'Assign incident clusters to complaints that do not have one, oldest first'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        queryset = Complaint.objects.filter(incident__isnull=True).exclude(content='').order_by('submitted_at', 'id')
+        assigned = 0
+        for complaint in queryset.iterator(chunk_size=options['batch_size']):
+            index_complaint_signature(complaint)
+            assign_incident(complaint)
+            assigned += 1
+        self.stdout.write(self.style.SUCCESS(f'Clustered {assigned} complaints'))
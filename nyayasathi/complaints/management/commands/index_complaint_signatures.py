@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from complaints.models import Complaint
+from complaints.utils import index_complaint_signature
+
+
+class Command(BaseCommand):
+    help = 'Compute MinHash signatures and LSH buckets for complaints that lack them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Rebuild every complaint, not only those without a signature')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        queryset = Complaint.objects.only('id', 'content', 'minhash').order_by('id')
+        if not options['all']:
+            queryset = queryset.filter(minhash=[])
+
+        indexed = 0
+        for complaint in queryset.iterator(chunk_size=options['batch_size']):
+            if index_complaint_signature(complaint, force=options['all']):
+                indexed += 1
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} complaints'))
@@ -0,0 +1,54 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+
+from complaints.models import SeverityRuleSet
+from complaints.utils import DEFAULT_SEVERITY_LEXICONS, DEFAULT_SEVERITY_THRESHOLDS
+
+
+class Command(BaseCommand):
+    help = 'Publish severity lexicons and thresholds from a JSON file as a new ruleset version'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?',
+                            help='JSON file with "lexicons", optional "thresholds" and "word_boundary"')
+        parser.add_argument('--activate', action='store_true',
+                            help='Make the new version the active ruleset')
+        parser.add_argument('--export-defaults', action='store_true',
+                            help='Print the built-in rules as JSON instead of loading a file')
+        parser.add_argument('--notes', default='')
+
+    def handle(self, *args, **options):
+        if options['export_defaults']:
+            self.stdout.write(json.dumps({
+                'lexicons': DEFAULT_SEVERITY_LEXICONS,
+                'thresholds': DEFAULT_SEVERITY_THRESHOLDS,
+                'word_boundary': True,
+            }, indent=2))
+            return
+
+        if not options['path']:
+            raise CommandError('A rules file is required')
+        try:
+            with open(options['path'], encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not read rules file: {e}')
+
+        latest = SeverityRuleSet.objects.aggregate(latest=Max('version'))['latest'] or 0
+        ruleset = SeverityRuleSet(
+            version=latest + 1,
+            lexicons=data.get('lexicons', {}),
+            thresholds=data.get('thresholds', {}),
+            word_boundary=data.get('word_boundary', True),
+            is_active=options['activate'],
+            notes=options['notes'],
+        )
+        try:
+            ruleset.full_clean()
+        except ValidationError as e:
+            raise CommandError(f'Invalid ruleset: {e}')
+        ruleset.save()
+        self.stdout.write(self.style.SUCCESS(f'Created {ruleset}'))
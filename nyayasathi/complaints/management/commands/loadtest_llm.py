@@ -0,0 +1,145 @@
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlencode
+
+import httpx
+import uvicorn
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from complaints.models import CustomUser
+
+
+def stub_llm_app(latency):
+    """OpenAI-style chat completion endpoint that answers after a fixed delay"""
+    async def app(scope, receive, send):
+        if scope['type'] != 'http':
+            return
+        while (await receive()).get('more_body'):
+            pass
+        await asyncio.sleep(latency)
+        body = json.dumps({'choices': [{'message': {'role': 'assistant', 'content': 'Stub answer.'}}]}).encode()
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', b'application/json')]})
+        await send({'type': 'http.response.body', 'body': body})
+    return app
+
+
+def wait_for_port(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise CommandError(f'Server at {url} did not start')
+
+
+async def post_form(host, port, path, form, headers):
+    """
+    Minimal HTTP/1.1 POST on a fresh connection. httpx's connection pool
+    gets slow with hundreds of concurrent requests, which would make the
+    client the bottleneck of the test.
+    """
+    body = urlencode(form).encode('utf-8')
+    head = [f'POST {path} HTTP/1.1', f'Host: {host}:{port}', 'Connection: close',
+            'Content-Type: application/x-www-form-urlencoded', f'Content-Length: {len(body)}']
+    head += [f'{name}: {value}' for name, value in headers.items()]
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    return int(response.split(b' ', 2)[1])
+
+
+async def drive(host, port, path, token, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                status = await post_form(host, port, path, {'message': f'What is IPC section {i}?'},
+                                         {'Authorization': f'Token {token}'})
+                if status != 200:
+                    errors += 1
+            except (OSError, IndexError, ValueError):
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return time.perf_counter() - start, latencies, errors
+
+
+class Command(BaseCommand):
+    help = 'Compare sync (gunicorn) and async (uvicorn) chatbot throughput against a local stub LLM server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=400)
+        parser.add_argument('--concurrency', type=int, default=200)
+        parser.add_argument('--latency', type=float, default=1.0, help='Seconds the stub LLM takes per completion')
+        parser.add_argument('--sync-workers', type=int, default=4, help='gunicorn sync workers for the baseline')
+        parser.add_argument('--stub-port', type=int, default=8791)
+        parser.add_argument('--app-port', type=int, default=8792)
+
+    def handle(self, *args, **options):
+        gunicorn = shutil.which('gunicorn')
+        if gunicorn is None:
+            raise CommandError('gunicorn is required for the sync baseline')
+
+        user, _ = CustomUser.objects.get_or_create(username='loadtest-llm')
+        token, _ = Token.objects.get_or_create(user=user)
+
+        stub = uvicorn.Server(uvicorn.Config(
+            stub_llm_app(options['latency']), port=options['stub_port'], log_level='warning', lifespan='off'
+        ))
+        threading.Thread(target=stub.run, daemon=True).start()
+        stub_url = f"http://127.0.0.1:{options['stub_port']}/openai/v1/chat/completions"
+        wait_for_port(stub_url)
+
+        env = dict(os.environ, GROQ_API_URL=stub_url, GROQ_API_KEY='stub',
+                   DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'nyayasathi.settings'))
+        bind = f"127.0.0.1:{options['app_port']}"
+        servers = [
+            ('sync', '/api/chatbot/', [gunicorn, 'nyayasathi.wsgi:application', '--workers', str(options['sync_workers']),
+                                       '--bind', bind, '--log-level', 'warning']),
+            ('async', '/api/async/chatbot/', [sys.executable, '-m', 'uvicorn', 'nyayasathi.asgi:application',
+                                              '--port', str(options['app_port']), '--log-level', 'warning']),
+        ]
+        try:
+            for name, path, command in servers:
+                process = subprocess.Popen(command, env=env, cwd=settings.BASE_DIR)
+                try:
+                    wait_for_port(f'http://{bind}/api/')
+                    elapsed, latencies, errors = asyncio.run(drive(
+                        '127.0.0.1', options['app_port'], path, token.key, options['requests'], options['concurrency']
+                    ))
+                finally:
+                    process.terminate()
+                    process.wait()
+                latencies.sort()
+                self.stdout.write(
+                    f"{name:>5}: {options['requests'] / elapsed:.1f} req/s, "
+                    f"p50 {statistics.median(latencies) * 1000:.0f}ms, "
+                    f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f}ms, "
+                    f"errors {errors}"
+                )
+        finally:
+            stub.should_exit = True
+            token.delete()
+            user.delete()
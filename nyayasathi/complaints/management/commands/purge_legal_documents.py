@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from complaints.documents import purge_documents
+
+
+class Command(BaseCommand):
+    help = 'Delete stored legal documents that have not been used for a number of days'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=getattr(settings, 'LEGAL_DOCUMENT_RETENTION_DAYS', 30))
+
+    def handle(self, *args, **options):
+        purged = purge_documents(options['days'])
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} legal documents'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from complaints.stats import rebuild_complaint_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the dashboard counters from the complaints table'
+
+    def handle(self, *args, **options):
+        buckets = rebuild_complaint_stats()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {buckets} complaint stat buckets'))
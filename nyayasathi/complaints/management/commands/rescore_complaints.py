@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from complaints.models import Complaint, SeverityRuleSet
+from complaints.stats import rebuild_complaint_stats
+from complaints.utils import load_severity_rules
+
+
+class Command(BaseCommand):
+    help = 'Rescore stored complaints with a severity ruleset'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rule-version', type=int,
+                            help='Ruleset version to apply (default: the active ruleset, 0 for built-in)')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--outdated-only', action='store_true',
+                            help='Skip complaints already scored by this version')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        try:
+            rules = load_severity_rules(options['rule_version'])
+        except SeverityRuleSet.DoesNotExist:
+            raise CommandError(f"Ruleset version {options['rule_version']} does not exist")
+
+        queryset = Complaint.objects.only(
+            'id', 'content', 'emotion', 'priority', 'threat_level', 'risk_factors',
+            'requires_immediate_attention', 'triage_rank', 'rule_version'
+        ).order_by('id')
+        if options['outdated_only']:
+            queryset = queryset.exclude(rule_version=rules.version)
+
+        fields = [
+            'emotion', 'priority', 'threat_level', 'risk_factors', 'requires_immediate_attention',
+            'triage_rank', 'rule_version'
+        ]
+        batch_size = options['batch_size']
+        batch = []
+        scanned = changed = 0
+
+        for complaint in queryset.iterator(chunk_size=batch_size):
+            scanned += 1
+            analysis = rules.analyze(complaint.content)
+            updated = {
+                'emotion': analysis['emotion'],
+                'priority': analysis['priority'],
+                'threat_level': analysis['threat_level'],
+                'risk_factors': analysis['risk_factors'],
+                'requires_immediate_attention': analysis['requires_immediate_attention'],
+                'rule_version': rules.version,
+            }
+            if all(getattr(complaint, field) == value for field, value in updated.items()):
+                continue
+            for field, value in updated.items():
+                setattr(complaint, field, value)
+            complaint.triage_rank = complaint.compute_triage_rank()
+            batch.append(complaint)
+            changed += 1
+            if len(batch) >= batch_size:
+                if not options['dry_run']:
+                    Complaint.objects.bulk_update(batch, fields)
+                batch = []
+
+        if batch and not options['dry_run']:
+            Complaint.objects.bulk_update(batch, fields)
+        if changed and not options['dry_run']:
+            # bulk_update bypasses the signals that keep dashboard counters current
+            rebuild_complaint_stats()
+
+        verb = 'Would update' if options['dry_run'] else 'Updated'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {changed} of {scanned} complaints with severity rules v{rules.version}'
+        ))
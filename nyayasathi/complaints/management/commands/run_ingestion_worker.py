@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from complaints.ingestion import POLL_SECONDS, worker_pool
+
+
+class Command(BaseCommand):
+    help = 'Process queued complaint ingestion jobs in a dedicated process'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the queue once and exit instead of polling forever')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            processed = worker_pool.run_pending()
+            self.stdout.write(self.style.SUCCESS(f'Processed {processed} jobs'))
+            return
+
+        self.stdout.write('Waiting for ingestion jobs...')
+        while True:
+            if not worker_pool.run_pending():
+                time.sleep(POLL_SECONDS)
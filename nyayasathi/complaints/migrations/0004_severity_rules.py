@@ -0,0 +1,34 @@
+# Generated by Django 5.2.3 on 2026-10-16 23:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0003_complaint_original_content'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeverityRuleSet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(unique=True)),
+                ('lexicons', models.JSONField()),
+                ('thresholds', models.JSONField(blank=True, default=dict)),
+                ('word_boundary', models.BooleanField(default=True)),
+                ('is_active', models.BooleanField(default=False)),
+                ('notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-version'],
+            },
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='rule_version',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
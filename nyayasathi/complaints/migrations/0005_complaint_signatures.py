@@ -0,0 +1,30 @@
+# Generated by Django 5.2.3 on 2026-10-16 23:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0004_severity_rules'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='minhash',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.CreateModel(
+            name='ComplaintSignatureBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.BigIntegerField()),
+                ('complaint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='signature_buckets', to='complaints.complaint')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket', 'complaint'], name='complaints__bucket_b1ea4e_idx')],
+            },
+        ),
+    ]
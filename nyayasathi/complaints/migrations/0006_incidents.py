@@ -0,0 +1,35 @@
+# Generated by Django 5.2.3 on 2026-10-16 23:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0005_complaint_signatures'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Incident',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('location', models.CharField(max_length=100)),
+                ('location_key', models.CharField(db_index=True, max_length=100)),
+                ('member_count', models.PositiveIntegerField(default=0)),
+                ('highest_threat_level', models.CharField(default='low', max_length=20)),
+                ('first_reported_at', models.DateTimeField()),
+                ('last_reported_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['-last_reported_at'],
+                'indexes': [models.Index(fields=['-last_reported_at'], name='complaints__last_re_a6970a_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='incident',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='complaints', to='complaints.incident'),
+        ),
+    ]
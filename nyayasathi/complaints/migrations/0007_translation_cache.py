@@ -0,0 +1,25 @@
+# Generated by Django 5.2.3 on 2026-10-16 23:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0006_incidents'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranslationCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('source_lang', models.CharField(max_length=10)),
+                ('target_lang', models.CharField(max_length=10)),
+                ('translated_text', models.TextField()),
+                ('created_at', models.DateTimeField(db_index=True)),
+                ('last_used_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
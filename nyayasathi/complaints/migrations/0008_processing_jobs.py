@@ -0,0 +1,32 @@
+# Generated by Django 5.2.3 on 2026-10-16 23:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0007_translation_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessingJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('state', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('stage', models.CharField(default='queued', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('locked_until', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('result', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('complaint', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='processing_job', to='complaints.complaint')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['state', 'created_at'], name='complaints__state_d3c59a_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.3 on 2026-10-16 23:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0008_processing_jobs'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='complaint',
+            options={'ordering': ['-submitted_at', '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['-submitted_at', '-id'], name='complaint_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['user', '-submitted_at', '-id'], name='complaint_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['status', '-submitted_at', '-id'], name='complaint_status_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['priority', '-submitted_at', '-id'], name='complaint_prio_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['threat_level', '-submitted_at', '-id'], name='complaint_threat_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['language', '-submitted_at', '-id'], name='complaint_lang_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.3 on 2026-10-17 00:02
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def populate_stats(apps, schema_editor):
+    Complaint = apps.get_model('complaints', 'Complaint')
+    ComplaintStat = apps.get_model('complaints', 'ComplaintStat')
+    rows = []
+    for dimension in ['priority', 'status', 'threat_level', 'language']:
+        for row in Complaint.objects.order_by().values(dimension).annotate(count=Count('id')):
+            rows.append(ComplaintStat(dimension=dimension, value=row[dimension] or '', count=row['count']))
+    days = Complaint.objects.order_by().annotate(day=TruncDate('submitted_at')).values('day').annotate(count=Count('id'))
+    for row in days:
+        rows.append(ComplaintStat(dimension='day', value=row['day'].isoformat() if row['day'] else '', count=row['count']))
+    ComplaintStat.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0009_complaint_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=20)),
+                ('value', models.CharField(blank=True, max_length=50)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'value'), name='unique_complaint_stat_bucket')],
+            },
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
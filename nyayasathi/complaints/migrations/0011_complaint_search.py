@@ -0,0 +1,77 @@
+from django.db import migrations
+
+# The SQL is frozen here rather than imported from complaints.search, so later
+# changes to the app cannot alter what this migration does.
+SQLITE_FTS_TABLE_SQL = """CREATE VIRTUAL TABLE IF NOT EXISTS complaints_complaint_fts USING fts5(
+    name, location, content, original_content,
+    content='complaints_complaint', content_rowid='id',
+    tokenize="unicode61 remove_diacritics 2 categories 'L* N* Co M*'"
+)"""
+
+SQLITE_TRIGGERS = {
+    'complaints_complaint_fts_insert': """CREATE TRIGGER IF NOT EXISTS complaints_complaint_fts_insert
+        AFTER INSERT ON complaints_complaint BEGIN
+        INSERT INTO complaints_complaint_fts(rowid, name, location, content, original_content) VALUES (new.id, new.name, new.location, new.content, new.original_content);
+    END""",
+    'complaints_complaint_fts_delete': """CREATE TRIGGER IF NOT EXISTS complaints_complaint_fts_delete
+        AFTER DELETE ON complaints_complaint BEGIN
+        INSERT INTO complaints_complaint_fts(complaints_complaint_fts, rowid, name, location, content, original_content) VALUES ('delete', old.id, old.name, old.location, old.content, old.original_content);
+    END""",
+    'complaints_complaint_fts_update': """CREATE TRIGGER IF NOT EXISTS complaints_complaint_fts_update
+        AFTER UPDATE OF name, location, content, original_content ON complaints_complaint BEGIN
+        INSERT INTO complaints_complaint_fts(complaints_complaint_fts, rowid, name, location, content, original_content) VALUES ('delete', old.id, old.name, old.location, old.content, old.original_content);
+        INSERT INTO complaints_complaint_fts(rowid, name, location, content, original_content) VALUES (new.id, new.name, new.location, new.content, new.original_content);
+    END""",
+}
+
+SQLITE_REBUILD_SQL = "INSERT INTO complaints_complaint_fts(complaints_complaint_fts) VALUES ('rebuild')"
+
+POSTGRES_SEARCH_SQL = [
+    """ALTER TABLE complaints_complaint ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(location, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(content, '')), 'C') ||
+        setweight(to_tsvector('simple', coalesce(original_content, '')), 'C')
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS complaint_search_idx ON complaints_complaint USING GIN (search_vector)",
+]
+
+
+def sqlite_has_fts5(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite' and sqlite_has_fts5(schema_editor):
+        schema_editor.execute(SQLITE_FTS_TABLE_SQL)
+        for statement in SQLITE_TRIGGERS.values():
+            schema_editor.execute(statement)
+        schema_editor.execute(SQLITE_REBUILD_SQL)
+    elif vendor == 'postgresql':
+        for statement in POSTGRES_SEARCH_SQL:
+            schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for name in SQLITE_TRIGGERS:
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        schema_editor.execute("DROP TABLE IF EXISTS complaints_complaint_fts")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS complaint_search_idx")
+        schema_editor.execute("ALTER TABLE complaints_complaint DROP COLUMN IF EXISTS search_vector")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0010_complaint_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
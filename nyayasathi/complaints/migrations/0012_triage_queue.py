@@ -0,0 +1,56 @@
+# Generated by Django 5.2.3 on 2026-10-17 00:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, IntegerField, Value, When
+
+
+def level_rank(field):
+    return Case(
+        When(**{field: 'high'}, then=Value(2)),
+        When(**{field: 'medium'}, then=Value(1)),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def backfill_triage_rank(apps, schema_editor):
+    # requires_immediate_attention starts False; rescore_complaints recomputes it
+    Complaint = apps.get_model('complaints', 'Complaint')
+    Complaint.objects.update(triage_rank=level_rank('threat_level') * 100 + level_rank('priority') * 10)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0011_complaint_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='claimed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='claimed_complaints', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='requires_immediate_attention',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='triage_rank',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['status', '-triage_rank', 'submitted_at', 'id'], name='complaint_triage_idx'),
+        ),
+        migrations.RunPython(backfill_triage_rank, migrations.RunPython.noop),
+    ]
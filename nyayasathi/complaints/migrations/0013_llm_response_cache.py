@@ -0,0 +1,40 @@
+# Generated by Django 5.2.3 on 2026-10-17 00:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0012_triage_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMResponseCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('scope', models.CharField(max_length=64)),
+                ('model', models.CharField(max_length=100)),
+                ('question', models.TextField()),
+                ('signature', models.JSONField(blank=True, default=list)),
+                ('answer', models.TextField()),
+                ('created_at', models.DateTimeField(db_index=True)),
+                ('last_used_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LLMResponseCacheBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=64)),
+                ('bucket', models.BigIntegerField()),
+                ('entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='buckets', to='complaints.llmresponsecacheentry')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['scope', 'bucket'], name='complaints__scope_a3ba01_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-17 00:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0013_llm_response_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LegalDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('file', models.FileField(upload_to='legal_documents/')),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('pages', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(db_index=True)),
+                ('uploaded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='legal_documents', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.3 on 2026-10-17 00:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0014_legal_documents'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThrottleBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True)),
+                ('tokens', models.FloatField()),
+                ('updated_at', models.FloatField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.3 on 2026-10-17 01:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0015_throttle_buckets'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintSearchIndex',
+            fields=[
+                ('complaint', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='complaints.complaint')),
+                ('document', models.TextField(db_column='complaints_complaint_fts')),
+            ],
+            options={
+                'db_table': 'complaints_complaint_fts',
+                'managed': False,
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.models import BaseUserManager
@@ -43,6 +44,22 @@ class CustomUser(AbstractUser):
             return f"Cop {self.cop_id}"
         return f"User {self.username}"
 
+class Incident(models.Model):
+    """A cluster of complaints from any user that report the same incident"""
+    location = models.CharField(max_length=100)
+    location_key = models.CharField(max_length=100, db_index=True)
+    member_count = models.PositiveIntegerField(default=0)
+    highest_threat_level = models.CharField(max_length=20, default='low')
+    first_reported_at = models.DateTimeField()
+    last_reported_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Incident {self.id} at {self.location} ({self.member_count} complaints)"
+
+    class Meta:
+        ordering = ['-last_reported_at']
+        indexes = [models.Index(fields=['-last_reported_at'])]
+
 class Complaint(models.Model):
     COMPLAINT_TYPES = [
         ('audio', 'Audio'),
@@ -91,9 +108,216 @@ class Complaint(models.Model):
     submitted_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     original_content = models.TextField(blank=True, null=True)
+    rule_version = models.PositiveIntegerField(null=True, blank=True)
+    minhash = models.JSONField(default=list, blank=True, editable=False)
+    incident = models.ForeignKey(Incident, on_delete=models.SET_NULL, null=True, blank=True, related_name='complaints')
+    requires_immediate_attention = models.BooleanField(default=False)
+    # Higher is more urgent; derived from threat_level, priority and requires_immediate_attention in save()
+    triage_rank = models.PositiveSmallIntegerField(default=0, editable=False)
+    claimed_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='claimed_complaints')
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+
+    TRIAGE_LEVEL_RANK = {'low': 0, 'medium': 1, 'high': 2}
+    TRIAGE_FIELDS = ['threat_level', 'priority', 'requires_immediate_attention']
 
     def __str__(self):
         return f"{self.name} - {self.priority} - {self.submitted_at.strftime('%Y-%m-%d')}"
 
+    def compute_triage_rank(self):
+        """Threat level first, then priority, then the immediate-attention flag"""
+        return (
+            self.TRIAGE_LEVEL_RANK.get(self.threat_level, 0) * 100 +
+            self.TRIAGE_LEVEL_RANK.get(self.priority, 0) * 10 +
+            int(bool(self.requires_immediate_attention))
+        )
+
+    def save(self, *args, **kwargs):
+        self.triage_rank = self.compute_triage_rank()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(self.TRIAGE_FIELDS):
+            kwargs['update_fields'] = list(update_fields) + ['triage_rank']
+        super().save(*args, **kwargs)
+
+    class Meta:
+        ordering = ['-submitted_at', '-id']
+        indexes = [
+            # Keyset pagination on (submitted_at, id), alone and behind each list filter
+            models.Index(fields=['-submitted_at', '-id'], name='complaint_recent_idx'),
+            models.Index(fields=['user', '-submitted_at', '-id'], name='complaint_user_recent_idx'),
+            models.Index(fields=['status', '-submitted_at', '-id'], name='complaint_status_recent_idx'),
+            models.Index(fields=['priority', '-submitted_at', '-id'], name='complaint_prio_recent_idx'),
+            models.Index(fields=['threat_level', '-submitted_at', '-id'], name='complaint_threat_recent_idx'),
+            models.Index(fields=['language', '-submitted_at', '-id'], name='complaint_lang_recent_idx'),
+            # Triage queue: most urgent first, then oldest
+            models.Index(fields=['status', '-triage_rank', 'submitted_at', 'id'], name='complaint_triage_idx'),
+        ]
+
+class ComplaintSignatureBucket(models.Model):
+    """LSH bucket key of a complaint's MinHash signature, one row per band"""
+    complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE, related_name='signature_buckets')
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=['bucket', 'complaint'])]
+
+class ComplaintSearchIndex(models.Model):
+    """
+    The SQLite FTS5 table of complaints.search, mapped so searches can join it.
+    Created and kept in sync by migration 0011 and its triggers, never written here.
+    """
+    complaint = models.OneToOneField(
+        Complaint, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid',
+        db_constraint=False, related_name='search_index'
+    )
+    # FTS5's hidden column named after the table: the left side of MATCH and the first argument of bm25()
+    document = models.TextField(db_column='complaints_complaint_fts')
+
+    class Meta:
+        managed = False
+        db_table = 'complaints_complaint_fts'
+
+class ComplaintStat(models.Model):
+    """Number of complaints in one dashboard bucket, e.g. dimension='priority', value='high'"""
+    dimension = models.CharField(max_length=20)
+    value = models.CharField(max_length=50, blank=True)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.dimension}={self.value}: {self.count}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'value'], name='unique_complaint_stat_bucket')
+        ]
+
+class ProcessingJob(models.Model):
+    """Queue row driving the asynchronous ingestion of one complaint"""
+    STATE_QUEUED = 'queued'
+    STATE_RUNNING = 'running'
+    STATE_DONE = 'done'
+    STATE_FAILED = 'failed'
+    STATE_CHOICES = [
+        (STATE_QUEUED, 'Queued'),
+        (STATE_RUNNING, 'Running'),
+        (STATE_DONE, 'Done'),
+        (STATE_FAILED, 'Failed'),
+    ]
+
+    complaint = models.OneToOneField(Complaint, on_delete=models.CASCADE, related_name='processing_job')
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default=STATE_QUEUED)
+    stage = models.CharField(max_length=20, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    result = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Job {self.id} for complaint {self.complaint_id} - {self.state}/{self.stage}"
+
+    class Meta:
+        indexes = [models.Index(fields=['state', 'created_at'])]
+
+class TranslationCacheEntry(models.Model):
+    """Persistent tier of the translation cache, keyed by a hash of language pair and text"""
+    key = models.CharField(max_length=64, unique=True)
+    source_lang = models.CharField(max_length=10)
+    target_lang = models.CharField(max_length=10)
+    translated_text = models.TextField()
+    created_at = models.DateTimeField(db_index=True)
+    last_used_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.source_lang}->{self.target_lang} {self.key[:12]}"
+
+class LLMResponseCacheEntry(models.Model):
+    """
+    Persistent tier of the LLM answer cache. key hashes the model and the
+    normalized prompt; scope groups answers a near-duplicate question may
+    reuse (same endpoint, model and document).
+    """
+    key = models.CharField(max_length=64, unique=True)
+    scope = models.CharField(max_length=64)
+    model = models.CharField(max_length=100)
+    question = models.TextField()
+    signature = models.JSONField(default=list, blank=True)
+    answer = models.TextField()
+    created_at = models.DateTimeField(db_index=True)
+    last_used_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.model} {self.key[:12]}"
+
+class LLMResponseCacheBucket(models.Model):
+    """LSH bucket key of a cached question's MinHash signature, one row per band"""
+    entry = models.ForeignKey(LLMResponseCacheEntry, on_delete=models.CASCADE, related_name='buckets')
+    scope = models.CharField(max_length=64)
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=['scope', 'bucket'])]
+
+class LegalDocument(models.Model):
+    """An uploaded legal document, stored once per content hash together with its extracted pages"""
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255)
+    file = models.FileField(upload_to='legal_documents/')
+    size = models.PositiveBigIntegerField(default=0)
+    pages = models.JSONField(default=list)
+    uploaded_by = models.ForeignKey(
+        CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='legal_documents'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.sha256[:12]})"
+
+    @property
+    def text(self):
+        return '\n'.join(self.pages)
+
+class ThrottleBucket(models.Model):
+    """Token bucket of one client and scope, shared by all workers when THROTTLE_STORE is 'database'"""
+    key = models.CharField(max_length=255, unique=True)
+    tokens = models.FloatField()
+    # Unix time of the last refill; also the version checked by the conditional update
+    updated_at = models.FloatField(db_index=True)
+
+    def __str__(self):
+        return f"{self.key}: {self.tokens:.2f}"
+
+class SeverityRuleSet(models.Model):
+    """
+    A versioned set of severity lexicons and thresholds. Versions are meant to
+    be immutable: publish a change as a new version and activate it.
+    """
+    LEXICON_KEYS = ['high_threat', 'medium_threat', 'urgency', 'immediate_attention', 'emotions']
+
+    version = models.PositiveIntegerField(unique=True)
+    lexicons = models.JSONField()
+    thresholds = models.JSONField(default=dict, blank=True)
+    word_boundary = models.BooleanField(default=True)
+    is_active = models.BooleanField(default=False)
+    notes = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Severity rules v{self.version}{' (active)' if self.is_active else ''}"
+
+    def clean(self):
+        missing = [key for key in self.LEXICON_KEYS if key not in (self.lexicons or {})]
+        if missing:
+            raise ValidationError({'lexicons': f"Missing lexicons: {', '.join(missing)}"})
+        if self.version == 0:
+            raise ValidationError({'version': 'Version 0 is reserved for the built-in rules'})
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            if self.is_active:
+                SeverityRuleSet.objects.exclude(pk=self.pk).filter(is_active=True).update(is_active=False)
+            super().save(*args, **kwargs)
+
     class Meta:
-        ordering = ['-submitted_at']
+        ordering = ['-version']
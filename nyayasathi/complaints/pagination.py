@@ -0,0 +1,114 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Newest-first cursor pagination on (submitted_at, id).
+
+    Each page is fetched with a range condition on the composite index
+    instead of an OFFSET, so the cost of a page does not depend on how deep
+    into the table it is or how many rows the table has.
+    """
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    ordering = ('-submitted_at', '-id')
+
+    def encode_cursor(self, obj):
+        raw = f"{obj.submitted_at.isoformat()}|{obj.id}"
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, cursor):
+        try:
+            submitted_at, obj_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').rsplit('|', 1)
+            return datetime.fromisoformat(submitted_at), int(obj_id)
+        except (ValueError, UnicodeError):
+            raise ValidationError({'cursor': 'Invalid cursor.'})
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            submitted_at, obj_id = self.decode_cursor(cursor)
+            # The leading range condition lets the database seek on the (submitted_at, id) index;
+            # the plain OR of both cases is planned as a scan that grows with the page depth
+            queryset = queryset.filter(
+                Q(submitted_at__lte=submitted_at) & (Q(submitted_at__lt=submitted_at) | Q(id__lt=obj_id))
+            )
+
+        rows = list(queryset[:page_size + 1])
+        self.next_cursor = self.encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+        return rows[:page_size]
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'next_cursor': self.next_cursor,
+            'results': data,
+        })
+
+
+class RankedPagination(BasePagination):
+    """
+    Page-number pagination for relevance-ordered results. Ranked order has no
+    stable keyset, so pages use an offset; the total is not counted, one
+    extra row tells whether there is a next page.
+    """
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    page_query_param = 'page'
+
+    get_page_size = KeysetPagination.get_page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        try:
+            self.page = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            raise ValidationError({'page': 'Invalid page.'})
+        if self.page < 1:
+            raise ValidationError({'page': 'Invalid page.'})
+
+        offset = (self.page - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        self.has_next = len(rows) > page_size
+        return rows[:page_size]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, self.page + 1)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'page': self.page,
+            'next': self.get_next_link(),
+            'results': data,
+        })
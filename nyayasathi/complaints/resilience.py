@@ -0,0 +1,170 @@
+"""
+Circuit breakers for the external services the app depends on.
+
+Every dependency (Groq chat completions, Groq transcription, Google
+Translate) has one CircuitBreaker per process. After FAILURES consecutive
+failed - or slower than slow_call_seconds - calls the circuit opens and
+callers degrade right away instead of waiting on the service: answers come
+from the caches or the request is queued, and text stays untranslated.
+After RESET_SECONDS one probe call is let through (half-open); its outcome
+closes the circuit again or keeps it open for another RESET_SECONDS.
+
+States and latency percentiles are served at /api/health/dependencies/.
+"""
+import math
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils import timezone
+
+FAILURES = getattr(settings, 'CIRCUIT_BREAKER_FAILURES', 5)
+RESET_SECONDS = getattr(settings, 'CIRCUIT_BREAKER_RESET_SECONDS', 30)
+LATENCY_WINDOW = 500
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class CircuitBreaker:
+    def __init__(self, name, timeout_seconds=None, slow_call_seconds=None, failures=FAILURES,
+                 reset_seconds=RESET_SECONDS):
+        self.name = name
+        # The timeout is enforced by the caller; it is kept here to be reported
+        self.timeout_seconds = timeout_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self.failure_threshold = failures
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.calls = 0
+        self.failures = 0
+        self.slow_calls = 0
+        self.rejected = 0
+        self.opened = 0
+        self.opened_at = None
+        self.last_error = ''
+        self.last_error_at = None
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self._opened_monotonic = 0.0
+        self._probe_started = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True when a call may go out; while half-open only one probe is let through at a time"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN and now - self._opened_monotonic >= self.reset_seconds:
+                self.state = HALF_OPEN
+                self._probe_started = None
+            if self.state == HALF_OPEN:
+                # A probe that never reported back does not block the circuit forever
+                if self._probe_started is None or now - self._probe_started >= self.reset_seconds:
+                    self._probe_started = now
+                    return True
+            elif self.state == CLOSED:
+                return True
+            self.rejected += 1
+            return False
+
+    def retry_after(self):
+        """Whole seconds until the circuit lets a call through again"""
+        with self._lock:
+            if self.state != OPEN:
+                return 1
+            return max(math.ceil(self.reset_seconds - (time.monotonic() - self._opened_monotonic)), 1)
+
+    def _open(self):
+        self.state = OPEN
+        self.opened += 1
+        self.opened_at = timezone.now()
+        self._opened_monotonic = time.monotonic()
+        self._probe_started = None
+
+    def record_success(self, seconds):
+        if self.slow_call_seconds is not None and seconds > self.slow_call_seconds:
+            self.record_failure(seconds, f'Slow call: {seconds:.1f}s', slow=True)
+            return
+        with self._lock:
+            self.calls += 1
+            self.latencies.append(seconds)
+            self.consecutive_failures = 0
+            if self.state != CLOSED:
+                self.state = CLOSED
+                self._probe_started = None
+
+    def record_failure(self, seconds, error, slow=False):
+        with self._lock:
+            self.calls += 1
+            self.latencies.append(seconds)
+            if slow:
+                self.slow_calls += 1
+            else:
+                self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = error
+            self.last_error_at = timezone.now()
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.consecutive_failures >= self.failure_threshold):
+                self._open()
+
+    def snapshot(self):
+        retry_after = self.retry_after() if self.state == OPEN else None
+        with self._lock:
+            latencies = sorted(self.latencies)
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'calls': self.calls,
+                'failures': self.failures,
+                'slow_calls': self.slow_calls,
+                'rejected': self.rejected,
+                'opened': self.opened,
+                'opened_at': self.opened_at,
+                'retry_after': retry_after,
+                'timeout_seconds': self.timeout_seconds,
+                'slow_call_seconds': self.slow_call_seconds,
+                'last_error': self.last_error,
+                'last_error_at': self.last_error_at,
+                'latency_ms': {
+                    'window': len(latencies),
+                    'p50': round(1000 * percentile(latencies, 0.5), 1) if latencies else None,
+                    'p95': round(1000 * percentile(latencies, 0.95), 1) if latencies else None,
+                    'p99': round(1000 * percentile(latencies, 0.99), 1) if latencies else None,
+                    'max': round(1000 * latencies[-1], 1) if latencies else None,
+                },
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def circuit_breaker(name, **options):
+    """The process-wide breaker of a dependency, created with options on first use"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name, **options)
+        return breaker
+
+
+def breaker_states():
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
+
+
+def unavailable_response(error):
+    """503 with Retry-After for an upstream whose circuit is open (error carries retry_after)"""
+    response = JsonResponse({'error': str(error)}, status=503)
+    response['Retry-After'] = str(error.retry_after)
+    return response
@@ -0,0 +1,218 @@
+"""
+Cache of LLM answers for the legal chatbot and document question endpoints.
+
+Answers are keyed by a hash of the model and the normalized prompt and
+looked up in an in-process LRU first, then in the LLMResponseCacheEntry
+table. When both miss, the MinHash signature of the question is matched
+against cached questions in the same scope (endpoint, model and document)
+through the LSH bucket table, so rephrasings such as "What is IPC 420?"
+and "what is ipc section 420" share one answer. Questions mentioning
+different numbers never match: "IPC 420" and "IPC 302" look alike but are
+different questions. Neither do questions with different negations or
+modal verbs, as "Can police arrest without warrant" and "Can police not
+arrest without warrant" ask opposite things.
+"""
+import hashlib
+import re
+import threading
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .cache import LRUCache
+from .models import LLMResponseCacheBucket, LLMResponseCacheEntry
+from .signatures import band_keys, estimated_similarity, minhash, normalize_text
+
+TTL_SECONDS = getattr(settings, 'LLM_CACHE_TTL_SECONDS', 7 * 24 * 3600)
+MAX_ENTRIES = getattr(settings, 'LLM_CACHE_MAX_ENTRIES', 20000)
+SIMILARITY_THRESHOLD = getattr(settings, 'LLM_CACHE_SIMILARITY_THRESHOLD', 0.75)
+MAX_CANDIDATES = 5
+EVICT_EVERY = 100
+
+# Words that do not change what is being asked; dropped before signing a question
+FILLER_WORDS = {
+    'a', 'an', 'the', 'is', 'are', 'was', 'what', 'whats', 's', 'please', 'kindly', 'tell', 'me', 'about',
+    'can', 'could', 'you', 'explain', 'describe', 'of', 'under', 'in', 'for', 'to', 'section', 'sec',
+}
+_NUMBER = re.compile(r'\d+')
+# Words that flip or qualify what is asked; near-duplicates must use the same ones ("t" is what
+# normalize_text leaves of "can't", "don't", ...)
+POLARITY_WORDS = {
+    'not', 'no', 'never', 'without', 'cannot', 'cant', 'dont', 'doesnt', 'isnt', 'wont', 't', 'nor', 'neither',
+    'except', 'unless', 'only', 'should', 'must', 'may', 'might', 'shall', 'will', 'would', 'need',
+}
+
+CachedAnswer = namedtuple('CachedAnswer', ['answer', 'match', 'similarity', 'age'])
+
+_memory_cache = LRUCache(maxsize=getattr(settings, 'LLM_CACHE_MEMORY_SIZE', 1024), ttl=TTL_SECONDS)
+_stats = {'memory_hits': 0, 'exact_hits': 0, 'similar_hits': 0, 'misses': 0, 'stores': 0, 'evicted': 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+        return _stats[name]
+
+
+def response_cache_stats():
+    """Hit/miss counters of this process"""
+    with _stats_lock:
+        stats = dict(_stats)
+    hits = stats['memory_hits'] + stats['exact_hits'] + stats['similar_hits']
+    lookups = hits + stats['misses']
+    stats['hit_rate'] = hits / lookups if lookups else 0.0
+    stats['memory_entries'] = len(_memory_cache)
+    return stats
+
+
+def cache_allowed(params, headers):
+    """False when the client opted out with ?cache=0 or Cache-Control: no-cache"""
+    if str(params.get('cache', '')).lower() in ['0', 'false', 'no']:
+        return False
+    return 'no-cache' not in headers.get('Cache-Control', '').lower()
+
+
+def _digest(*parts):
+    return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+
+def prompt_key(model, messages):
+    return _digest(model, *(normalize_text(message['content']) for message in messages))
+
+
+def scope_key(endpoint, model, context=''):
+    return _digest(endpoint, model, normalize_text(context))
+
+
+def question_signature(question):
+    words = [word for word in normalize_text(question).split() if word not in FILLER_WORDS]
+    return minhash(' '.join(words))
+
+
+def _numbers(text):
+    return set(_NUMBER.findall(text or ''))
+
+
+def _polarity(text):
+    return POLARITY_WORDS.intersection(normalize_text(text).split())
+
+
+def _age(entry):
+    return int((timezone.now() - entry.created_at).total_seconds())
+
+
+def evict_expired_responses():
+    """Drop expired rows, then the least recently used rows beyond MAX_ENTRIES"""
+    label = LLMResponseCacheEntry._meta.label
+    # delete() also reports the cascaded bucket rows; count entries only
+    _, deleted = LLMResponseCacheEntry.objects.filter(
+        created_at__lt=timezone.now() - timedelta(seconds=TTL_SECONDS)
+    ).delete()
+    evicted = deleted.get(label, 0)
+    overflow = LLMResponseCacheEntry.objects.count() - MAX_ENTRIES
+    if overflow > 0:
+        stale_ids = list(
+            LLMResponseCacheEntry.objects.order_by('last_used_at').values_list('id', flat=True)[:overflow]
+        )
+        _, deleted = LLMResponseCacheEntry.objects.filter(id__in=stale_ids).delete()
+        evicted += deleted.get(label, 0)
+    _count('evicted', evicted)
+    return evicted
+
+
+def _touch(entry):
+    # Touching every hit would turn reads into writes; an hour of slack is plenty for LRU
+    if entry.last_used_at < timezone.now() - timedelta(hours=1):
+        LLMResponseCacheEntry.objects.filter(pk=entry.pk).update(last_used_at=timezone.now())
+
+
+def _similar_entry(fresh, scope, question):
+    signature = question_signature(question)
+    keys = band_keys(signature)
+    if not keys:
+        return None, 0
+    candidates = (
+        LLMResponseCacheBucket.objects.filter(scope=scope, bucket__in=keys)
+        .values('entry_id')
+        .annotate(shared_bands=Count('id'))
+        .order_by('-shared_bands', '-entry_id')[:MAX_CANDIDATES]
+    )
+    numbers, polarity = _numbers(question), _polarity(question)
+    best_entry, best_similarity = None, 0
+    for entry in fresh.filter(id__in=[row['entry_id'] for row in candidates]):
+        if _numbers(entry.question) != numbers or _polarity(entry.question) != polarity:
+            continue
+        similarity = estimated_similarity(signature, entry.signature)
+        if similarity >= SIMILARITY_THRESHOLD and similarity > best_similarity:
+            best_entry, best_similarity = entry, similarity
+    return best_entry, best_similarity
+
+
+def lookup(model, messages, scope, question):
+    """CachedAnswer for the prompt, or for a near-duplicate question in scope; None on a miss"""
+    key = prompt_key(model, messages)
+    cached = _memory_cache.get(key)
+    if cached is not None:
+        answer, match, similarity, created_at = cached
+        _count('memory_hits')
+        return CachedAnswer(answer, match, similarity, int((timezone.now() - created_at).total_seconds()))
+    try:
+        fresh = LLMResponseCacheEntry.objects.filter(created_at__gte=timezone.now() - timedelta(seconds=TTL_SECONDS))
+        entry = fresh.filter(key=key).first()
+        if entry is not None:
+            _touch(entry)
+            _memory_cache.set(key, (entry.answer, 'exact', 1.0, entry.created_at))
+            _count('exact_hits')
+            return CachedAnswer(entry.answer, 'exact', 1.0, _age(entry))
+        entry, similarity = _similar_entry(fresh, scope, question)
+        if entry is not None:
+            _touch(entry)
+            _memory_cache.set(key, (entry.answer, 'similar', similarity, entry.created_at))
+            _count('similar_hits')
+            return CachedAnswer(entry.answer, 'similar', similarity, _age(entry))
+    except DatabaseError as e:
+        print(f"LLM response cache lookup failed: {e}")
+    _count('misses')
+    return None
+
+
+def store(model, messages, scope, question, answer):
+    if not answer:
+        return
+    key = prompt_key(model, messages)
+    now = timezone.now()
+    _memory_cache.set(key, (answer, 'exact', 1.0, now))
+    signature = question_signature(question)
+    try:
+        with transaction.atomic():
+            LLMResponseCacheEntry.objects.filter(key=key).delete()
+            entry = LLMResponseCacheEntry.objects.create(
+                key=key, scope=scope, model=model, question=question, signature=signature,
+                answer=answer, created_at=now, last_used_at=now
+            )
+            LLMResponseCacheBucket.objects.bulk_create([
+                LLMResponseCacheBucket(entry=entry, scope=scope, bucket=bucket) for bucket in band_keys(signature)
+            ])
+        if _count('stores') % EVICT_EVERY == 0:
+            evict_expired_responses()
+    except DatabaseError as e:
+        print(f"LLM response cache store failed: {e}")
+
+
+def cache_headers(response, cached=None, allowed=True):
+    """X-Cache: HIT, MISS or BYPASS; hits also say how they matched and how old the answer is"""
+    if not allowed:
+        response['X-Cache'] = 'BYPASS'
+    elif cached is None:
+        response['X-Cache'] = 'MISS'
+    else:
+        response['X-Cache'] = 'HIT'
+        response['X-Cache-Match'] = cached.match
+        response['X-Cache-Similarity'] = f'{cached.similarity:.2f}'
+        response['Age'] = str(cached.age)
+    return response
@@ -0,0 +1,143 @@
+"""
+Retrieval of the relevant parts of a legal document for a question.
+
+Documents longer than FULL_DOCUMENT_TOKENS are split into chunks of about
+CHUNK_TOKENS (estimated) tokens and indexed in process as sparse TF-IDF
+vectors over hashed word unigrams and bigrams, held in NumPy arrays. A
+question is scored against every chunk with one vectorized pass over the
+index and only the TOP_K best chunks, in document order, are sent to the
+LLM, so the prompt - and the completion latency - no longer grows with the
+length of the document. Indexes are kept in an LRU keyed by document, so
+follow-up questions about the same document skip indexing.
+
+Shorter documents are still sent whole: they fit the prompt anyway and
+retrieval could only drop context.
+"""
+import hashlib
+import threading
+import time
+import zlib
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+
+from .cache import LRUCache
+from .llm import document_excerpts_question_messages, document_question_messages
+from .signatures import normalize_text
+from .summarization import chunk_pages, estimate_tokens
+
+CHUNK_TOKENS = getattr(settings, 'RETRIEVAL_CHUNK_TOKENS', 300)
+TOP_K = getattr(settings, 'RETRIEVAL_TOP_K', 6)
+FULL_DOCUMENT_TOKENS = getattr(settings, 'RETRIEVAL_FULL_DOCUMENT_TOKENS', 3000)
+# Terms are hashed into this many buckets; nothing of this size is ever allocated
+HASH_BITS = 20
+
+_indexes = LRUCache(maxsize=getattr(settings, 'RETRIEVAL_INDEX_CACHE_SIZE', 32))
+_stats = {'full_documents': 0, 'builds': 0, 'build_ms': 0.0, 'searches': 0, 'search_ms': 0.0}
+_stats_lock = threading.Lock()
+
+
+def _count(**amounts):
+    with _stats_lock:
+        for name, amount in amounts.items():
+            _stats[name] += amount
+
+
+def retrieval_stats():
+    """Index and search counters of this process"""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['avg_build_ms'] = round(stats.pop('build_ms') / stats['builds'], 2) if stats['builds'] else 0.0
+    stats['avg_search_ms'] = round(stats.pop('search_ms') / stats['searches'], 3) if stats['searches'] else 0.0
+    stats['cached_indexes'] = len(_indexes)
+    return stats
+
+
+def _term_ids(text):
+    """Hashed unigram and bigram counts of a text"""
+    words = normalize_text(text).split()
+    terms = words + [f'{first} {second}' for first, second in zip(words, words[1:])]
+    mask = (1 << HASH_BITS) - 1
+    return Counter(zlib.crc32(term.encode('utf-8')) & mask for term in terms)
+
+
+class DocumentIndex:
+    """
+    TF-IDF vectors of the chunks of one document in CSR-like form: for
+    every stored weight, the chunk (rows) and hashed term (terms) it
+    belongs to. Rows are L2-normalized, so a dot product is the cosine.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        rows, terms, counts = [], [], []
+        for row, chunk in enumerate(chunks):
+            for term, count in _term_ids(chunk).items():
+                rows.append(row)
+                terms.append(term)
+                counts.append(count)
+        self.rows = np.array(rows, dtype=np.int32)
+        self.terms = np.array(terms, dtype=np.int64)
+        # Every (chunk, term) pair occurs once, so term counts are document frequencies
+        self.vocabulary, frequencies = np.unique(self.terms, return_counts=True)
+        self.idf = (np.log((1 + len(chunks)) / (1 + frequencies)) + 1).astype(np.float32)
+
+        weights = (1 + np.log(np.array(counts, dtype=np.float32))) * self.idf[np.searchsorted(self.vocabulary, self.terms)]
+        norms = np.sqrt(np.bincount(self.rows, weights=weights * weights, minlength=len(chunks)))
+        self.weights = (weights / norms[self.rows]).astype(np.float32)
+
+    def search(self, question, k=TOP_K):
+        """Indexes of the (at most) k chunks most similar to the question, best first"""
+        query = _term_ids(question)
+        if not query or not len(self.vocabulary):
+            return []
+        query_terms = np.array(sorted(query), dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.vocabulary, query_terms), len(self.vocabulary) - 1)
+        known = self.vocabulary[positions] == query_terms
+        query_terms = query_terms[known]
+        if not len(query_terms):
+            return []
+        query_weights = np.array([1 + np.log(query[term]) for term in query_terms.tolist()], dtype=np.float32)
+        query_weights *= self.idf[positions[known]]
+
+        matches = np.isin(self.terms, query_terms)
+        contributions = self.weights[matches] * query_weights[np.searchsorted(query_terms, self.terms[matches])]
+        scores = np.bincount(self.rows[matches], weights=contributions, minlength=len(self.chunks))
+        best = np.argsort(-scores, kind='stable')[:k]
+        return [int(row) for row in best if scores[row] > 0]
+
+
+def document_index(key, pages):
+    index = _indexes.get(key)
+    if index is None:
+        started = time.perf_counter()
+        index = DocumentIndex(chunk_pages(pages, CHUNK_TOKENS))
+        _count(builds=1, build_ms=(time.perf_counter() - started) * 1000)
+        _indexes.set(key, index)
+    return index
+
+
+def document_question_prompt(pages, question, key=None):
+    """
+    Messages for a question about a document: the whole document when it
+    is short, otherwise its TOP_K most relevant chunks. key identifies the
+    document for the index cache (the content hash of stored documents);
+    it defaults to a hash of the text.
+    """
+    text = '\n'.join(pages)
+    if estimate_tokens(text) <= FULL_DOCUMENT_TOKENS:
+        _count(full_documents=1)
+        return document_question_messages(text, question)
+    if key is None:
+        key = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    index = document_index(key, pages)
+
+    started = time.perf_counter()
+    rows = index.search(question)
+    _count(searches=1, search_ms=(time.perf_counter() - started) * 1000)
+    if not rows:
+        # Nothing in common with the question; the opening usually says what the document is
+        rows = list(range(min(TOP_K, len(index.chunks))))
+    excerpts = [(row + 1, index.chunks[row]) for row in sorted(rows)]
+    return document_excerpts_question_messages(excerpts, len(index.chunks), question)
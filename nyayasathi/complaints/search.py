@@ -0,0 +1,160 @@
+"""
+Full-text search over complaint name, location, content and original_content.
+
+SQLite uses an FTS5 table (complaints_complaint_fts, mapped as the unmanaged
+ComplaintSearchIndex model so searches can join it) kept in sync with the
+complaints table by triggers; PostgreSQL uses a generated tsvector column
+with a GIN index. Both are created by migration 0011. Other databases, or a
+SQLite build without FTS5, fall back to an unranked substring filter.
+
+Text is tokenized on whitespace and punctuation only, with combining marks
+kept inside words, so Devanagari and other Indic scripts in original_content
+are searchable as well as the English translation.
+"""
+from django.db import connection, connections
+from django.db.models import BooleanField, F, FloatField, Func, Lookup, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import ComplaintSearchIndex
+from .signatures import normalize_text
+
+FTS_TABLE = 'complaints_complaint_fts'
+SEARCH_FIELDS = ['name', 'location', 'content', 'original_content']
+# bm25 column weights, in SEARCH_FIELDS order
+FIELD_WEIGHTS = [4.0, 2.0, 1.0, 1.0]
+MAX_TERMS = 16
+
+_COLUMNS = ', '.join(SEARCH_FIELDS)
+_NEW_VALUES = ', '.join(f'new.{field}' for field in SEARCH_FIELDS)
+_OLD_VALUES = ', '.join(f'old.{field}' for field in SEARCH_FIELDS)
+
+# Keep combining marks (M*) inside tokens so Indic words are not split at vowel signs
+SQLITE_FTS_TABLE_SQL = f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+    {_COLUMNS},
+    content='complaints_complaint', content_rowid='id',
+    tokenize="unicode61 remove_diacritics 2 categories 'L* N* Co M*'"
+)"""
+# Status and review updates do not touch the index: the update trigger only fires for searched columns
+SQLITE_TRIGGERS = {
+    'complaints_complaint_fts_insert': f"""CREATE TRIGGER IF NOT EXISTS complaints_complaint_fts_insert
+        AFTER INSERT ON complaints_complaint BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {_COLUMNS}) VALUES (new.id, {_NEW_VALUES});
+    END""",
+    'complaints_complaint_fts_delete': f"""CREATE TRIGGER IF NOT EXISTS complaints_complaint_fts_delete
+        AFTER DELETE ON complaints_complaint BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_COLUMNS}) VALUES ('delete', old.id, {_OLD_VALUES});
+    END""",
+    'complaints_complaint_fts_update': f"""CREATE TRIGGER IF NOT EXISTS complaints_complaint_fts_update
+        AFTER UPDATE OF {_COLUMNS} ON complaints_complaint BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_COLUMNS}) VALUES ('delete', old.id, {_OLD_VALUES});
+        INSERT INTO {FTS_TABLE}(rowid, {_COLUMNS}) VALUES (new.id, {_NEW_VALUES});
+    END""",
+}
+SQLITE_REBUILD_SQL = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+
+POSTGRES_SEARCH_SQL = [
+    """ALTER TABLE complaints_complaint ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(location, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(content, '')), 'C') ||
+        setweight(to_tsvector('simple', coalesce(original_content, '')), 'C')
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS complaint_search_idx ON complaints_complaint USING GIN (search_vector)",
+]
+
+_fts_available = None
+
+
+class FullTextMatch(Lookup):
+    """document__match=query: an FTS5 MATCH against the index's hidden table column"""
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+ComplaintSearchIndex._meta.get_field('document').register_lookup(FullTextMatch)
+
+
+def ensure_search_triggers(using='default', **kwargs):
+    """
+    Recreate missing FTS triggers and reindex. Migrations that rebuild the
+    complaints table on SQLite drop its triggers, so this runs after every
+    migrate.
+    """
+    db = connections[using]
+    if db.vendor != 'sqlite':
+        return False
+    with db.cursor() as cursor:
+        if FTS_TABLE not in db.introspection.table_names(cursor):
+            return False
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'complaints_complaint'")
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [name for name in SQLITE_TRIGGERS if name not in existing]
+        for name in missing:
+            cursor.execute(SQLITE_TRIGGERS[name])
+        if missing:
+            cursor.execute(SQLITE_REBUILD_SQL)
+    return bool(missing)
+
+
+def search_terms(query):
+    """Search words of a query; punctuation is dropped so terms are safe in FTS and tsquery syntax"""
+    return normalize_text(query).split()[:MAX_TERMS]
+
+
+def search_backend():
+    global _fts_available
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite':
+        if _fts_available is None:
+            with connection.cursor() as cursor:
+                _fts_available = FTS_TABLE in connection.introspection.table_names(cursor)
+        if _fts_available:
+            return 'fts5'
+    return 'fallback'
+
+
+def search_complaints(queryset, query):
+    """
+    Filter queryset to complaints matching every term of query (prefix
+    matches count) and order them best match first. Adds a search_rank
+    attribute; higher is better.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+    table = queryset.model._meta.db_table
+    backend = search_backend()
+
+    if backend == 'fts5':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        # bm25() is lower for better matches. The join is driven by the MATCH, so the
+        # full-text query runs once and its rowids are looked up in the complaints table
+        rank = Func(
+            F('search_index__document'), *(Value(weight) for weight in FIELD_WEIGHTS),
+            function='bm25', output_field=FloatField(),
+        )
+        return queryset.filter(search_index__document__match=match).annotate(
+            search_rank=-rank
+        ).order_by('-search_rank', '-id')
+
+    if backend == 'postgresql':
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        matches = RawSQL(
+            f"{table}.search_vector @@ to_tsquery('simple', %s)", [tsquery], output_field=BooleanField(),
+        )
+        rank = RawSQL(
+            f"ts_rank({table}.search_vector, to_tsquery('simple', %s))", [tsquery], output_field=FloatField(),
+        )
+        return queryset.filter(matches).annotate(search_rank=rank).order_by('-search_rank', '-id')
+
+    for term in terms:
+        matches_term = Q()
+        for field in SEARCH_FIELDS:
+            matches_term |= Q(**{f'{field}__icontains': term})
+        queryset = queryset.filter(matches_term)
+    return queryset.annotate(search_rank=Value(0.0, output_field=FloatField())).order_by('-submitted_at', '-id')
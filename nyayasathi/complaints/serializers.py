@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
-from .models import Complaint, CustomUser
+from .models import Complaint, CustomUser, Incident
 
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -95,14 +95,94 @@ class ComplaintSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Complaint
-        fields = '__all__'
-        read_only_fields = ['emotion', 'priority', 'user', 'submitted_at', 'updated_at']
+        # minhash is the internal near-duplicate signature
+        exclude = ['minhash']
+        # Analysis results and the triage rank derived from them are set by the server;
+        # status changes go through ComplaintStatusUpdateView
+        read_only_fields = [
+            'emotion', 'priority', 'user', 'submitted_at', 'updated_at', 'claimed_by', 'lease_expires_at',
+            'requires_immediate_attention', 'triage_rank', 'incident', 'rule_version',
+            'threat_level', 'risk_factors', 'status',
+        ]
     
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
         return super().create(validated_data)
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Add original_content for non-English complaints
+        if instance.language and instance.language != 'en':
+            data['original_content'] = instance.content
+        return data
+
+class UserSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CustomUser
+        fields = ('id', 'username', 'user_type', 'cop_id')
+
+class ComplaintListSerializer(serializers.ModelSerializer):
+    """
+    Read-only list representation. Expects the queryset built by
+    ComplaintListCreateView: users joined with select_related and, unless the
+    full text was requested, content/original_content replaced by
+    content_preview/original_preview annotations.
+    """
+    PREVIEW_CHARS = 280
+
+    user = UserSummarySerializer(read_only=True)
+    reviewed_by = UserSummarySerializer(read_only=True)
+    submitted_at = serializers.DateTimeField(format='%Y-%m-%d', read_only=True)
+    content = serializers.SerializerMethodField()
+    original_content = serializers.SerializerMethodField()
+    content_truncated = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Complaint
+        fields = [
+            'id', 'user', 'name', 'location', 'complaint_type', 'language', 'content',
+            'original_content', 'content_truncated', 'audio_file', 'emotion', 'priority',
+            'threat_level', 'risk_factors', 'requires_immediate_attention', 'status', 'reviewed_by',
+            'review_notes', 'claimed_by', 'lease_expires_at', 'incident', 'rule_version', 'submitted_at',
+            'updated_at'
+        ]
+        read_only_fields = fields
+
+    def _text(self, instance, field, preview_field):
+        if hasattr(instance, preview_field):
+            text = getattr(instance, preview_field) or ''
+            return text[:self.PREVIEW_CHARS], len(text) > self.PREVIEW_CHARS
+        return getattr(instance, field), False
+
+    def get_content(self, instance):
+        return self._text(instance, 'content', 'content_preview')[0]
+
+    def get_original_content(self, instance):
+        # Same substitution as ComplaintSerializer for non-English complaints
+        if instance.language and instance.language != 'en':
+            return self.get_content(instance)
+        return self._text(instance, 'original_content', 'original_preview')[0]
+
+    def get_content_truncated(self, instance):
+        return (
+            self._text(instance, 'content', 'content_preview')[1] or
+            self._text(instance, 'original_content', 'original_preview')[1]
+        )
+
 class ComplaintStatusSerializer(serializers.ModelSerializer):
     class Meta:
         model = Complaint
-        fields = ['status', 'review_notes']
\ No newline at end of file
+        fields = ['status', 'review_notes']
+
+class IncidentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Incident
+        fields = ['id', 'location', 'member_count', 'highest_threat_level', 'first_reported_at', 'last_reported_at']
+
+class ComplaintSearchSerializer(ComplaintListSerializer):
+    """List representation plus the relevance score added by search_complaints"""
+    search_rank = serializers.FloatField(read_only=True)
+
+    class Meta(ComplaintListSerializer.Meta):
+        fields = ComplaintListSerializer.Meta.fields + ['search_rank']
+        read_only_fields = fields
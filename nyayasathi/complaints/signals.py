@@ -0,0 +1,70 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .live import publish_complaint
+from .models import Complaint, Incident
+from .stats import apply_stat_change, stat_values
+from .utils import index_complaint_signature, assign_incident
+
+
+@receiver(pre_save, sender=Complaint)
+def remember_stored_values(sender, instance, update_fields=None, **kwargs):
+    """
+    Snapshot the stored bucket values so post_save can move the complaint
+    between buckets, and note whether the content is changing so the text
+    is only reindexed when it has to be.
+    """
+    instance._previous_stat_values = None
+    instance._content_changed = True
+    if instance._state.adding or instance.pk is None:
+        return
+    fields = ['priority', 'status', 'threat_level', 'language', 'submitted_at']
+    if update_fields is None or 'content' in update_fields:
+        fields.append('content')
+    previous = Complaint.objects.filter(pk=instance.pk).values(*fields).first()
+    if previous is not None:
+        instance._previous_stat_values = stat_values(previous)
+        instance._content_changed = 'content' in previous and previous['content'] != instance.content
+
+
+@receiver(post_save, sender=Complaint)
+def update_complaint_stats(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_stat_values', None)
+    if created or previous is not None:
+        apply_stat_change(old=previous, new=stat_values(instance))
+
+
+@receiver(post_save, sender=Complaint)
+def push_complaint_event(sender, instance, created, **kwargs):
+    publish_complaint(instance, created)
+
+
+@receiver(post_save, sender=Complaint)
+def index_complaint_text(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Keep the complaint's MinHash signature and LSH buckets in sync with its
+    content, and cluster it into an incident once it has text. Status and
+    review saves leave the content alone and skip the shingling.
+    """
+    if update_fields is not None and 'content' not in update_fields:
+        return
+    # A complaint saved before signatures existed is indexed on its next save
+    if not created and not getattr(instance, '_content_changed', True) and instance.minhash:
+        return
+    index_complaint_signature(instance)
+    if instance.incident_id is None and instance.minhash:
+        assign_incident(instance)
+
+
+@receiver(post_delete, sender=Complaint)
+def remove_complaint_stats(sender, instance, **kwargs):
+    apply_stat_change(old=stat_values(instance))
+
+
+@receiver(post_delete, sender=Complaint)
+def release_incident_member(sender, instance, **kwargs):
+    if instance.incident_id is not None:
+        Incident.objects.filter(pk=instance.incident_id, member_count__gt=0).update(
+            member_count=F('member_count') - 1
+        )
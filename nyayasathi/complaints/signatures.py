@@ -0,0 +1,70 @@
+"""
+MinHash text signatures and LSH band keys for near-duplicate lookups.
+
+A signature is a short list of integers; two texts agree on each position
+with probability equal to the Jaccard similarity of their character
+shingles. Signatures are split into bands and every band is hashed to one
+bucket key, so near-duplicates can be found with an indexed lookup on the
+keys instead of comparing against every stored text.
+"""
+import hashlib
+import random
+import re
+import string
+import struct
+import zlib
+
+SHINGLE_SIZE = 4
+NUM_PERMUTATIONS = 32
+BAND_ROWS = 2
+NUM_BANDS = NUM_PERMUTATIONS // BAND_ROWS
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Fixed seed: signatures are stored, so they must be identical in every process
+_rng = random.Random(1299709)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+_SEPARATORS = re.compile('[' + re.escape(string.punctuation) + r'\s]+')
+
+def normalize_text(text):
+    """Lowercase and collapse punctuation/whitespace runs into single spaces"""
+    return _SEPARATORS.sub(' ', (text or '').lower()).strip()
+
+def shingles(text):
+    """Set of overlapping character n-grams of the normalized text"""
+    normalized = normalize_text(text)
+    if len(normalized) <= SHINGLE_SIZE:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+
+def minhash(text):
+    """MinHash signature of text; an empty list for blank text"""
+    hashes = [zlib.crc32(shingle.encode('utf-8')) for shingle in shingles(text)]
+    if not hashes:
+        return []
+    return [
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+def band_keys(signature):
+    """One signed 64-bit bucket key per band of the signature"""
+    if len(signature) != NUM_PERMUTATIONS:
+        return []
+    keys = []
+    for band in range(NUM_BANDS):
+        rows = signature[band * BAND_ROWS:(band + 1) * BAND_ROWS]
+        digest = hashlib.blake2b(struct.pack(f'>I{BAND_ROWS}I', band, *rows), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, 'big', signed=True))
+    return keys
+
+def estimated_similarity(signature1, signature2):
+    """Estimated Jaccard similarity of the texts behind two signatures"""
+    if not signature1 or len(signature1) != len(signature2):
+        return 0.0
+    return sum(1 for a, b in zip(signature1, signature2) if a == b) / len(signature1)
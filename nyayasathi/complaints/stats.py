@@ -0,0 +1,85 @@
+"""
+Incrementally maintained complaint counters for the dashboard.
+
+ComplaintStat holds one row per (dimension, value), e.g. ('priority', 'high').
+Signals apply +1/-1 deltas when complaints are created, changed or deleted,
+so reading the dashboard touches O(buckets) rows instead of every complaint.
+Bulk writes that bypass signals must call rebuild_complaint_stats().
+"""
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+
+from .models import Complaint, ComplaintStat
+
+STAT_DIMENSIONS = ['priority', 'status', 'threat_level', 'language', 'day']
+FIELD_DIMENSIONS = ['priority', 'status', 'threat_level', 'language']
+
+
+def stat_values(values):
+    """Map a complaint (model instance or values() dict) to its bucket per dimension"""
+    if not isinstance(values, dict):
+        values = {
+            'priority': values.priority, 'status': values.status,
+            'threat_level': values.threat_level, 'language': values.language,
+            'submitted_at': values.submitted_at,
+        }
+    buckets = {dimension: values.get(dimension) or '' for dimension in FIELD_DIMENSIONS}
+    submitted_at = values.get('submitted_at')
+    buckets['day'] = submitted_at.date().isoformat() if submitted_at else ''
+    return buckets
+
+
+def _bump(dimension, value, delta):
+    updated = ComplaintStat.objects.filter(dimension=dimension, value=value).update(count=F('count') + delta)
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            ComplaintStat.objects.create(dimension=dimension, value=value, count=delta)
+    except IntegrityError:
+        # Another request created the bucket first
+        ComplaintStat.objects.filter(dimension=dimension, value=value).update(count=F('count') + delta)
+
+
+def apply_stat_change(old=None, new=None):
+    """Move one complaint between buckets; old/new are stat_values() dicts or None"""
+    for dimension in STAT_DIMENSIONS:
+        old_value = old[dimension] if old else None
+        new_value = new[dimension] if new else None
+        if old_value == new_value:
+            continue
+        if old is not None:
+            _bump(dimension, old_value, -1)
+        if new is not None:
+            _bump(dimension, new_value, 1)
+
+
+@transaction.atomic
+def rebuild_complaint_stats():
+    """Recompute every counter from the complaints table"""
+    rows = []
+    for dimension in FIELD_DIMENSIONS:
+        for row in Complaint.objects.order_by().values(dimension).annotate(count=Count('id')):
+            rows.append(ComplaintStat(dimension=dimension, value=row[dimension] or '', count=row['count']))
+    days = Complaint.objects.order_by().annotate(day=TruncDate('submitted_at')).values('day').annotate(count=Count('id'))
+    for row in days:
+        rows.append(ComplaintStat(dimension='day', value=row['day'].isoformat() if row['day'] else '', count=row['count']))
+
+    ComplaintStat.objects.all().delete()
+    ComplaintStat.objects.bulk_create(rows)
+    return len(rows)
+
+
+def stats_snapshot(days=None):
+    """Counters grouped by dimension; only the latest `days` day buckets when given"""
+    data = defaultdict(dict)
+    for stat in ComplaintStat.objects.filter(count__gt=0).order_by('dimension', 'value'):
+        data[stat.dimension][stat.value] = stat.count
+    snapshot = {dimension: data.get(dimension, {}) for dimension in STAT_DIMENSIONS}
+    if days is not None:
+        snapshot['day'] = dict(sorted(snapshot['day'].items())[-days:]) if days > 0 else {}
+    snapshot['total'] = sum(data.get('status', {}).values())
+    return snapshot
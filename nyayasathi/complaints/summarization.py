@@ -0,0 +1,140 @@
+"""
+Map-reduce summarization of large legal documents.
+
+The pages of a document are packed into chunks of at most CHUNK_TOKENS
+(estimated) tokens, splitting oversized pages on section, paragraph, line
+and sentence boundaries in that order. Every chunk is summarized on its
+own, SUMMARY_WORKERS at a time, and the partial summaries are merged -
+in parallel groups again while they do not fit one prompt - into the
+messages of the final request. Latency therefore grows with
+chunks / SUMMARY_WORKERS instead of with the page count.
+
+Documents that fit one chunk are summarized with a single request, as
+before.
+"""
+import asyncio
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .llm import (
+    CHUNK_SUMMARY_OPTIONS, acomplete, chunk_summary_messages, combined_summary_messages, complete,
+    merge_summaries_messages, summary_messages
+)
+
+CHUNK_TOKENS = getattr(settings, 'LLM_SUMMARY_CHUNK_TOKENS', 3000)
+SUMMARY_WORKERS = getattr(settings, 'LLM_SUMMARY_WORKERS', 4)
+# Rough size of a token in English and romanized Indian text; no tokenizer is bundled
+CHARS_PER_TOKEN = 4
+
+BOUNDARIES = [
+    # Section headings: "Section 3", "ARTICLE IV", "Chapter 2", "12." or "4.1)"
+    re.compile(r'\n(?=[ \t]*(?:section|article|chapter|part|schedule|clause)\s+[\divxlc]+\b|[ \t]*\d+(?:\.\d+)*[.)]\s)',
+               re.IGNORECASE),
+    re.compile(r'\n[ \t]*\n'),
+    re.compile(r'\n'),
+    re.compile(r'(?<=[.!?;])\s+'),
+]
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _split(text, budget, level=0):
+    if estimate_tokens(text) <= budget:
+        return [text]
+    for boundary in BOUNDARIES[level:]:
+        level += 1
+        parts = [part for part in boundary.split(text) if part.strip()]
+        if len(parts) > 1:
+            return [piece for part in parts for piece in _split(part, budget, level)]
+    size = budget * CHARS_PER_TOKEN
+    return [text[start:start + size] for start in range(0, len(text), size)]
+
+
+def _group(units, budget):
+    """Consecutive units in as few groups of at most budget tokens as possible"""
+    groups, current, used = [], [], 0
+    for unit in units:
+        tokens = estimate_tokens(unit)
+        if current and used + tokens > budget:
+            groups.append(current)
+            current, used = [], 0
+        current.append(unit)
+        used += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+def chunk_pages(pages, budget=CHUNK_TOKENS):
+    units = [piece for page in pages if page.strip() for piece in _split(page.strip(), budget)]
+    return ['\n\n'.join(group) for group in _group(units, budget)]
+
+
+def _merge_groups(summaries, budget):
+    groups = _group(summaries, budget)
+    if len(groups) == len(summaries):
+        # Every summary fills the budget on its own; merge them pairwise
+        groups = [summaries[i:i + 2] for i in range(0, len(summaries), 2)]
+    return groups
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix='summarize')
+        return _pool
+
+
+def summary_prompt(pages, model, budget=CHUNK_TOKENS):
+    """
+    Messages of the final summary request for a document. For documents
+    larger than one chunk this runs the map and merge stages first.
+    """
+    chunks = chunk_pages(pages, budget)
+    if len(chunks) <= 1:
+        return summary_messages(chunks[0] if chunks else '')
+
+    pool = get_pool()
+    summaries = list(pool.map(
+        lambda numbered: complete(
+            model, chunk_summary_messages(numbered[1], numbered[0], len(chunks)), **CHUNK_SUMMARY_OPTIONS
+        ),
+        enumerate(chunks, 1)
+    ))
+    while len(summaries) > 1 and estimate_tokens('\n\n'.join(summaries)) > budget:
+        summaries = list(pool.map(
+            lambda group: complete(model, merge_summaries_messages(group), **CHUNK_SUMMARY_OPTIONS),
+            _merge_groups(summaries, budget)
+        ))
+    return combined_summary_messages(summaries)
+
+
+async def asummary_prompt(pages, model, budget=CHUNK_TOKENS):
+    """Async version of summary_prompt; at most SUMMARY_WORKERS requests per document run at once"""
+    chunks = chunk_pages(pages, budget)
+    if len(chunks) <= 1:
+        return summary_messages(chunks[0] if chunks else '')
+
+    slots = asyncio.Semaphore(SUMMARY_WORKERS)
+
+    async def summarize(messages):
+        async with slots:
+            return await acomplete(model, messages, **CHUNK_SUMMARY_OPTIONS)
+
+    summaries = await asyncio.gather(*[
+        summarize(chunk_summary_messages(chunk, number, len(chunks))) for number, chunk in enumerate(chunks, 1)
+    ])
+    while len(summaries) > 1 and estimate_tokens('\n\n'.join(summaries)) > budget:
+        summaries = await asyncio.gather(*[
+            summarize(merge_summaries_messages(group)) for group in _merge_groups(summaries, budget)
+        ])
+    return combined_summary_messages(summaries)
@@ -1,3 +1,345 @@
-from django.test import TestCase
+import json
+import os
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from . import llm, search, signals, transcription, translation
+from .knowledge_base import KnowledgeBase
+from .models import Complaint, CustomUser
+from .resilience import CircuitBreaker
+from .utils import index_complaint_signature
+
+
+class ComplaintQueryCountTests(TestCase):
+    """The complaint endpoints must cost the same number of queries whatever the page holds"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.citizen = CustomUser.objects.create_user(username='citizen', password='x', user_type='user')
+        cls.other = CustomUser.objects.create_user(username='other', password='x', user_type='user')
+        cls.cop = CustomUser.objects.create_user(username='cop', password='x', user_type='cop', cop_id='C1')
+        for index in range(30):
+            Complaint.objects.create(
+                user=cls.citizen if index % 2 else cls.other, name='Asha', location='Pune',
+                content=f'Complaint number {index} about a stolen bicycle near the market',
+                reviewed_by=cls.cop if index % 3 == 0 else None,
+            )
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=user).key)
+        return client
+
+    def assert_list_queries(self, client, page_size):
+        # Token lookup, then one query for the page
+        with self.assertNumQueries(2):
+            response = client.get('/api/complaints/', {'page_size': page_size})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_list_queries_do_not_grow_with_page_size(self):
+        client = self.client_for(self.citizen)
+        self.assertEqual(len(self.assert_list_queries(client, 1)['results']), 1)
+        self.assertEqual(len(self.assert_list_queries(client, 15)['results']), 15)
+
+    def test_cop_list_queries_do_not_grow_with_page_size(self):
+        client = self.client_for(self.cop)
+        self.assertEqual(len(self.assert_list_queries(client, 2)['results']), 2)
+        data = self.assert_list_queries(client, 30)
+        self.assertEqual(len(data['results']), 30)
+        self.assertTrue(any(result['reviewed_by'] for result in data['results']))
+
+    def test_next_page_costs_the_same(self):
+        client = self.client_for(self.cop)
+        first = self.assert_list_queries(client, 10)
+        with self.assertNumQueries(2):
+            response = client.get(first['next'])
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_full_text_list_costs_the_same(self):
+        client = self.client_for(self.cop)
+        with self.assertNumQueries(2):
+            response = client.get('/api/complaints/', {'page_size': 20, 'full': 1})
+        self.assertEqual(len(response.data['results']), 20)
+
+    def test_failed_ingestion_rows_are_listed_only_on_request(self):
+        Complaint.objects.filter(user=self.citizen).update(status='failed')
+        client = self.client_for(self.citizen)
+        self.assertEqual(self.assert_list_queries(client, 50)['results'], [])
+        response = client.get('/api/complaints/', {'page_size': 50, 'status': 'failed'})
+        self.assertEqual(len(response.data['results']), 15)
+
+    def test_detail_queries(self):
+        complaint = Complaint.objects.filter(reviewed_by=self.cop).first()
+        client = self.client_for(self.cop)
+        # Token lookup, then the complaint joined with both users
+        with self.assertNumQueries(2):
+            response = client.get(f'/api/complaints/{complaint.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['reviewed_by']['username'], 'cop')
+
+
+class ComplaintOwnerUpdateTests(TestCase):
+    """Owners can edit their complaint's text but not move it up the triage queue"""
+
+    def test_patch_cannot_change_analysis_or_triage_rank(self):
+        citizen = CustomUser.objects.create_user(username='citizen', password='x', user_type='user')
+        complaint = Complaint.objects.create(
+            user=citizen, name='Asha', location='Pune', content='Noise at night', threat_level='low', priority='low',
+        )
+        rank = complaint.triage_rank
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=citizen).key)
+        response = client.patch(f'/api/complaints/{complaint.id}/', {
+            'threat_level': 'high', 'risk_factors': ['weapon'], 'status': 'reviewed',
+            'requires_immediate_attention': True, 'triage_rank': 999, 'location': 'Mumbai',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        complaint.refresh_from_db()
+        self.assertEqual(complaint.location, 'Mumbai')
+        self.assertEqual(complaint.threat_level, 'low')
+        self.assertEqual(complaint.status, 'pending')
+        self.assertFalse(complaint.requires_immediate_attention)
+        self.assertEqual(complaint.triage_rank, rank)
+
+
+class ComplaintSignatureIndexTests(TestCase):
+    """The MinHash signature is only recomputed when a save changes the content"""
+
+    def test_saves_that_keep_the_content_skip_reindexing(self):
+        citizen = CustomUser.objects.create_user(username='citizen', password='x', user_type='user')
+        with mock.patch.object(signals, 'index_complaint_signature', wraps=index_complaint_signature) as index:
+            complaint = Complaint.objects.create(
+                user=citizen, name='Asha', location='Pune', content='Water leak in the street',
+            )
+            self.assertEqual(index.call_count, 1)
+            signature = complaint.minhash
+
+            complaint.status = 'under_review'
+            complaint.threat_level = 'medium'
+            complaint.save()
+            Complaint.objects.get(pk=complaint.pk).save()
+            self.assertEqual(index.call_count, 1)
+
+            complaint.content = 'Water leak in the street flooding the market'
+            complaint.save()
+            self.assertEqual(index.call_count, 2)
+        complaint.refresh_from_db()
+        self.assertNotEqual(complaint.minhash, signature)
+
+
+class ComplaintSearchTests(TestCase):
+    """Search matches every term by prefix and puts the best match first"""
+
+    @classmethod
+    def setUpTestData(cls):
+        citizen = CustomUser.objects.create_user(username='citizen', password='x', user_type='user')
+        cls.cop = CustomUser.objects.create_user(username='cop', password='x', user_type='cop', cop_id='C1')
+        cls.in_location = Complaint.objects.create(
+            user=citizen, name='Ravi', location='Market road', content='My phone was stolen',
+        )
+        cls.in_name = Complaint.objects.create(
+            user=citizen, name='Market vendor', location='Pune', content='A phone was snatched',
+        )
+        Complaint.objects.create(user=citizen, name='Asha', location='Pune', content='Market stall was damaged')
+        Complaint.objects.create(user=citizen, name='Asha', location='Pune', content='Noise from a phone tower')
+        cls.hindi = Complaint.objects.create(
+            user=citizen, name='Asha', location='Pune', content='Bicycle stolen',
+            original_content='मेरी साइकिल चोरी हो गई',
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.cop).key)
+
+    def search(self, query):
+        response = self.client.get('/api/complaints/search/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [result['id'] for result in response.data['results']]
+
+    def test_every_term_must_match_and_name_ranks_highest(self):
+        self.assertEqual(self.search('phon mark'), [self.in_name.id, self.in_location.id])
+
+    def test_original_content_is_searchable(self):
+        self.assertEqual(self.search('साइकिल'), [self.hindi.id])
+        self.assertEqual(self.search('nothing-like-this'), [])
+
+
+class ComplaintSearchScaleTests(TestCase):
+    """A common term over a few thousand complaints is one query that runs the full-text match once"""
+    ROWS = 4000
+    # A MATCH re-run per candidate row took over a second at this size
+    MAX_SECONDS = 0.5
+
+    @classmethod
+    def setUpTestData(cls):
+        citizen = CustomUser.objects.create_user(username='citizen', password='x', user_type='user')
+        cls.cop = CustomUser.objects.create_user(username='cop', password='x', user_type='cop', cop_id='C1')
+        Complaint.objects.bulk_create(
+            Complaint(user=citizen, name='Asha', location='Pune', content=f'Water leak number {index} in the street')
+            for index in range(cls.ROWS)
+        )
+
+    def test_search_cost_does_not_grow_with_matches_squared(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.cop).key)
+        search.search_backend()  # the once-per-process check for the FTS table
+        start = time.perf_counter()
+        # Token lookup, then the ranked page
+        with self.assertNumQueries(2):
+            response = client.get('/api/complaints/search/', {'q': 'water leak'})
+        self.assertLess(time.perf_counter() - start, self.MAX_SECONDS)
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertIsNotNone(response.data['next'])
+
+
+class KnowledgeBaseTests(SimpleTestCase):
+    """Only IPC/BNS questions are answered from the bundled sections"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.knowledge_base = KnowledgeBase.load()
+
+    def answered_sections(self, question):
+        matched = self.knowledge_base.match(question)
+        return None if matched is None else [self.knowledge_base.sections[index]['ipc'] for index in matched[1]]
+
+    def test_section_numbers_of_other_statutes_go_to_the_llm(self):
+        for question in (
+            'What is section 302 CrPC?', 'section 379 BNSS', 'section 354 of the IT act',
+            'section 65 of the evidence act', 'Which section of the IT act covers theft?',
+        ):
+            with self.subTest(question=question):
+                self.assertIsNone(self.answered_sections(question))
+
+    def test_ipc_and_bns_questions_are_answered_locally(self):
+        self.assertEqual(self.answered_sections('What is IPC 302?'), ['302'])
+        self.assertEqual(self.answered_sections('BNS section 103'), ['302'])
+        self.assertEqual(self.answered_sections('Which section covers theft?'), ['379'])
+        # Statute words inside an offence name are part of the offence
+        self.assertEqual(self.answered_sections('Which section covers obscene act?'), ['294'])
+
+
+class TranslationBatcherBreakerTests(SimpleTestCase):
+    """Falling back to one call per text stops as soon as the breaker opens"""
+
+    def test_open_breaker_resolves_the_rest_of_the_chunk_untranslated(self):
+        breaker = CircuitBreaker('google-translate-test', failures=3)
+        batcher = translation.TranslationBatcher('hi', 'en', window=0.05)
+        batcher.translator = mock.Mock()
+        batcher.translator.translate.side_effect = requests.ConnectionError('Google is down')
+        with mock.patch.object(translation, 'circuit', breaker):
+            futures = [batcher.submit(f'text {index}')[0] for index in range(5)]
+            results = []
+            for future in futures:
+                try:
+                    results.append(future.result(timeout=5))
+                except requests.ConnectionError:
+                    results.append('error')
+        # The joined call and two single calls fail, which opens the breaker
+        self.assertEqual(batcher.translator.translate.call_count, 3)
+        self.assertEqual(results, ['error', 'error', None, None, None])
+
+
+class _TranscriptionHandler(BaseHTTPRequestHandler):
+    """Stand-in for the Groq transcription API: reads and discards the upload, reporting its size"""
+
+    def do_POST(self):
+        received = 0
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                if not size:
+                    self.rfile.readline()
+                    break
+                received += len(self.rfile.read(size))
+                self.rfile.readline()
+        else:
+            remaining = int(self.headers['Content-Length'])
+            while remaining:
+                received += len(self.rfile.read(min(remaining, 1024 * 1024)))
+                remaining = int(self.headers['Content-Length']) - received
+        body = json.dumps({'text': f'received {received} bytes'}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(TRANSCRIPTION_BACKEND='groq', TRANSCRIPTION_FALLBACK=False)
+class AudioUploadStressTests(TestCase):
+    """Large audio uploads are streamed to the backend, never held in memory or copied"""
+    UPLOAD_BYTES = 50 * 1024 * 1024
+    # Python allocations allowed while a 50 MB upload is transcribed
+    MAX_PEAK_BYTES = 5 * 1024 * 1024
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _TranscriptionHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}/openai/v1/audio/transcriptions'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def large_upload(self):
+        upload = TemporaryUploadedFile('complaint.wav', 'audio/wav', self.UPLOAD_BYTES, None)
+        chunk = os.urandom(1024 * 1024)
+        for _ in range(self.UPLOAD_BYTES // len(chunk)):
+            upload.write(chunk)
+        upload.seek(0)
+        self.addCleanup(upload.close)
+        return upload
+
+    def test_groq_upload_memory_stays_bounded(self):
+        upload = self.large_upload()
+        # A gateway of its own, so its client is built with the test key and URL
+        with mock.patch.object(llm, 'GROQ_TRANSCRIPTION_URL', self.url), \
+                mock.patch.object(llm, 'GROQ_API_KEY', 'test-key'), \
+                mock.patch.object(llm, 'gateway', llm.LLMGateway()), \
+                mock.patch.object(transcription, 'GROQ_API_KEY', 'test-key'):
+            transcription.transcribe(upload.name, upload)  # warm up the connection pool
+            tracemalloc.start()
+            try:
+                transcript = transcription.transcribe(upload.name, upload)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        # The multipart body wraps the whole upload
+        self.assertGreater(int(transcript.split()[1]), self.UPLOAD_BYTES)
+        self.assertLess(peak, self.MAX_PEAK_BYTES)
+        # Rewound so the view can still store the upload on the complaint
+        self.assertEqual(upload.tell(), 0)
+
+    def test_local_backend_reuses_the_spooled_upload(self):
+        upload = self.large_upload()
+        backend = transcription.LocalWhisperBackend()
+        with mock.patch.object(backend, 'transcribe_path', return_value='text') as transcribe_path:
+            self.assertEqual(backend.transcribe(upload.name, upload), 'text')
+        transcribe_path.assert_called_once_with(upload.temporary_file_path())
+
+    def test_local_backend_removes_its_temp_file(self):
+        upload = SimpleUploadedFile('complaint.webm', b'audio' * 1000)
+        backend = transcription.LocalWhisperBackend()
+        with mock.patch.object(backend, 'transcribe_path', return_value='text') as transcribe_path:
+            backend.transcribe(upload.name, upload)
+        path = transcribe_path.call_args.args[0]
+        self.assertFalse(os.path.exists(path))
@@ -0,0 +1,287 @@
+"""
+Rate limiting and admission control for the endpoints that call paid,
+slow upstream APIs (Groq chat completions and transcription).
+
+Two independent checks protect them:
+
+* Token-bucket throttles per user and per client IP. Rates use the REST
+  framework format ('30/min' is a burst of 30 refilled at 30 per minute)
+  from DEFAULT_THROTTLE_RATES, under '<scope>_user' and '<scope>_ip'.
+  Buckets live in process memory, or in the ThrottleBucket table when
+  THROTTLE_STORE is 'database' so every worker shares them.
+* A cap on the calls each process has in flight to an upstream at once
+  (UPSTREAM_CONCURRENCY), taken around the call itself by the LLM gateway.
+  A request whose call finds the cap reached is answered with 429 right
+  away instead of queueing behind the others; streamed answers get an
+  error event instead.
+
+Both answer 429 with a Retry-After header.
+"""
+import asyncio
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+STORE = getattr(settings, 'THROTTLE_STORE', 'memory')
+UPSTREAM_CONCURRENCY = getattr(settings, 'UPSTREAM_CONCURRENCY', {'groq': 32, 'transcription': 8})
+MEMORY_MAX_BUCKETS = 10000
+UPDATE_ATTEMPTS = 5
+PURGE_EVERY = 1000
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """(capacity, tokens per second) of a rate such as '30/min', or None"""
+    if not rate:
+        return None
+    count, period = rate.split('/')
+    return int(count), int(count) / PERIODS[period[0]]
+
+
+class MemoryBucketStore:
+    """Buckets of this process"""
+    blocking = False
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _prune(self, now):
+        # Buckets that have refilled completely carry no state
+        full = [key for key, (_, _, full_at) in self._buckets.items() if full_at <= now]
+        for key in full:
+            del self._buckets[key]
+
+    def take(self, buckets):
+        """
+        Seconds to wait before every (key, capacity, rate) bucket has a token;
+        0 means one was taken from each. Nothing is taken when any would refuse.
+        """
+        now = time.monotonic()
+        with self._lock:
+            refilled, wait = [], 0
+            for key, capacity, rate in buckets:
+                tokens, updated_at, _ = self._buckets.get(key, (capacity, now, now))
+                tokens = min(capacity, tokens + (now - updated_at) * rate)
+                if tokens < 1:
+                    wait = max(wait, (1 - tokens) / rate)
+                refilled.append((key, capacity, rate, tokens))
+            if wait:
+                return wait
+            for key, capacity, rate, tokens in refilled:
+                tokens -= 1
+                self._buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+            if len(self._buckets) > MEMORY_MAX_BUCKETS:
+                self._prune(now)
+            return 0
+
+
+class _Conflict(Exception):
+    """Another worker changed a bucket between reading and spending it"""
+
+
+class DatabaseBucketStore:
+    """
+    Buckets in the ThrottleBucket table. Tokens are taken in one transaction
+    of conditional UPDATEs on the values that were read, so concurrent
+    workers never both spend the same token; the loser rolls back, re-reads
+    and tries again.
+    """
+    blocking = True
+
+    def __init__(self):
+        self._takes = 0
+
+    def take(self, buckets):
+        """Same as MemoryBucketStore.take"""
+        from .models import ThrottleBucket
+
+        self._takes += 1
+        if self._takes % PURGE_EVERY == 0:
+            ThrottleBucket.objects.filter(updated_at__lt=time.time() - 86400).delete()
+        for _ in range(UPDATE_ATTEMPTS):
+            now = time.time()
+            refilled, wait = [], 0
+            for key, capacity, rate in buckets:
+                row = ThrottleBucket.objects.filter(key=key).values_list('tokens', 'updated_at').first()
+                tokens = capacity if row is None else min(capacity, row[0] + max(now - row[1], 0) * rate)
+                if tokens < 1:
+                    wait = max(wait, (1 - tokens) / rate)
+                refilled.append((key, row, tokens))
+            if wait:
+                return wait
+            try:
+                with transaction.atomic():
+                    for key, row, tokens in refilled:
+                        if row is None:
+                            ThrottleBucket.objects.create(key=key, tokens=tokens - 1, updated_at=now)
+                        elif not ThrottleBucket.objects.filter(key=key, tokens=row[0], updated_at=row[1]).update(
+                            tokens=tokens - 1, updated_at=now
+                        ):
+                            raise _Conflict()
+                return 0
+            except (IntegrityError, _Conflict):
+                continue
+        # Too much contention on these buckets; that client is clearly busy enough
+        return max(1 / rate for _, _, rate in buckets)
+
+
+store = DatabaseBucketStore() if STORE == 'database' else MemoryBucketStore()
+
+
+def client_ip(request):
+    """Client address, honouring X-Forwarded-For like the REST framework throttles"""
+    return BaseThrottle().get_ident(request)
+
+
+def throttle_keys(scope, user, request):
+    """(key, rate) of every bucket a request spends a token from"""
+    rates = api_settings.DEFAULT_THROTTLE_RATES
+    keys = []
+    if user is not None and user.is_authenticated and rates.get(f'{scope}_user'):
+        keys.append((f'throttle:{scope}:user:{user.pk}', rates[f'{scope}_user']))
+    if rates.get(f'{scope}_ip'):
+        keys.append((f'throttle:{scope}:ip:{client_ip(request)}', rates[f'{scope}_ip']))
+    return keys
+
+
+def throttle_wait(scope, user, request):
+    """Seconds until the request would be allowed; 0 when it is, after taking its tokens"""
+    buckets = [(key, *parse_rate(rate)) for key, rate in throttle_keys(scope, user, request)]
+    return store.take(buckets) if buckets else 0
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """REST framework throttle over the per-user and per-IP buckets of its scope"""
+    scope = None
+
+    def allow_request(self, request, view):
+        self._wait = throttle_wait(self.scope, request.user, request)
+        return not self._wait
+
+    def wait(self):
+        return self._wait
+
+
+class LLMThrottle(TokenBucketThrottle):
+    scope = 'llm'
+
+
+class TranscriptionThrottle(TokenBucketThrottle):
+    scope = 'transcription'
+
+
+def throttled_response(wait):
+    """429 of the async endpoints, worded like the REST framework's"""
+    seconds = max(math.ceil(wait), 1)
+    response = JsonResponse({'detail': f'Request was throttled. Expected available in {seconds} seconds.'}, status=429)
+    response['Retry-After'] = str(seconds)
+    return response
+
+
+class UpstreamBusy(Exception):
+    def __init__(self, name, retry_after):
+        super().__init__(f'{name} is busy')
+        self.retry_after = retry_after
+
+
+class UpstreamLimiter:
+    """
+    Non-blocking cap on the requests of this process in flight to one
+    upstream. Retry-After is the average time requests held a slot
+    recently, as that is roughly when the next one frees up.
+    """
+
+    def __init__(self, name, limit):
+        self.name = name
+        self.limit = limit
+        self.in_flight = 0
+        self.rejected = 0
+        self._avg_seconds = 1.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self.in_flight >= self.limit:
+                self.rejected += 1
+                raise UpstreamBusy(self.name, max(math.ceil(self._avg_seconds), 1))
+            self.in_flight += 1
+        return time.monotonic()
+
+    def release(self, started):
+        with self._lock:
+            self.in_flight -= 1
+            # Exponentially weighted, so it follows the upstream when it slows down
+            self._avg_seconds = 0.9 * self._avg_seconds + 0.1 * (time.monotonic() - started)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'limit': self.limit, 'in_flight': self.in_flight, 'rejected': self.rejected,
+                'avg_seconds': round(self._avg_seconds, 3),
+            }
+
+
+upstreams = {name: UpstreamLimiter(name, limit) for name, limit in UPSTREAM_CONCURRENCY.items()}
+
+
+def upstream_stats():
+    return {name: limiter.stats() for name, limiter in upstreams.items()}
+
+
+def busy_response(busy):
+    response = JsonResponse(
+        {'error': f'The server is busy. Please try again in {busy.retry_after} seconds.'}, status=429
+    )
+    response['Retry-After'] = str(busy.retry_after)
+    return response
+
+
+@contextmanager
+def hold_upstream(name):
+    """
+    One of this process's UPSTREAM_CONCURRENCY[name] slots for the duration
+    of an upstream call; raises UpstreamBusy right away when none is free.
+    """
+    limiter = upstreams.get(name)
+    if limiter is None:
+        yield
+        return
+    started = limiter.acquire()
+    try:
+        yield
+    finally:
+        limiter.release(started)
+
+
+def shed_when_busy(view):
+    """
+    Decorator for views (sync or async) calling an upstream through
+    hold_upstream: answers 429 with Retry-After when a call found the
+    upstream full. Views that never reach the upstream, such as
+    knowledge-base answers, never take a slot.
+    """
+    if asyncio.iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            try:
+                return await view(request, *args, **kwargs)
+            except UpstreamBusy as busy:
+                return busy_response(busy)
+    else:
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                return view(request, *args, **kwargs)
+            except UpstreamBusy as busy:
+                return busy_response(busy)
+    return wrapper
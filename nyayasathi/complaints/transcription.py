@@ -0,0 +1,208 @@
+"""
+Speech-to-text engines.
+
+Two backends implement the same transcribe(filename, file) call:
+
+* GroqBackend streams the audio to the Groq Whisper API through the LLM
+  gateway (pooled connections, retries, metrics).
+* LocalWhisperBackend runs openai-whisper on this machine. The model is
+  loaded once per worker process of a bounded process pool, so CPU-bound
+  decoding never runs on web threads and weights are not reloaded per call.
+
+transcribe() uses the backend named by TRANSCRIPTION_BACKEND and falls back
+to the other one when it is unavailable or fails. When neither can run
+because Groq's circuit breaker is open, it raises TranscriptionUnavailable
+so callers can queue the audio for later instead of failing it.
+"""
+import importlib.util
+import io
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from django.conf import settings
+
+from .llm import GROQ_API_KEY, LLMUnavailable, transcribe_audio
+from .throttling import UpstreamBusy
+
+GROQ_TRANSCRIPTION_MODEL = "distil-whisper-large-v3-en"
+
+
+class TranscriptionError(Exception):
+    pass
+
+
+class TranscriptionUnavailable(TranscriptionError):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class UploadStream(io.RawIOBase):
+    """
+    Read-only binary stream over a Django File (upload, temp upload or stored
+    file). The HTTP client reads it in fixed-size chunks, so an upload is
+    forwarded without buffering it in memory or copying it to another file.
+    """
+
+    def __init__(self, django_file):
+        self._file = django_file
+        self._file.seek(0)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._file.read(len(buffer))
+        size = len(data)
+        buffer[:size] = data
+        return size
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        self._file.seek(offset, whence)
+        return self._file.tell()
+
+    def tell(self):
+        return self._file.tell()
+
+
+class GroqBackend:
+    name = 'groq'
+
+    def available(self):
+        return bool(GROQ_API_KEY)
+
+    def transcribe(self, filename, file):
+        try:
+            return transcribe_audio(GROQ_TRANSCRIPTION_MODEL, filename, UploadStream(file))
+        finally:
+            # Callers usually store the same file afterwards
+            file.seek(0)
+
+
+# Set in each pool process by _load_model; never touched in the web process
+_worker_model = None
+
+
+def _load_model(model_name):
+    global _worker_model
+    import whisper
+    _worker_model = whisper.load_model(model_name)
+
+
+def _transcribe_in_worker(path):
+    return _worker_model.transcribe(path)["text"]
+
+
+def _warm_up():
+    return _worker_model is not None
+
+
+class LocalWhisperBackend:
+    name = 'local'
+
+    def __init__(self):
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def available(self):
+        # The PyPI package called "whisper" is an unrelated project without load_model
+        if importlib.util.find_spec('whisper') is None:
+            return False
+        import whisper
+        return hasattr(whisper, 'load_model')
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=getattr(settings, 'TRANSCRIPTION_LOCAL_WORKERS', 1),
+                    # spawn: never fork a web worker that already runs threads
+                    mp_context=get_context('spawn'),
+                    initializer=_load_model,
+                    initargs=(getattr(settings, 'TRANSCRIPTION_LOCAL_MODEL', 'tiny'),),
+                )
+            return self._pool
+
+    def preload(self):
+        """Start the pool and load the model in every worker process"""
+        pool = self._get_pool()
+        workers = getattr(settings, 'TRANSCRIPTION_LOCAL_WORKERS', 1)
+        for future in [pool.submit(_warm_up) for _ in range(workers)]:
+            future.result()
+
+    def transcribe_path(self, path):
+        future = self._get_pool().submit(_transcribe_in_worker, path)
+        return future.result(timeout=getattr(settings, 'TRANSCRIPTION_LOCAL_TIMEOUT_SECONDS', 300))
+
+    def transcribe(self, filename, file):
+        # Whisper decodes from a path; reuse the upload's own spool file when it has one
+        if hasattr(file, 'temporary_file_path'):
+            return self.transcribe_path(file.temporary_file_path())
+        suffix = os.path.splitext(filename)[1] or '.webm'
+        with tempfile.NamedTemporaryFile(suffix=suffix) as tmp:
+            file.seek(0)
+            shutil.copyfileobj(UploadStream(file), tmp)
+            tmp.flush()
+            try:
+                return self.transcribe_path(tmp.name)
+            finally:
+                file.seek(0)
+
+
+BACKENDS = {
+    'groq': GroqBackend(),
+    'local': LocalWhisperBackend(),
+}
+
+
+def backend_order():
+    primary = getattr(settings, 'TRANSCRIPTION_BACKEND', 'groq')
+    order = [primary] + [name for name in BACKENDS if name != primary]
+    if not getattr(settings, 'TRANSCRIPTION_FALLBACK', True):
+        order = order[:1]
+    return [BACKENDS[name] for name in order if name in BACKENDS]
+
+
+def transcription_available():
+    return any(backend.available() for backend in backend_order())
+
+
+def transcribe(filename, file):
+    """Transcribe an audio file with the configured backend, falling back to the other"""
+    errors = []
+    failed = False
+    retry_after = None
+    for backend in backend_order():
+        if not backend.available():
+            errors.append(f"{backend.name}: not configured")
+            continue
+        try:
+            return backend.transcribe(filename, file)
+        except UpstreamBusy:
+            # Too many transcriptions in flight in this process; the caller answers 429 or retries
+            raise
+        except LLMUnavailable as e:
+            errors.append(f"{backend.name}: {e}")
+            retry_after = e.retry_after
+        except Exception as e:
+            errors.append(f"{backend.name}: {e}")
+            failed = True
+    if retry_after is not None and not failed:
+        raise TranscriptionUnavailable('; '.join(errors), retry_after)
+    raise TranscriptionError('; '.join(errors))
+
+
+def preload_transcription_backends():
+    """Load the local model at startup when TRANSCRIPTION_PRELOAD is set"""
+    if not getattr(settings, 'TRANSCRIPTION_PRELOAD', False):
+        return
+    local = BACKENDS['local']
+    if local.available():
+        local.preload()
@@ -0,0 +1,338 @@
+"""
+Cached translation in front of GoogleTranslator.
+
+Translations are keyed by a hash of (source, target, text) and looked up in
+an in-process LRU first, then in the TranslationCacheEntry table. Misses in
+both tiers are handed to a per-language TranslationBatcher, which coalesces
+concurrent requests into batched calls on one reused translator.
+
+Translator calls report to the 'google-translate' circuit breaker. While
+it is open, translate_text returns the text untranslated right away.
+deep_translator sends its requests without a timeout, so each call runs in
+a thread of its own and is abandoned after CALL_TIMEOUT_SECONDS; a hung
+call never holds up the batcher or the breaker's half-open probe.
+"""
+import hashlib
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from datetime import timedelta
+
+import requests
+from deep_translator import GoogleTranslator
+from deep_translator.exceptions import RequestError, TooManyRequests
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+
+from .cache import LRUCache
+from .models import TranslationCacheEntry
+from .resilience import circuit_breaker
+
+TTL_SECONDS = getattr(settings, 'TRANSLATION_CACHE_TTL_SECONDS', 30 * 24 * 3600)
+MAX_ENTRIES = getattr(settings, 'TRANSLATION_CACHE_MAX_ENTRIES', 100000)
+EVICT_EVERY = 100
+
+BATCH_WINDOW_SECONDS = getattr(settings, 'TRANSLATION_BATCH_WINDOW_SECONDS', 0.02)
+BATCH_TIMEOUT_SECONDS = getattr(settings, 'TRANSLATION_BATCH_TIMEOUT_SECONDS', 30)
+CALL_TIMEOUT_SECONDS = getattr(settings, 'TRANSLATION_CALL_TIMEOUT_SECONDS', 10)
+# GoogleTranslator rejects payloads over 5000 characters
+MAX_BATCH_CHARS = 4500
+BATCH_SEPARATOR = '\n'
+# Translations slower than this count as failures for the circuit breaker
+SLOW_CALL_SECONDS = getattr(settings, 'TRANSLATION_SLOW_CALL_SECONDS', 5)
+# Errors that say Google Translate is unreachable or overloaded, rather than that the text was bad
+UPSTREAM_ERRORS = (requests.RequestException, RequestError, TooManyRequests)
+
+circuit = circuit_breaker(
+    'google-translate', timeout_seconds=CALL_TIMEOUT_SECONDS, slow_call_seconds=SLOW_CALL_SECONDS
+)
+
+_memory_cache = LRUCache(
+    maxsize=getattr(settings, 'TRANSLATION_CACHE_MEMORY_SIZE', 2048), ttl=TTL_SECONDS
+)
+_stats = {
+    'memory_hits': 0, 'db_hits': 0, 'misses': 0, 'stores': 0, 'evicted': 0,
+    'coalesced': 0, 'batches': 0, 'batched_texts': 0, 'upstream_calls': 0, 'abandoned_calls': 0,
+    'untranslated': 0,
+}
+_stats_lock = threading.Lock()
+
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+        return _stats[name]
+
+
+def translation_cache_stats():
+    """Hit/miss counters of this process"""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['memory_hits'] + stats['db_hits'] + stats['misses']
+    stats['hit_rate'] = (stats['memory_hits'] + stats['db_hits']) / lookups if lookups else 0.0
+    stats['memory_entries'] = len(_memory_cache)
+    return stats
+
+
+def cache_key(text, source, target):
+    return hashlib.sha256(f"{source}\0{target}\0{text}".encode('utf-8')).hexdigest()
+
+
+def evict_expired_translations():
+    """Drop expired rows, then the least recently used rows beyond MAX_ENTRIES"""
+    expired, _ = TranslationCacheEntry.objects.filter(
+        created_at__lt=timezone.now() - timedelta(seconds=TTL_SECONDS)
+    ).delete()
+    overflow = TranslationCacheEntry.objects.count() - MAX_ENTRIES
+    trimmed = 0
+    if overflow > 0:
+        stale_ids = list(
+            TranslationCacheEntry.objects.order_by('last_used_at').values_list('id', flat=True)[:overflow]
+        )
+        trimmed, _ = TranslationCacheEntry.objects.filter(id__in=stale_ids).delete()
+    _count('evicted', expired + trimmed)
+    return expired + trimmed
+
+
+def _lookup(key):
+    translated = _memory_cache.get(key)
+    if translated is not None:
+        _count('memory_hits')
+        return translated
+    try:
+        entry = TranslationCacheEntry.objects.filter(
+            key=key, created_at__gte=timezone.now() - timedelta(seconds=TTL_SECONDS)
+        ).first()
+        if entry is not None:
+            # Touching every hit would turn reads into writes; an hour of slack is plenty for LRU
+            if entry.last_used_at < timezone.now() - timedelta(hours=1):
+                TranslationCacheEntry.objects.filter(pk=entry.pk).update(last_used_at=timezone.now())
+            _memory_cache.set(key, entry.translated_text)
+            _count('db_hits')
+            return entry.translated_text
+    except DatabaseError as e:
+        print(f"Translation cache lookup failed: {e}")
+    return None
+
+
+def _store(key, source, target, translated):
+    _memory_cache.set(key, translated)
+    try:
+        now = timezone.now()
+        # Single upsert statement: no read-then-write transaction to contend on
+        TranslationCacheEntry.objects.bulk_create(
+            [TranslationCacheEntry(
+                key=key, source_lang=source, target_lang=target,
+                translated_text=translated, created_at=now, last_used_at=now
+            )],
+            update_conflicts=True,
+            unique_fields=['key'],
+            update_fields=['translated_text', 'created_at', 'last_used_at']
+        )
+        if _count('stores') % EVICT_EVERY == 0:
+            evict_expired_translations()
+    except DatabaseError as e:
+        print(f"Translation cache store failed: {e}")
+
+
+def _abandonable_call(function, *args):
+    """Future of function(*args) run in a daemon thread, which the caller may stop waiting for"""
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(function(*args))
+        except Exception as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name='translate-call', daemon=True).start()
+    return future
+
+
+class TranslationBatcher:
+    """
+    Coalesces concurrent translations for one language pair.
+
+    Callers submit texts and wait on a Future. A single worker thread per
+    batcher waits BATCH_WINDOW_SECONDS for more texts to arrive, drops
+    duplicates (identical texts already queued or in flight share one
+    Future), and translates the batch with one reused GoogleTranslator.
+    Single-line texts are joined into newline-separated payloads of up to
+    MAX_BATCH_CHARS; if the translation does not come back with the same
+    number of lines, the texts are translated one by one instead. Texts of
+    an 'auto' batcher are never joined: Google detects a single language
+    per payload, so texts in different languages would come back wrong.
+
+    Every upstream call after the first of a batch asks the circuit breaker
+    first; once it has opened, the rest of the batch resolves to None
+    (untranslated) instead of waiting on more calls.
+    """
+
+    def __init__(self, source, target, window=BATCH_WINDOW_SECONDS):
+        self.source = source
+        self.target = target
+        self.window = window
+        self.translator = GoogleTranslator(source=source, target=target)
+        self._pending = {}
+        self._in_flight = {}
+        self._condition = threading.Condition()
+        self._first_call = False
+        self._worker = threading.Thread(
+            target=self._run, name=f'translate-{source}-{target}', daemon=True
+        )
+        self._worker.start()
+
+    def submit(self, text):
+        """Queue text; returns (future, created) where created is False for coalesced texts"""
+        with self._condition:
+            future = self._pending.get(text) or self._in_flight.get(text)
+            if future is not None:
+                _count('coalesced')
+                return future, False
+            future = Future()
+            self._pending[text] = future
+            self._condition.notify()
+            return future, True
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+            # Let concurrent requests join this batch
+            time.sleep(self.window)
+            with self._condition:
+                batch, self._pending = self._pending, {}
+                self._in_flight.update(batch)
+            try:
+                self._translate_batch(batch)
+            except Exception as e:
+                for future in batch.values():
+                    if not future.done():
+                        future.set_exception(e)
+            finally:
+                with self._condition:
+                    for text in batch:
+                        self._in_flight.pop(text, None)
+
+    def _translate_batch(self, batch):
+        _count('batches')
+        _count('batched_texts', len(batch))
+        self._first_call = True
+        chunk, chunk_chars = [], 0
+        for text, future in batch.items():
+            if self.source == 'auto' or BATCH_SEPARATOR in text.strip() or len(text) > MAX_BATCH_CHARS:
+                self._translate_one(text, future)
+                continue
+            if chunk and chunk_chars + len(text) + len(BATCH_SEPARATOR) > MAX_BATCH_CHARS:
+                self._translate_chunk(chunk)
+                chunk, chunk_chars = [], 0
+            chunk.append((text, future))
+            chunk_chars += len(text) + len(BATCH_SEPARATOR)
+        if chunk:
+            self._translate_chunk(chunk)
+
+    def _call_allowed(self):
+        """translate_text already asked the breaker for the batch's first call"""
+        if self._first_call:
+            self._first_call = False
+            return True
+        return circuit.allow()
+
+    def _translate_chunk(self, chunk):
+        if len(chunk) == 1:
+            self._translate_one(*chunk[0])
+            return
+        if not self._call_allowed():
+            for _, future in chunk:
+                future.set_result(None)
+            return
+        try:
+            joined = self._call(BATCH_SEPARATOR.join(text.strip() for text, _ in chunk))
+            lines = (joined or '').split(BATCH_SEPARATOR)
+        except Exception:
+            lines = []
+        if len(lines) != len(chunk):
+            for text, future in chunk:
+                self._translate_one(text, future)
+            return
+        for (text, future), line in zip(chunk, lines):
+            future.set_result(line.strip())
+
+    def _translate_one(self, text, future):
+        if not self._call_allowed():
+            future.set_result(None)
+            return
+        try:
+            future.set_result(self._call(text))
+        except Exception as e:
+            future.set_exception(e)
+
+    def _call(self, text):
+        _count('upstream_calls')
+        started = time.monotonic()
+        future = _abandonable_call(self.translator.translate, text)
+        try:
+            translated = future.result(timeout=CALL_TIMEOUT_SECONDS)
+        except FutureTimeoutError:
+            # The hung call keeps its thread and translator; later calls get a fresh translator
+            self.translator = GoogleTranslator(source=self.source, target=self.target)
+            _count('abandoned_calls')
+            error = requests.Timeout(f'Google Translate did not answer within {CALL_TIMEOUT_SECONDS}s')
+            circuit.record_failure(time.monotonic() - started, str(error))
+            raise error
+        except UPSTREAM_ERRORS as e:
+            circuit.record_failure(time.monotonic() - started, str(e) or e.__class__.__name__)
+            raise
+        circuit.record_success(time.monotonic() - started)
+        return translated
+
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(source, target):
+    """The process-wide batcher for a language pair"""
+    with _batchers_lock:
+        batcher = _batchers.get((source, target))
+        if batcher is None:
+            batcher = TranslationBatcher(source, target)
+            _batchers[(source, target)] = batcher
+        return batcher
+
+
+def translate_text(text, source='auto', target='en'):
+    """
+    Translate text, serving repeated inputs from the cache and batching
+    misses with concurrent callers. Translator errors propagate to the
+    caller; failed translations are never cached. While the circuit
+    breaker is open the text comes back untranslated without waiting,
+    and so does a text whose batch was cut short by the breaker opening.
+    """
+    if not text or not text.strip():
+        return text
+    key = cache_key(text, source, target)
+    translated = _lookup(key)
+    if translated is not None:
+        return translated
+
+    _count('misses')
+    if not circuit.allow():
+        _count('untranslated')
+        return text
+    future, created = get_batcher(source, target).submit(text)
+    try:
+        translated = future.result(timeout=BATCH_TIMEOUT_SECONDS)
+    except FutureTimeoutError:
+        # The worker is still stuck on the call; do not wait for it to report
+        circuit.record_failure(BATCH_TIMEOUT_SECONDS, f'Timed out after {BATCH_TIMEOUT_SECONDS}s')
+        raise
+    if translated is None:
+        _count('untranslated')
+        return text
+    # Only the caller that queued the text stores it
+    if translated and created:
+        _store(key, source, target, translated)
+    return translated
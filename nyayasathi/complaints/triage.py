@@ -0,0 +1,98 @@
+"""
+Triage queue: open complaints ordered most urgent first, then oldest.
+
+A cop claims the next complaint with a lease that expires after
+TRIAGE_LEASE_SECONDS unless renewed; an expired lease returns the complaint
+to the queue. On PostgreSQL the next row is picked with
+SELECT ... FOR UPDATE SKIP LOCKED; elsewhere each candidate is taken with
+a conditional UPDATE that only succeeds while the row is still unclaimed,
+so two cops can never hold the same complaint.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Complaint
+
+LEASE_SECONDS = getattr(settings, 'TRIAGE_LEASE_SECONDS', 900)
+OPEN_STATUSES = ['pending', 'under_review']
+TRIAGE_ORDERING = ['-triage_rank', 'submitted_at', 'id']
+CANDIDATES_PER_ATTEMPT = 10
+
+
+def unclaimed(now):
+    return Q(claimed_by__isnull=True) | Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now)
+
+
+def lease_active(complaint, now=None):
+    now = now or timezone.now()
+    return bool(complaint.claimed_by_id and complaint.lease_expires_at and complaint.lease_expires_at > now)
+
+
+def triage_queue(now=None):
+    """Open complaints nobody holds a live lease on, in triage order"""
+    now = now or timezone.now()
+    return Complaint.objects.filter(unclaimed(now), status__in=OPEN_STATUSES).order_by(*TRIAGE_ORDERING)
+
+
+def _start_review(complaint):
+    # A regular save so stats and other save signals see the status change
+    if complaint.status == 'pending':
+        complaint.status = 'under_review'
+        complaint.save(update_fields=['status', 'updated_at'])
+    return complaint
+
+
+def claim_next_complaint(cop):
+    """Lease the most urgent unclaimed complaint to cop; None when the queue is empty"""
+    now = timezone.now()
+    expires = now + timedelta(seconds=LEASE_SECONDS)
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            complaint = triage_queue(now).select_for_update(skip_locked=True).first()
+            if complaint is None:
+                return None
+            complaint.claimed_by = cop
+            complaint.lease_expires_at = expires
+            complaint.save(update_fields=['claimed_by', 'lease_expires_at', 'updated_at'])
+            return _start_review(complaint)
+
+    while True:
+        candidates = list(triage_queue(now).values_list('id', 'claimed_by', 'lease_expires_at')[:CANDIDATES_PER_ATTEMPT])
+        if not candidates:
+            return None
+        for complaint_id, claimed_by, lease_expires_at in candidates:
+            # Compare-and-set on the lease we just read; fails if another cop got there first
+            claimed = Complaint.objects.filter(
+                id=complaint_id, claimed_by=claimed_by, lease_expires_at=lease_expires_at
+            ).update(claimed_by=cop, lease_expires_at=expires, updated_at=now)
+            if claimed:
+                return _start_review(Complaint.objects.get(id=complaint_id))
+        now = timezone.now()
+        expires = now + timedelta(seconds=LEASE_SECONDS)
+
+
+def renew_lease(complaint_id, cop):
+    """Extend cop's lease; False when cop does not hold a live lease on the complaint"""
+    now = timezone.now()
+    return bool(Complaint.objects.filter(id=complaint_id, claimed_by=cop, lease_expires_at__gt=now).update(
+        lease_expires_at=now + timedelta(seconds=LEASE_SECONDS), updated_at=now
+    ))
+
+
+def release_lease(complaint_id, cop):
+    """Give the complaint back to the queue; False when cop does not hold it"""
+    now = timezone.now()
+    complaint = Complaint.objects.filter(id=complaint_id, claimed_by=cop, lease_expires_at__gt=now).first()
+    if complaint is None:
+        return False
+    complaint.claimed_by = None
+    complaint.lease_expires_at = None
+    if complaint.status == 'under_review':
+        complaint.status = 'pending'
+    complaint.save(update_fields=['claimed_by', 'lease_expires_at', 'status', 'updated_at'])
+    return True
@@ -1,10 +1,11 @@
 from django.urls import path
+from . import async_views
 from .views import (
     RegisterView, LoginView, LogoutView, UserProfileView,
     ComplaintListCreateView, ComplaintDetailView,
     AudioTranscribeView, TextComplaintView,
     DetectLanguageView, CopRegisterView, ComplaintStatusUpdateView,
-    echo_content, ChatbotAPIView, summarize_legal_document, ask_legal_document, legal_chatbot
+    ComplaintProcessingView, complaint_events, TriageQueueView, TriageClaimView, TriageLeaseView, ComplaintStatsView, ComplaintSearchView, IncidentListView, echo_content, ChatbotAPIView, summarize_legal_document, ask_legal_document, legal_chatbot, LLMMetricsView, upload_legal_document, dependency_health
 )
 
 urlpatterns = [
@@ -17,14 +18,32 @@ urlpatterns = [
     
     # Complaint endpoints
     path('complaints/', ComplaintListCreateView.as_view(), name='complaint-list'),
+    path('complaints/events/', complaint_events, name='complaint-events'),
+    path('complaints/search/', ComplaintSearchView.as_view(), name='complaint-search'),
+    path('complaints/stats/', ComplaintStatsView.as_view(), name='complaint-stats'),
     path('complaints/<int:id>/', ComplaintDetailView.as_view(), name='complaint-detail'),
     path('complaints/<int:complaint_id>/status/', ComplaintStatusUpdateView.as_view(), name='complaint-status-update'),
+    path('complaints/<int:complaint_id>/processing/', ComplaintProcessingView.as_view(), name='complaint-processing'),
+    path('triage/', TriageQueueView.as_view(), name='triage-queue'),
+    path('triage/claim/', TriageClaimView.as_view(), name='triage-claim'),
+    path('triage/<int:complaint_id>/renew/', TriageLeaseView.as_view(), {'action': 'renew'}, name='triage-renew'),
+    path('triage/<int:complaint_id>/release/', TriageLeaseView.as_view(), {'action': 'release'}, name='triage-release'),
+    path('incidents/', IncidentListView.as_view(), name='incident-list'),
     path('complaints/audio/', AudioTranscribeView.as_view(), name='audio-complaint'),
     path('complaints/text/', TextComplaintView.as_view(), name='text-complaint'),
+    path('complaints/legal-documents/', upload_legal_document, name='upload_legal_document'),
     path('complaints/summarize-legal-document/', summarize_legal_document, name='summarize_legal_document'),
     path('complaints/ask-legal-document/', ask_legal_document, name='ask_legal_document'),
     path('complaints/legal-chatbot/', legal_chatbot, name='legal_chatbot'),
     path('detect-language/', DetectLanguageView, name='detect-language'),
     path('echo-content/', echo_content, name='echo-content'),
     path('chatbot/', ChatbotAPIView.as_view(), name='chatbot'),
+    path('llm/metrics/', LLMMetricsView.as_view(), name='llm-metrics'),
+    path('health/dependencies/', dependency_health, name='dependency-health'),
+
+    # Async (ASGI-native) versions of the LLM endpoints
+    path('async/chatbot/', async_views.chatbot, name='async-chatbot'),
+    path('async/complaints/summarize-legal-document/', async_views.summarize_legal_document, name='async-summarize-legal-document'),
+    path('async/complaints/ask-legal-document/', async_views.ask_legal_document, name='async-ask-legal-document'),
+    path('async/complaints/legal-chatbot/', async_views.legal_chatbot, name='async-legal-chatbot'),
 ]
@@ -1,7 +1,10 @@
 import os
-from deep_translator import GoogleTranslator
+import re
+import threading
+import time
 import langid
 from difflib import SequenceMatcher
+from .signatures import minhash, band_keys, normalize_text
 
 # Language mapping for better language detection
 LANGUAGE_MAPPING = {
@@ -20,25 +23,63 @@ def similarity_ratio(text1, text2):
     """
     return SequenceMatcher(None, text1.lower().strip(), text2.lower().strip()).ratio()
 
-def check_similar_complaints(user, content, time_window_hours=24, similarity_threshold=0.8):
+def index_complaint_signature(complaint, force=False):
+    """
+    Store the MinHash signature of a complaint's content and rebuild its LSH
+    bucket rows. Returns False when the stored signature was already current.
+    """
+    from django.db import transaction
+    from .models import Complaint, ComplaintSignatureBucket
+
+    signature = minhash(complaint.content)
+    if signature == complaint.minhash and not force:
+        return False
+
+    with transaction.atomic():
+        Complaint.objects.filter(pk=complaint.pk).update(minhash=signature)
+        complaint.minhash = signature
+        ComplaintSignatureBucket.objects.filter(complaint_id=complaint.pk).delete()
+        ComplaintSignatureBucket.objects.bulk_create([
+            ComplaintSignatureBucket(complaint_id=complaint.pk, bucket=key)
+            for key in band_keys(signature)
+        ])
+    return True
+
+def check_similar_complaints(user, content, time_window_hours=24, similarity_threshold=0.8, max_candidates=5,
+                             exclude_id=None):
     """
     Check for similar complaints from the same user within a time window
     Returns the most similar complaint if found, None otherwise
+
+    Candidates come from the LSH bucket index: only the complaints sharing
+    the most signature bands with content are compared exactly.
     """
     from datetime import timedelta
+    from django.db.models import Count
     from django.utils import timezone
-    from .models import Complaint
-    
-    # Get complaints from the same user within the time window
-    recent_complaints = Complaint.objects.filter(
-        user=user,
-        submitted_at__gte=timezone.now() - timedelta(hours=time_window_hours)
+    from .models import Complaint, ComplaintSignatureBucket
+
+    keys = band_keys(minhash(content))
+    if not keys:
+        return None, 0
+
+    candidates = (
+        ComplaintSignatureBucket.objects.filter(
+            bucket__in=keys,
+            complaint__user=user,
+            complaint__submitted_at__gte=timezone.now() - timedelta(hours=time_window_hours)
+        )
+        .exclude(complaint_id=exclude_id)
+        .values('complaint_id')
+        .annotate(shared_bands=Count('id'))
+        .order_by('-shared_bands', '-complaint_id')[:max_candidates]
     )
+    candidate_ids = [row['complaint_id'] for row in candidates]
     
     best_match = None
     best_similarity = 0
     
-    for complaint in recent_complaints:
+    for complaint in Complaint.objects.filter(id__in=candidate_ids):
         similarity = similarity_ratio(content, complaint.content)
         if similarity > similarity_threshold and similarity > best_similarity:
             best_similarity = similarity
@@ -46,13 +87,93 @@ def check_similar_complaints(user, content, time_window_hours=24, similarity_thr
     
     return best_match, best_similarity
 
+THREAT_LEVEL_RANK = {'low': 0, 'medium': 1, 'high': 2}
+
+# Locations that say nothing about where the incident happened
+UNKNOWN_LOCATIONS = {'', 'unknown', 'na', 'n a', 'none', 'not known'}
+
+def normalize_location(location):
+    """Comparable form of a free-text location; '' when the location is unknown"""
+    key = normalize_text(location)[:100]
+    return '' if key in UNKNOWN_LOCATIONS else key
+
+def assign_incident(complaint, time_window_hours=48, similarity_threshold=0.6,
+                    unknown_location_threshold=0.8, max_candidates=10):
+    """
+    Attach a complaint to the incident cluster of a similar recent complaint
+    from any user, or start a new incident.
+
+    Candidates are the complaints sharing the most LSH bands with this one,
+    so the cost does not grow with the size of the table. A candidate only
+    qualifies at the same normalized location, or with a stricter text
+    similarity when either location is unknown.
+    """
+    from datetime import timedelta
+    from django.db.models import Count, F
+    from django.utils import timezone
+    from .models import Complaint, ComplaintSignatureBucket, Incident
+
+    location_key = normalize_location(complaint.location)
+    reported_at = complaint.submitted_at or timezone.now()
+    keys = band_keys(complaint.minhash)
+
+    best_incident_id = None
+    best_similarity = 0
+    if keys:
+        candidates = (
+            ComplaintSignatureBucket.objects.filter(
+                bucket__in=keys,
+                complaint__incident__isnull=False,
+                complaint__submitted_at__gte=reported_at - timedelta(hours=time_window_hours)
+            )
+            .exclude(complaint_id=complaint.pk)
+            .values('complaint_id')
+            .annotate(shared_bands=Count('id'))
+            .order_by('-shared_bands', '-complaint_id')[:max_candidates]
+        )
+        candidate_ids = [row['complaint_id'] for row in candidates]
+        for candidate in Complaint.objects.filter(id__in=candidate_ids).only('id', 'content', 'location', 'incident_id'):
+            candidate_key = normalize_location(candidate.location)
+            if location_key and candidate_key:
+                if candidate_key != location_key:
+                    continue
+                threshold = similarity_threshold
+            else:
+                threshold = unknown_location_threshold
+            similarity = similarity_ratio(complaint.content, candidate.content)
+            if similarity >= threshold and similarity > best_similarity:
+                best_similarity = similarity
+                best_incident_id = candidate.incident_id
+
+    if best_incident_id is None:
+        incident = Incident.objects.create(
+            location=complaint.location or '',
+            location_key=location_key,
+            member_count=1,
+            highest_threat_level=complaint.threat_level or 'low',
+            first_reported_at=reported_at,
+            last_reported_at=reported_at
+        )
+    else:
+        Incident.objects.filter(pk=best_incident_id).update(
+            member_count=F('member_count') + 1,
+            last_reported_at=reported_at
+        )
+        incident = Incident.objects.get(pk=best_incident_id)
+        if THREAT_LEVEL_RANK.get(complaint.threat_level, 0) > THREAT_LEVEL_RANK.get(incident.highest_threat_level, 0):
+            incident.highest_threat_level = complaint.threat_level
+            incident.save(update_fields=['highest_threat_level'])
+
+    Complaint.objects.filter(pk=complaint.pk).update(incident=incident)
+    complaint.incident = incident
+    return incident
+
 def transcribe_audio(file_path):
-    """Transcribe audio file to text"""
+    """Transcribe audio file to text with the local Whisper model (loaded once per worker process)"""
+    from .transcription import BACKENDS
+
     try:
-        import whisper
-        model = whisper.load_model("tiny")
-        result = model.transcribe(file_path)
-        return result["text"]
+        return BACKENDS['local'].transcribe_path(file_path)
     except Exception as e:
         raise Exception(f"Audio transcription failed: {e}")
 
@@ -89,112 +210,286 @@ def translate_to_english(text, source_lang):
             'Malayalam': 'ml'
         }
         
+        from .translation import translate_text
+
         source_code = lang_code_mapping.get(source_lang, source_lang.lower())
-        translator = GoogleTranslator(source=source_code, target='en')
-        translated = translator.translate(text)
-        return translated
+        return translate_text(text, source=source_code, target='en')
     except Exception as e:
         print(f"Translation error: {e}")
         return text
 
-def analyze_complaint_severity(text):
-    """Analyze complaint text for emotion, priority, and threat level"""
-    text_lower = text.lower()
-    
-    # Threat keywords
-    high_threat_keywords = [
-        'kill', 'murder', 'death', 'suicide', 'bomb', 'explosive', 'weapon', 'gun', 'shoot',
-        'attack', 'assault', 'rape', 'abuse', 'threat', 'dangerous', 'emergency', 'urgent',
-        'immediate', 'help', 'save', 'rescue', 'fire', 'accident', 'hospital', 'ambulance'
-    ]
-    
-    medium_threat_keywords = [
-        'harassment', 'bully', 'intimidate', 'scare', 'fear', 'afraid', 'worried', 'concerned',
-        'stolen', 'theft', 'robbery', 'fraud', 'cheat', 'scam', 'illegal', 'criminal',
-        'police', 'law', 'court', 'legal', 'justice', 'rights', 'violation'
-    ]
-    
-    # Urgency indicators
-    urgency_indicators = [
-        'now', 'immediately', 'urgent', 'emergency', 'asap', 'quick', 'fast', 'hurry',
-        'critical', 'serious', 'important', 'danger', 'risk', 'threat', 'help'
-    ]
-    
-    # Emotion detection
-    emotion_keywords = {
-        'angry': ['angry', 'furious', 'mad', 'rage', 'hate', 'disgust', 'outrage'],
-        'fearful': ['afraid', 'scared', 'fear', 'terrified', 'panic', 'anxiety', 'worried'],
-        'sad': ['sad', 'depressed', 'unhappy', 'crying', 'tears', 'grief', 'sorrow'],
-        'happy': ['happy', 'joy', 'pleased', 'satisfied', 'content', 'grateful'],
-        'neutral': ['neutral', 'normal', 'fine', 'okay', 'alright']
-    }
-    
-    # Find exact keywords present
-    found_high_threat = [keyword for keyword in high_threat_keywords if keyword in text_lower]
-    found_medium_threat = [keyword for keyword in medium_threat_keywords if keyword in text_lower]
-    found_urgency = [indicator for indicator in urgency_indicators if indicator in text_lower]
-    
-    # Count threat keywords
-    high_threat_count = len(found_high_threat)
-    medium_threat_count = len(found_medium_threat)
-    urgency_count = len(found_urgency)
-    
-    # Determine threat level
-    if high_threat_count > 0:
-        threat_level = 'high'
-    elif medium_threat_count > 2 or urgency_count > 3:
-        threat_level = 'medium'
-    else:
-        threat_level = 'low'
-    
-    # Determine priority based on threat level and urgency
-    if threat_level == 'high' or urgency_count > 5:
-        priority = 'high'
-    elif threat_level == 'medium' or urgency_count > 2:
-        priority = 'medium'
+# Severity vocabularies, compiled once into the matchers below
+HIGH_THREAT_KEYWORDS = [
+    'kill', 'murder', 'death', 'suicide', 'bomb', 'explosive', 'weapon', 'gun', 'shoot',
+    'attack', 'assault', 'rape', 'abuse', 'threat', 'dangerous', 'emergency', 'urgent',
+    'immediate', 'help', 'save', 'rescue', 'fire', 'accident', 'hospital', 'ambulance'
+]
+
+MEDIUM_THREAT_KEYWORDS = [
+    'harassment', 'bully', 'intimidate', 'scare', 'fear', 'afraid', 'worried', 'concerned',
+    'stolen', 'theft', 'robbery', 'fraud', 'cheat', 'scam', 'illegal', 'criminal',
+    'police', 'law', 'court', 'legal', 'justice', 'rights', 'violation'
+]
+
+URGENCY_INDICATORS = [
+    'now', 'immediately', 'urgent', 'emergency', 'asap', 'quick', 'fast', 'hurry',
+    'critical', 'serious', 'important', 'danger', 'risk', 'threat', 'help'
+]
+
+EMOTION_KEYWORDS = {
+    'angry': ['angry', 'furious', 'mad', 'rage', 'hate', 'disgust', 'outrage'],
+    'fearful': ['afraid', 'scared', 'fear', 'terrified', 'panic', 'anxiety', 'worried'],
+    'sad': ['sad', 'depressed', 'unhappy', 'crying', 'tears', 'grief', 'sorrow'],
+    'happy': ['happy', 'joy', 'pleased', 'satisfied', 'content', 'grateful'],
+    'neutral': ['neutral', 'normal', 'fine', 'okay', 'alright']
+}
+
+IMMEDIATE_ATTENTION_KEYWORDS = ['emergency', 'immediate', 'urgent', 'help']
+
+def _trie_pattern(words):
+    """Build a regex alternation shaped like a prefix trie of the given words"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+class KeywordMatcher:
+    """
+    Finds every keyword of a vocabulary in the text.
+
+    With word_boundary=True only whole words match, and the keywords are
+    compiled into a single trie-shaped regex, so the engine walks the text
+    once instead of once per keyword. Otherwise a keyword matches anywhere
+    in the text; that is a plain `keyword in text` test per keyword, as a
+    regex has to try a match at every character and is slower than the C
+    substring search for a vocabulary of this size.
+    """
+
+    def __init__(self, keywords, word_boundary=True):
+        self.keywords = frozenset(keyword.lower() for keyword in keywords)
+        self.word_boundary = word_boundary
+        if word_boundary:
+            self._regex = re.compile(rf'\b({_trie_pattern(self.keywords)})\b')
+
+    def find(self, text):
+        """Return the set of keywords present in text"""
+        text = text.lower()
+        if self.word_boundary:
+            return set(self._regex.findall(text))
+        return {keyword for keyword in self.keywords if keyword in text}
+
+# Lexicon and threshold layout shared by the built-in rules and SeverityRuleSet rows
+DEFAULT_SEVERITY_LEXICONS = {
+    'high_threat': HIGH_THREAT_KEYWORDS,
+    'medium_threat': MEDIUM_THREAT_KEYWORDS,
+    'urgency': URGENCY_INDICATORS,
+    'immediate_attention': IMMEDIATE_ATTENTION_KEYWORDS,
+    'emotions': EMOTION_KEYWORDS,
+}
+
+DEFAULT_SEVERITY_THRESHOLDS = {
+    # Counts must be strictly greater than these values
+    'medium_threat_keywords': 2,
+    'medium_threat_urgency': 3,
+    'high_priority_urgency': 5,
+    'medium_priority_urgency': 2,
+    'immediate_attention_urgency': 5,
+}
+
+# Version recorded on complaints scored by the rules built into this module
+BUILTIN_RULE_VERSION = 0
+
+class SeverityRules:
+    """
+    One version of the severity lexicons and thresholds, compiled into
+    keyword matchers. Instances are immutable once built, so a worker can
+    swap the active rules by replacing a single reference.
+    """
+
+    def __init__(self, version, lexicons, thresholds=None, word_boundary=True):
+        self.version = version
+        self.high_threat = [k.lower() for k in lexicons.get('high_threat', [])]
+        self.medium_threat = [k.lower() for k in lexicons.get('medium_threat', [])]
+        self.urgency = [k.lower() for k in lexicons.get('urgency', [])]
+        self.immediate_attention = [k.lower() for k in lexicons.get('immediate_attention', [])]
+        self.emotions = {
+            emotion: [k.lower() for k in keywords]
+            for emotion, keywords in lexicons.get('emotions', {}).items()
+        }
+        self.thresholds = {**DEFAULT_SEVERITY_THRESHOLDS, **(thresholds or {})}
+        self.word_boundary = word_boundary
+
+        self.vocabulary = (
+            self.high_threat + self.medium_threat + self.urgency + self.immediate_attention +
+            [keyword for keywords in self.emotions.values() for keyword in keywords]
+        )
+        self.word_matcher = KeywordMatcher(self.vocabulary, word_boundary=True)
+        self.substring_matcher = KeywordMatcher(self.vocabulary, word_boundary=False)
+
+    @classmethod
+    def from_ruleset(cls, ruleset):
+        """Compile a SeverityRuleSet row"""
+        return cls(ruleset.version, ruleset.lexicons, ruleset.thresholds, ruleset.word_boundary)
+
+    def analyze(self, text, word_boundary=None):
+        """Score text with these rules; see analyze_complaint_severity"""
+        if word_boundary is None:
+            word_boundary = self.word_boundary
+        matcher = self.word_matcher if word_boundary else self.substring_matcher
+        found = matcher.find(text)
+        thresholds = self.thresholds
+
+        # Find exact keywords present
+        found_high_threat = [keyword for keyword in self.high_threat if keyword in found]
+        found_medium_threat = [keyword for keyword in self.medium_threat if keyword in found]
+        found_urgency = [indicator for indicator in self.urgency if indicator in found]
+
+        # Count threat keywords
+        high_threat_count = len(found_high_threat)
+        medium_threat_count = len(found_medium_threat)
+        urgency_count = len(found_urgency)
+
+        # Determine threat level
+        if high_threat_count > 0:
+            threat_level = 'high'
+        elif (medium_threat_count > thresholds['medium_threat_keywords'] or
+              urgency_count > thresholds['medium_threat_urgency']):
+            threat_level = 'medium'
+        else:
+            threat_level = 'low'
+
+        # Determine priority based on threat level and urgency
+        if threat_level == 'high' or urgency_count > thresholds['high_priority_urgency']:
+            priority = 'high'
+        elif threat_level == 'medium' or urgency_count > thresholds['medium_priority_urgency']:
+            priority = 'medium'
+        else:
+            priority = 'low'
+
+        # Detect emotion
+        emotion_scores = {}
+        for emotion, keywords in self.emotions.items():
+            emotion_scores[emotion] = sum(1 for keyword in keywords if keyword in found)
+
+        # Get the emotion with highest score, default to neutral
+        detected_emotion = max(emotion_scores.items(), key=lambda x: x[1], default=('neutral', 0))[0]
+        if emotion_scores.get(detected_emotion, 0) == 0:
+            detected_emotion = 'neutral'
+
+        # Set threat level based on detected emotion if no high/medium threat keywords found
+        if threat_level == 'low' and detected_emotion in ['angry', 'fearful']:
+            threat_level = 'medium'
+
+        # Collect risk factors
+        risk_factors = []
+        if high_threat_count > 0:
+            risk_factors.append('high_threat_keywords')
+        if medium_threat_count > thresholds['medium_threat_keywords']:
+            risk_factors.append('multiple_legal_issues')
+        if urgency_count > thresholds['medium_threat_urgency']:
+            risk_factors.append('high_urgency')
+        if detected_emotion in ['angry', 'fearful']:
+            risk_factors.append('negative_emotion')
+
+        # Add the exact keywords found for display
+        exact_keywords = list(set(found_high_threat + found_medium_threat))
+
+        # Check if immediate attention is required
+        requires_immediate_attention = (
+            threat_level == 'high' or
+            urgency_count > thresholds['immediate_attention_urgency'] or
+            any(keyword in found for keyword in self.immediate_attention)
+        )
+
+        return {
+            'emotion': detected_emotion,
+            'priority': priority,
+            'threat_level': threat_level,
+            'risk_factors': risk_factors,
+            'requires_immediate_attention': requires_immediate_attention,
+            'exact_keywords': exact_keywords,
+            'rule_version': self.version
+        }
+
+DEFAULT_SEVERITY_RULES = SeverityRules(
+    BUILTIN_RULE_VERSION, DEFAULT_SEVERITY_LEXICONS, DEFAULT_SEVERITY_THRESHOLDS
+)
+
+_active_rules = DEFAULT_SEVERITY_RULES
+_active_rules_checked_at = None
+_active_rules_lock = threading.Lock()
+
+def load_severity_rules(version=None):
+    """
+    Compile a stored SeverityRuleSet. Without a version the active ruleset is
+    used, falling back to the built-in rules when none is active.
+    """
+    from .models import SeverityRuleSet
+
+    if version == BUILTIN_RULE_VERSION:
+        return DEFAULT_SEVERITY_RULES
+    if version is None:
+        ruleset = SeverityRuleSet.objects.filter(is_active=True).order_by('-version').first()
+        if ruleset is None:
+            return DEFAULT_SEVERITY_RULES
     else:
-        priority = 'low'
-    
-    # Detect emotion
-    emotion_scores = {}
-    for emotion, keywords in emotion_keywords.items():
-        emotion_scores[emotion] = sum(1 for keyword in keywords if keyword in text_lower)
-    
-    # Get the emotion with highest score, default to neutral
-    detected_emotion = max(emotion_scores.items(), key=lambda x: x[1])[0]
-    if emotion_scores[detected_emotion] == 0:
-        detected_emotion = 'neutral'
-    
-    # Set threat level based on detected emotion if no high/medium threat keywords found
-    if threat_level == 'low' and detected_emotion in ['angry', 'fearful']:
-        threat_level = 'medium'
-    
-    # Collect risk factors
-    risk_factors = []
-    if high_threat_count > 0:
-        risk_factors.append('high_threat_keywords')
-    if medium_threat_count > 2:
-        risk_factors.append('multiple_legal_issues')
-    if urgency_count > 3:
-        risk_factors.append('high_urgency')
-    if detected_emotion in ['angry', 'fearful']:
-        risk_factors.append('negative_emotion')
-    
-    # Add the exact keywords found for display
-    exact_keywords = list(set(found_high_threat + found_medium_threat))
-    
-    # Check if immediate attention is required
-    requires_immediate_attention = (
-        threat_level == 'high' or 
-        urgency_count > 5 or 
-        any(keyword in text_lower for keyword in ['emergency', 'immediate', 'urgent', 'help'])
-    )
-    
-    return {
-        'emotion': detected_emotion,
-        'priority': priority,
-        'threat_level': threat_level,
-        'risk_factors': risk_factors,
-        'requires_immediate_attention': requires_immediate_attention,
-        'exact_keywords': exact_keywords
-    }
\ No newline at end of file
+        ruleset = SeverityRuleSet.objects.get(version=version)
+    return SeverityRules.from_ruleset(ruleset)
+
+def get_active_severity_rules():
+    """
+    Return the compiled active ruleset. The database is consulted at most once
+    per SEVERITY_RULES_RELOAD_SECONDS; when the active version changes the new
+    rules are compiled and swapped in without restarting the worker.
+    """
+    global _active_rules, _active_rules_checked_at
+    from django.conf import settings
+    from django.db import DatabaseError
+    from .models import SeverityRuleSet
+
+    interval = getattr(settings, 'SEVERITY_RULES_RELOAD_SECONDS', 30)
+    now = time.monotonic()
+    if _active_rules_checked_at is not None and now - _active_rules_checked_at < interval:
+        return _active_rules
+
+    with _active_rules_lock:
+        if _active_rules_checked_at is not None and now - _active_rules_checked_at < interval:
+            return _active_rules
+        try:
+            active_version = (
+                SeverityRuleSet.objects.filter(is_active=True)
+                .order_by('-version').values_list('version', flat=True).first()
+            )
+            if active_version is None:
+                active_version = BUILTIN_RULE_VERSION
+            if active_version != _active_rules.version:
+                _active_rules = load_severity_rules(active_version)
+        except DatabaseError as e:
+            # Keep scoring with the rules we already have
+            print(f"Severity rules reload failed: {e}")
+        _active_rules_checked_at = now
+    return _active_rules
+
+def analyze_complaint_severity(text, word_boundary=None, rules=None):
+    """
+    Analyze complaint text for emotion, priority, and threat level.
+
+    Uses the active versioned ruleset unless rules is given; the version
+    that produced the result is returned as 'rule_version'. Rulesets match
+    whole words by default, so "help" no longer matches "helpful"; pass
+    word_boundary=False for the old substring behaviour.
+    """
+    if rules is None:
+        rules = get_active_severity_rules()
+    return rules.analyze(text, word_boundary=word_boundary)
@@ -6,25 +6,46 @@ from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import login, logout
+from django.http import JsonResponse, StreamingHttpResponse
 from .utils import (
     transcribe_audio, detect_language, translate_to_english,
     analyze_complaint_severity, LANGUAGE_MAPPING, check_similar_complaints
 )
-from .models import Complaint, CustomUser
-from .serializers import ComplaintSerializer, UserSerializer, LoginSerializer, CopSerializer, ComplaintStatusSerializer
-from rest_framework.decorators import api_view, permission_classes, parser_classes
-from deep_translator import GoogleTranslator
+from .models import Complaint, CustomUser, Incident, ProcessingJob
+from .pagination import KeysetPagination, RankedPagination
+from .search import search_complaints
+from .documents import UnsupportedDocument, find_document, store_document
+from .llm import (
+    CHATBOT_FALLBACK_ANSWER, CHATBOT_MODEL, DEFAULT_MODEL, DOCUMENT_OPTIONS, LLMError, LLMUnavailable,
+    chatbot_messages, complete, gateway, legal_chat_messages, resolve_model, sse_completion, sse_response, sse_text,
+    stream_requested
+)
+from .response_cache import cache_allowed, cache_headers, lookup, response_cache_stats, scope_key, store
+from .retrieval import document_question_prompt, retrieval_stats
+from .knowledge_base import knowledge_base_answer, knowledge_base_stats
+from .summarization import summary_prompt
+from .live import authorize_stream, event_stream, stream_options
+from .triage import OPEN_STATUSES, claim_next_complaint, lease_active, release_lease, renew_lease, triage_queue
+from .stats import stats_snapshot
+from .serializers import ComplaintSerializer, ComplaintListSerializer, ComplaintSearchSerializer, UserSerializer, LoginSerializer, CopSerializer, ComplaintStatusSerializer, IncidentSerializer
+from rest_framework.decorators import api_view, permission_classes, parser_classes, throttle_classes
+from django.utils.decorators import method_decorator
+from .resilience import breaker_states, unavailable_response
+from .throttling import LLMThrottle, TranscriptionThrottle, shed_when_busy, upstream_stats
+from .translation import translate_text
+from .ingestion import (
+    async_ingestion_requested, duplicate_error_data, enqueue_complaint, job_status_data, worker_pool
+)
+from .transcription import TranscriptionUnavailable, transcribe, transcription_available
 import langid
 from datetime import datetime, timedelta
+from django.db.models.functions import Left
 from django.utils import timezone
-import requests
-from groq import Groq
-import pdfplumber
-import docx
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
 from rest_framework.parsers import JSONParser
 
 GROQ_API_KEY = os.environ.get('GROQ_API_KEY', '')
-GROQ_API_URL = 'https://api.groq.com/openai/v1/chat/completions'
 HUGGINGFACE_API_KEY = os.environ.get('HUGGINGFACE_API_KEY', '')
 HUGGINGFACE_WHISPER_MODEL = "distil-whisper-large-v3-en"
 
@@ -96,42 +117,105 @@ class UserProfileView(APIView):
 class ComplaintListCreateView(generics.ListCreateAPIView):
     serializer_class = ComplaintSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    filter_fields = ['status', 'priority', 'threat_level', 'language']
     
+    list_fields = [
+        'id', 'name', 'location', 'complaint_type', 'language', 'audio_file', 'emotion',
+        'priority', 'threat_level', 'risk_factors', 'requires_immediate_attention', 'status',
+        'review_notes', 'claimed_by_id', 'lease_expires_at', 'incident_id', 'rule_version',
+        'submitted_at', 'updated_at',
+        'user__id', 'user__username', 'user__user_type', 'user__cop_id',
+        'reviewed_by__id', 'reviewed_by__username', 'reviewed_by__user_type', 'reviewed_by__cop_id',
+    ]
+
+    def get_serializer_class(self):
+        if self.request.method == 'GET':
+            return ComplaintListSerializer
+        return ComplaintSerializer
+
     def get_queryset(self):
         if self.request.user.user_type == 'cop':
-            return Complaint.objects.all()
-        return Complaint.objects.filter(user=self.request.user)
-    
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        data = serializer.data
-        # Add original_content for non-English complaints
-        for i, obj in enumerate(queryset):
-            if hasattr(obj, 'language') and obj.language and obj.language != 'en':
-                data[i]['original_content'] = obj.content if hasattr(obj, 'original_content') else ''
-        return Response(data)
+            queryset = Complaint.objects.all()
+        else:
+            queryset = Complaint.objects.filter(user=self.request.user)
+
+        if self.request.method == 'GET':
+            # One query per page: join both users, load only listed columns and
+            # cut long texts in the database unless ?full=1
+            queryset = queryset.select_related('user', 'reviewed_by')
+            if self.request.query_params.get('full') in ['1', 'true']:
+                queryset = queryset.only(*self.list_fields, 'content', 'original_content')
+            else:
+                queryset = queryset.only(*self.list_fields)
+                preview_chars = ComplaintListSerializer.PREVIEW_CHARS + 1
+                queryset = queryset.annotate(
+                    content_preview=Left('content', preview_chars),
+                    original_preview=Left('original_content', preview_chars)
+                )
+
+        params = self.request.query_params
+        if not params.get('status'):
+            # Complaints rejected or abandoned by async ingestion; see ingestion.py
+            queryset = queryset.exclude(status='failed')
+        for field in self.filter_fields:
+            if params.get(field):
+                queryset = queryset.filter(**{field: params[field]})
+        submitted_after = self._parse_date_param('submitted_after')
+        if submitted_after:
+            queryset = queryset.filter(submitted_at__gte=submitted_after)
+        submitted_before = self._parse_date_param('submitted_before')
+        if submitted_before:
+            queryset = queryset.filter(submitted_at__lt=submitted_before)
+        return queryset
+
+    def _parse_date_param(self, name):
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            if day is None:
+                raise ValidationError({name: 'Use an ISO date or datetime.'})
+            parsed = datetime.combine(day, datetime.min.time())
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+class ComplaintSearchView(ComplaintListCreateView):
+    """Ranked full-text search: ?q=... plus the list filters, paginated with ?page="""
+    pagination_class = RankedPagination
+    http_method_names = ['get', 'head', 'options']
+
+    def get_serializer_class(self):
+        return ComplaintSearchSerializer
+
+    def get_queryset(self):
+        query = self.request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': 'This parameter is required.'})
+        return search_complaints(super().get_queryset(), query)
+
+    def list(self, request, *args, **kwargs):
+        if request.user.user_type != 'cop':
+            return Response({'error': 'Only cops can search complaints'}, status=status.HTTP_403_FORBIDDEN)
+        return super().list(request, *args, **kwargs)
+
 class ComplaintDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ComplaintSerializer
     permission_classes = [IsAuthenticated]
     lookup_field = 'id'
     
     def get_queryset(self):
+        # Both nested users come with the complaint in one query
+        queryset = Complaint.objects.select_related('user', 'reviewed_by')
         if self.request.user.user_type == 'cop':
-            return Complaint.objects.all()
-        return Complaint.objects.filter(user=self.request.user)
-
-    def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        data = serializer.data
-        if hasattr(instance, 'language') and instance.language and instance.language != 'en':
-            data['original_content'] = instance.content if hasattr(instance, 'original_content') else ''
-        return Response(data)
+            return queryset
+        return queryset.filter(user=self.request.user)
 
 class ComplaintStatusUpdateView(APIView):
     permission_classes = [IsAuthenticated]
@@ -145,11 +229,22 @@ class ComplaintStatusUpdateView(APIView):
         except Complaint.DoesNotExist:
             return Response({'error': 'Complaint not found'}, status=status.HTTP_404_NOT_FOUND)
         
+        if lease_active(complaint) and complaint.claimed_by_id != request.user.id:
+            return Response({
+                'error': 'Another cop is working on this complaint',
+                'claimed_by': complaint.claimed_by_id,
+                'lease_expires_at': complaint.lease_expires_at
+            }, status=status.HTTP_409_CONFLICT)
+
         serializer = ComplaintStatusSerializer(data=request.data)
         if serializer.is_valid():
             complaint.status = serializer.validated_data['status']
             complaint.review_notes = serializer.validated_data.get('review_notes', '')
             complaint.reviewed_by = request.user
+            if complaint.status not in OPEN_STATUSES:
+                # Done with it: take it off the holder's hands
+                complaint.claimed_by = None
+                complaint.lease_expires_at = None
             complaint.save()
             
             return Response({
@@ -158,38 +253,189 @@ class ComplaintStatusUpdateView(APIView):
             })
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class TriageQueueView(generics.ListAPIView):
+    """Open, unclaimed complaints: highest threat, priority and immediate-attention first, then oldest"""
+    serializer_class = ComplaintListSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = RankedPagination
+
+    def get_queryset(self):
+        preview_chars = ComplaintListSerializer.PREVIEW_CHARS + 1
+        return triage_queue().select_related('user', 'reviewed_by').only(
+            *ComplaintListCreateView.list_fields
+        ).annotate(
+            content_preview=Left('content', preview_chars),
+            original_preview=Left('original_content', preview_chars)
+        )
+
+    def list(self, request, *args, **kwargs):
+        if request.user.user_type != 'cop':
+            return Response({'error': 'Only cops can view the triage queue'}, status=status.HTTP_403_FORBIDDEN)
+        return super().list(request, *args, **kwargs)
+
+class TriageClaimView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if request.user.user_type != 'cop':
+            return Response({'error': 'Only cops can claim complaints'}, status=status.HTTP_403_FORBIDDEN)
+        complaint = claim_next_complaint(request.user)
+        if complaint is None:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        return Response({
+            'lease_expires_at': complaint.lease_expires_at,
+            'complaint': ComplaintSerializer(complaint).data
+        })
+
+class TriageLeaseView(APIView):
+    """POST renew/ extends the caller's lease, POST release/ returns the complaint to the queue"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, complaint_id, action):
+        if request.user.user_type != 'cop':
+            return Response({'error': 'Only cops can manage complaint leases'}, status=status.HTTP_403_FORBIDDEN)
+        if action == 'renew':
+            done = renew_lease(complaint_id, request.user)
+        else:
+            done = release_lease(complaint_id, request.user)
+        if not done:
+            return Response({'error': 'You do not hold a lease on this complaint'}, status=status.HTTP_409_CONFLICT)
+        complaint = Complaint.objects.only('id', 'claimed_by', 'lease_expires_at').get(id=complaint_id)
+        return Response({
+            'complaint_id': complaint.id,
+            'claimed_by': complaint.claimed_by_id,
+            'lease_expires_at': complaint.lease_expires_at
+        })
+
+async def complaint_events(request):
+    """
+    Server-sent events for new and updated complaints (cops only). Filter
+    with comma separated ?threat_level=, ?priority= and ?status= values.
+    Under ASGI this path is served by live.EventStreamRouter instead.
+    """
+    key, filters, last_event_id = stream_options(request.GET.dict(), {
+        name.lower(): value for name, value in request.headers.items()
+    })
+    status_code, error = await authorize_stream(key)
+    if error:
+        return JsonResponse({'error': error}, status=status_code)
+
+    response = StreamingHttpResponse(event_stream(filters, last_event_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+class ComplaintProcessingView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, complaint_id):
+        try:
+            job = ProcessingJob.objects.select_related('complaint').get(complaint_id=complaint_id)
+        except ProcessingJob.DoesNotExist:
+            return Response({'error': 'No processing job for this complaint'}, status=status.HTTP_404_NOT_FOUND)
+        if request.user.user_type != 'cop' and job.complaint.user_id != request.user.id:
+            return Response({'error': 'No processing job for this complaint'}, status=status.HTTP_404_NOT_FOUND)
+
+        # Make sure a worker is draining the queue in this process
+        if job.state in [ProcessingJob.STATE_QUEUED, ProcessingJob.STATE_RUNNING]:
+            worker_pool.start()
+        return Response(job_status_data(job))
+
+class IncidentListView(generics.ListAPIView):
+    serializer_class = IncidentSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = Incident.objects.all()
+        min_members = self.request.query_params.get('min_members')
+        if min_members and min_members.isdigit():
+            queryset = queryset.filter(member_count__gte=int(min_members))
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        if request.user.user_type != 'cop':
+            return Response({'error': 'Only cops can view incidents'}, status=status.HTTP_403_FORBIDDEN)
+        return super().list(request, *args, **kwargs)
+
+class ComplaintStatsView(APIView):
+    """Dashboard counts by priority, status, threat level, language and day"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if request.user.user_type != 'cop':
+            return Response({'error': 'Only cops can view complaint statistics'}, status=status.HTTP_403_FORBIDDEN)
+        days = request.query_params.get('days')
+        if days is not None and not days.isdigit():
+            return Response({'error': 'days must be a non-negative integer'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(stats_snapshot(days=int(days) if days is not None else None))
+
+class LLMMetricsView(APIView):
+    """Latency and error counts of outbound LLM calls per model, answer cache and knowledge base hits and document retrieval, for this process (cops only)"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if request.user.user_type != 'cop':
+            return Response({'error': 'Only cops can view LLM metrics'}, status=status.HTTP_403_FORBIDDEN)
+        return Response({
+            **gateway.metrics(), 'response_cache': response_cache_stats(), 'retrieval': retrieval_stats(),
+            'knowledge_base': knowledge_base_stats(), 'upstreams': upstream_stats()
+        })
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def dependency_health(request):
+    """Circuit breaker state and latency percentiles of every external dependency"""
+    dependencies = breaker_states()
+    degraded = any(dependency['state'] != 'closed' for dependency in dependencies.values())
+    return Response({'status': 'degraded' if degraded else 'ok', 'dependencies': dependencies})
+
 class AudioTranscribeView(APIView):
     parser_classes = [MultiPartParser, FormParser]
+    throttle_classes = [TranscriptionThrottle]
 
+    @method_decorator(shed_when_busy)
     def post(self, request, *args, **kwargs):
         audio_file = request.FILES.get('audio')
         if not audio_file:
             return Response({'error': 'No audio file uploaded.'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Check if API key is configured
-        if not GROQ_API_KEY:
+        # Check that a transcription backend is configured
+        if not transcription_available():
             return Response({
-                'error': 'Groq API key is not configured. Please set GROQ_API_KEY in your .env file.'
+                'error': 'No transcription backend is configured. Please set GROQ_API_KEY in your .env file or install openai-whisper for local transcription.'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        # Async mode: save the raw complaint and let the ingestion workers process it
+        if async_ingestion_requested(request):
+            complaint = Complaint.objects.create(
+                user=request.user,
+                name="Anonymous",
+                location="Unknown",
+                complaint_type='audio',
+                content='',
+                audio_file=audio_file
+            )
+            job = enqueue_complaint(complaint)
+            return Response(job_status_data(job), status=status.HTTP_202_ACCEPTED)
         
-        # Use Groq for transcription
+        # Transcribe with the configured backend (Groq streams the upload, no temp copy)
         try:
-            client = Groq(api_key=GROQ_API_KEY)
-            # Save the uploaded file to a temporary location
-            import tempfile
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.webm') as tmp:
-                for chunk in audio_file.chunks():
-                    tmp.write(chunk)
-                tmp_path = tmp.name
-            with open(tmp_path, "rb") as file:
-                transcription = client.audio.transcriptions.create(
-                    file=(audio_file.name, file.read()),
-                    model="distil-whisper-large-v3-en",
-                    response_format="verbose_json",
-                )
-            transcript = transcription.text
+            transcript = transcribe(audio_file.name, audio_file)
+        except TranscriptionUnavailable as e:
+            # Groq is down: keep the audio and let the ingestion workers transcribe it once it is back
+            audio_file.seek(0)
+            complaint = Complaint.objects.create(
+                user=request.user,
+                name="Anonymous",
+                location="Unknown",
+                complaint_type='audio',
+                content='',
+                audio_file=audio_file
+            )
+            job = enqueue_complaint(complaint, delay_seconds=e.retry_after)
+            return Response(job_status_data(job), status=status.HTTP_202_ACCEPTED)
         except Exception as e:
-            return Response({'error': f'Groq API transcription failed: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return Response({'error': f'Audio transcription failed: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         # Detect language
         lang, confidence = langid.classify(transcript)
@@ -198,9 +444,10 @@ class AudioTranscribeView(APIView):
         # Translate to English if needed
         if lang != 'en':
             try:
-                translated_text = GoogleTranslator(source='auto', target='en').translate(transcript)
+                translated_text = translate_text(transcript, source='auto', target='en')
             except Exception as e:
-                return Response({'error': f'Translation failed: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                # Analyze the untranslated transcript rather than losing the complaint
+                print(f"Translation failed, keeping the transcript: {e}")
 
         # Check for duplicate complaints from the same user within last 24 hours
         existing_complaint, similarity_score = check_similar_complaints(
@@ -208,11 +455,7 @@ class AudioTranscribeView(APIView):
         )
         
         if existing_complaint:
-            return Response({
-                "error": f"A similar complaint has already been submitted (similarity: {similarity_score:.1%}). Please check your existing complaints or wait before submitting again.",
-                "duplicate_complaint_id": existing_complaint.id,
-                "similarity_score": similarity_score
-            }, status=status.HTTP_400_BAD_REQUEST)
+            return Response(duplicate_error_data(existing_complaint, similarity_score), status=status.HTTP_400_BAD_REQUEST)
 
         # 3. Enhanced analysis with threat detection
         analysis = analyze_complaint_severity(translated_text)
@@ -238,7 +481,9 @@ class AudioTranscribeView(APIView):
             emotion=emotion,
             priority=priority,
             threat_level=threat_level,
-            risk_factors=risk_factors
+            risk_factors=risk_factors,
+            requires_immediate_attention=analysis['requires_immediate_attention'],
+            rule_version=analysis['rule_version']
         )
 
         return Response({
@@ -269,6 +514,19 @@ class TextComplaintView(APIView):
             if not all([name, location, content]):
                 return Response({"error": "Name, location, and content are required"}, status=400)
 
+            # Async mode: save the raw complaint and let the ingestion workers process it
+            if async_ingestion_requested(request):
+                complaint = Complaint.objects.create(
+                    user=request.user,
+                    name=name,
+                    location=location,
+                    complaint_type='text',
+                    content='',
+                    original_content=content
+                )
+                job = enqueue_complaint(complaint)
+                return Response(job_status_data(job), status=status.HTTP_202_ACCEPTED)
+
             # Detect language and translate if needed
             lang = detect_language(content)
             translated = translate_to_english(content, lang)
@@ -279,11 +537,7 @@ class TextComplaintView(APIView):
             )
             
             if existing_complaint:
-                return Response({
-                    "error": f"A similar complaint has already been submitted (similarity: {similarity_score:.1%}). Please check your existing complaints or wait before submitting again.",
-                    "duplicate_complaint_id": existing_complaint.id,
-                    "similarity_score": similarity_score
-                }, status=status.HTTP_400_BAD_REQUEST)
+                return Response(duplicate_error_data(existing_complaint, similarity_score), status=status.HTTP_400_BAD_REQUEST)
 
             # Enhanced analysis with threat detection
             analysis = analyze_complaint_severity(translated)
@@ -308,7 +562,9 @@ class TextComplaintView(APIView):
                 emotion=emotion,
                 priority=priority,
                 threat_level=threat_level,
-                risk_factors=risk_factors
+                risk_factors=risk_factors,
+                requires_immediate_attention=analysis['requires_immediate_attention'],
+                rule_version=analysis['rule_version']
             )
 
             # Add original_content to response if not English
@@ -361,44 +617,53 @@ def DetectLanguageView(request):
 def echo_content(request):
     return Response({'received': request.data.get('content', '')})
 
+def _knowledge_base_response(request, question):
+    """{'answer': ...} (or its events with ?stream=1) from the bundled IPC/BNS sections, or None"""
+    local = knowledge_base_answer(question)
+    if local is None:
+        return None
+    if stream_requested(request.query_params):
+        response = sse_response(sse_text('answer', local.answer))
+    else:
+        response = Response({'answer': local.answer, 'sections': local.sections}, status=status.HTTP_200_OK)
+    response['X-Answer-Source'] = 'knowledge-base'
+    return response
+
 class ChatbotAPIView(APIView):
     parser_classes = (MultiPartParser, FormParser)
+    throttle_classes = [LLMThrottle]
 
+    @method_decorator(shed_when_busy)
     def post(self, request):
         user_message = request.data.get('message', '')
         document = request.FILES.get('document')
-        context = (
-            "You are a legal assistant for Nyayasathi. "
-            "Help users with legal questions, complaint submission, status tracking, and provide IPC-based solutions. "
-            "If a legal document is provided, summarize it and suggest solutions as per the Indian Penal Code (IPC). "
-            "If the user wants to submit a complaint or check status, guide them and ask for required details."
-        )
-
+        document_text = None
         if document:
             try:
-                text = document.read().decode('utf-8')
+                document_text = document.read().decode('utf-8')
             except Exception:
-                text = '[Could not read document. Please upload a plain text file.]'
-            user_message += f"\n\nHere is a legal document. Summarize it and suggest solutions as per IPC:\n{text}"
-
-        payload = {
-            "model": "llama-3-70b-8192",
-            "messages": [
-                {"role": "system", "content": context},
-                {"role": "user", "content": user_message}
-            ]
-        }
-        headers = {"Authorization": f"Bearer {GROQ_API_KEY}"}
-        groq_response = requests.post(GROQ_API_URL, json=payload, headers=headers)
+                document_text = '[Could not read document. Please upload a plain text file.]'
+
+        if document_text is None:
+            local = _knowledge_base_response(request, user_message)
+            if local is not None:
+                return local
+
+        messages = chatbot_messages(user_message, document_text)
+        if stream_requested(request.query_params):
+            return sse_response(sse_completion('answer', CHATBOT_MODEL, messages, fallback=CHATBOT_FALLBACK_ANSWER))
+
         try:
-            answer = groq_response.json()['choices'][0]['message']['content']
-        except Exception:
-            answer = "Sorry, I couldn't process your request. Please try again."
+            answer = complete(CHATBOT_MODEL, messages)
+        except LLMError:
+            answer = CHATBOT_FALLBACK_ANSWER
         return Response({"answer": answer})
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
 @parser_classes([MultiPartParser, FormParser])
+@throttle_classes([LLMThrottle])
+@shed_when_busy
 def summarize_legal_document(request):
     file = request.FILES.get('file')
     if not file:
@@ -410,82 +675,140 @@ def summarize_legal_document(request):
             'error': 'Groq API key is not configured. Please set GROQ_API_KEY in your .env file.'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    # Extract text based on file type
-    ext = os.path.splitext(file.name)[1].lower()
-    text = ''
     try:
-        if ext == '.pdf':
-            with pdfplumber.open(file) as pdf:
-                text = '\n'.join(page.extract_text() or '' for page in pdf.pages)
-        elif ext in ['.docx', '.doc']:
-            doc = docx.Document(file)
-            text = '\n'.join([para.text for para in doc.paragraphs])
-        elif ext in ['.txt']:
-            text = file.read().decode('utf-8')
-        else:
-            return Response({'error': 'Unsupported file type.'}, status=status.HTTP_400_BAD_REQUEST)
+        # Stored once per content hash; a file seen before is not extracted again
+        document, _ = store_document(file, request.user)
+    except UnsupportedDocument as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({'error': f'Failed to extract text: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    if not text.strip():
+    if not any(page.strip() for page in document.pages):
         return Response({'error': 'No text found in the document.'}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Use Groq API for Llama-3.1-8b-instant
-    client = Groq(api_key=GROQ_API_KEY)
-    prompt = f"Summarize the following legal document and extract key information such as parties involved, dates, case numbers, and main issues.\n\nDocument:\n{text}"
     try:
-        completion = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-            max_completion_tokens=512,
-            top_p=1,
-            stream=False,
-        )
-        summary = completion.choices[0].message.content
-        return Response({'summary': summary}, status=status.HTTP_200_OK)
+        # Large documents are summarized part by part first (see summarization.py)
+        messages = summary_prompt(document.pages, DEFAULT_MODEL)
+    except LLMUnavailable as e:
+        return unavailable_response(e)
+    except LLMError as e:
+        return Response({'error': f'LLM API request failed: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    if stream_requested(request.query_params):
+        response = sse_response(sse_completion('summary', DEFAULT_MODEL, messages, **DOCUMENT_OPTIONS))
+        response['X-Document-Id'] = document.sha256
+        return response
+
+    try:
+        summary = complete(DEFAULT_MODEL, messages, **DOCUMENT_OPTIONS)
+    except LLMUnavailable as e:
+        return unavailable_response(e)
+    except LLMError as e:
+        return Response({'error': f'LLM API request failed: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    response = Response({'summary': summary, 'document_id': document.sha256}, status=status.HTTP_200_OK)
+    response['X-Document-Id'] = document.sha256
+    return response
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+@parser_classes([MultiPartParser, FormParser])
+@throttle_classes([LLMThrottle])
+def upload_legal_document(request):
+    """Store a document and extract its text, for questions by document_id"""
+    file = request.FILES.get('file')
+    if not file:
+        return Response({'error': 'No file uploaded.'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        document, created = store_document(file, request.user)
+    except UnsupportedDocument as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
+        return Response({'error': f'Failed to extract text: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    return Response({
+        'document_id': document.sha256,
+        'name': document.name,
+        'pages': len(document.pages),
+        'characters': sum(len(page) for page in document.pages),
+    }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+def _cached_answer_response(request, scope, model, messages, question):
+    """
+    {'answer': ...} (or its events with ?stream=1) from the response cache
+    when possible, otherwise from the LLM, storing the new answer.
+    """
+    use_cache = cache_allowed(request.query_params, request.headers)
+    cached = lookup(model, messages, scope, question) if use_cache else None
+
+    def remember(answer):
+        if use_cache:
+            store(model, messages, scope, question, answer)
+
+    if stream_requested(request.query_params):
+        if cached is not None:
+            events = sse_text('answer', cached.answer)
+        else:
+            events = sse_completion('answer', model, messages, on_complete=remember, **DOCUMENT_OPTIONS)
+        return cache_headers(sse_response(events), cached, use_cache)
+
+    if cached is not None:
+        return cache_headers(Response({'answer': cached.answer}, status=status.HTTP_200_OK), cached)
+    try:
+        answer = complete(model, messages, **DOCUMENT_OPTIONS)
+    except LLMUnavailable as e:
+        # Groq is down: an earlier answer beats none, even when the client asked to bypass the cache
+        cached = lookup(model, messages, scope, question) if not use_cache else None
+        if cached is not None:
+            return cache_headers(Response({'answer': cached.answer}, status=status.HTTP_200_OK), cached)
+        return unavailable_response(e)
+    except LLMError as e:
         return Response({'error': f'LLM API request failed: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    remember(answer)
+    return cache_headers(Response({'answer': answer}, status=status.HTTP_200_OK), None, use_cache)
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
 @parser_classes([JSONParser])
+@throttle_classes([LLMThrottle])
+@shed_when_busy
 def ask_legal_document(request):
+    document_id = request.data.get('document_id', '')
     document_text = request.data.get('document_text', '')
     question = request.data.get('question', '')
+    pages, context = [document_text], document_text
+    if document_id:
+        document = find_document(str(document_id))
+        if document is None:
+            return Response({'error': 'Document not found. Please upload it again.'}, status=status.HTTP_404_NOT_FOUND)
+        document_text, pages, context = document.text, document.pages, document.sha256
     if not document_text or not question:
-        return Response({'error': 'Both document_text and question are required.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'error': 'Both document_text (or document_id) and question are required.'}, status=status.HTTP_400_BAD_REQUEST)
     
     # Check if API key is configured
     if not GROQ_API_KEY:
         return Response({
             'error': 'Groq API key is not configured. Please set GROQ_API_KEY in your .env file.'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    
-    client = Groq(api_key=GROQ_API_KEY)
-    prompt = f"Given the following legal document, answer the user's question as accurately as possible.\n\nDocument:\n{document_text}\n\nQuestion: {question}\n\nAnswer:"
-    try:
-        completion = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-            max_completion_tokens=512,
-            top_p=1,
-            stream=False,
-        )
-        answer = completion.choices[0].message.content
-        return Response({'answer': answer}, status=status.HTTP_200_OK)
-    except Exception as e:
-        return Response({'error': f'LLM API request failed: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    scope = scope_key('ask_legal_document', DEFAULT_MODEL, context)
+    # Long documents are narrowed down to the chunks relevant to the question (see retrieval.py)
+    messages = document_question_prompt(pages, question, document.sha256 if document_id else None)
+    return _cached_answer_response(request, scope, DEFAULT_MODEL, messages, question)
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
 @parser_classes([JSONParser])
+@throttle_classes([LLMThrottle])
+@shed_when_busy
 def legal_chatbot(request):
     question = request.data.get('question', '')
     model = request.data.get('model', 'llama-3.1-8b-instant')
     if not question:
         return Response({'error': 'Question is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Well-known section lookups need no LLM round trip (see knowledge_base.py)
+    local = _knowledge_base_response(request, question)
+    if local is not None:
+        return local
     
     # Check if API key is configured
     if not GROQ_API_KEY:
@@ -493,38 +816,8 @@ def legal_chatbot(request):
             'error': 'Groq API key is not configured. Please set GROQ_API_KEY in your .env file.'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
-    # Supported models for Groq
-    supported_models = [
-        'llama-3.1-8b-instant',
-        'llama-3-8b-8192',
-        'llama-3-70b-8192',
-        'llama-3.3-70b-versatile',
-        'gpt-3.5-turbo',
-        'deepseek-chat',
-    ]
-    # Map friendly names to Groq model IDs if needed
-    model_map = {
-        'llama': 'llama-3.1-8b-instant',
-        'chatgpt': 'gpt-3.5-turbo',
-        'deepseek': 'deepseek-chat',
-    }
-    model_id = model_map.get(model.lower(), model)
-    if model_id not in supported_models:
-        model_id = 'llama-3.1-8b-instant'
-    client = Groq(api_key=GROQ_API_KEY)
-    prompt = f"You are a helpful legal assistant. Answer the user's question as accurately as possible.\n\nQuestion: {question}\n\nAnswer:"
-    try:
-        completion = client.chat.completions.create(
-            model=model_id,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-            max_completion_tokens=512,
-            top_p=1,
-            stream=False,
-        )
-        answer = completion.choices[0].message.content
-        return Response({'answer': answer}, status=status.HTTP_200_OK)
-    except Exception as e:
-        return Response({'error': f'LLM API request failed: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    model_id = resolve_model(model)
+    scope = scope_key('legal_chatbot', model_id)
+    return _cached_answer_response(request, scope, model_id, legal_chat_messages(question), question)
 
 
@@ -14,3 +14,11 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'nyayasathi.settings')
 
 application = get_asgi_application()
+
+from complaints.live import EventStreamRouter  # noqa: E402
+from complaints.transcription import preload_transcription_backends  # noqa: E402
+
+# Live complaint events are streamed without going through Django's request handler
+application = EventStreamRouter(application)
+
+preload_transcription_backends()
@@ -130,6 +130,10 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads above this size are spooled to a temp file (removed at the end of the
+# request) instead of being held in memory
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.environ.get('FILE_UPLOAD_MAX_MEMORY_SIZE', str(2621440)))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -140,6 +144,8 @@ AUTH_USER_MODEL = 'complaints.CustomUser'
 
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True
+# Let browser clients read the LLM answer cache and stored document headers
+CORS_EXPOSE_HEADERS = ['X-Cache', 'X-Cache-Match', 'X-Cache-Similarity', 'Age', 'X-Document-Id', 'X-Answer-Source']
 
 # REST Framework settings
 REST_FRAMEWORK = {
@@ -150,4 +156,113 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # Token buckets of the LLM and transcription endpoints (complaints/throttling.py):
+    # '30/min' allows bursts of 30, refilled at 30 per minute
+    'DEFAULT_THROTTLE_RATES': {
+        'llm_user': os.environ.get('THROTTLE_LLM_USER_RATE', '30/min'),
+        'llm_ip': os.environ.get('THROTTLE_LLM_IP_RATE', '60/min'),
+        'transcription_user': os.environ.get('THROTTLE_TRANSCRIPTION_USER_RATE', '10/min'),
+        'transcription_ip': os.environ.get('THROTTLE_TRANSCRIPTION_IP_RATE', '20/min'),
+    },
 }
+
+# Seconds between checks for a newly activated severity ruleset
+SEVERITY_RULES_RELOAD_SECONDS = int(os.environ.get('SEVERITY_RULES_RELOAD_SECONDS', '30'))
+
+# Translation cache: in-process LRU in front of a database table
+TRANSLATION_CACHE_TTL_SECONDS = int(os.environ.get('TRANSLATION_CACHE_TTL_SECONDS', str(30 * 24 * 3600)))
+TRANSLATION_CACHE_MAX_ENTRIES = int(os.environ.get('TRANSLATION_CACHE_MAX_ENTRIES', '100000'))
+TRANSLATION_CACHE_MEMORY_SIZE = int(os.environ.get('TRANSLATION_CACHE_MEMORY_SIZE', '2048'))
+
+# Concurrent translation misses arriving within this window share one upstream call
+TRANSLATION_BATCH_WINDOW_SECONDS = float(os.environ.get('TRANSLATION_BATCH_WINDOW_SECONDS', '0.02'))
+TRANSLATION_BATCH_TIMEOUT_SECONDS = float(os.environ.get('TRANSLATION_BATCH_TIMEOUT_SECONDS', '30'))
+
+# Complaint ingestion: 'sync' processes in the request, 'async' queues a ProcessingJob
+# (clients can also choose per request with ?async=1)
+COMPLAINT_INGESTION_MODE = os.environ.get('COMPLAINT_INGESTION_MODE', 'sync')
+INGESTION_WORKERS = int(os.environ.get('INGESTION_WORKERS', '2'))
+INGESTION_JOB_LEASE_SECONDS = int(os.environ.get('INGESTION_JOB_LEASE_SECONDS', '300'))
+INGESTION_MAX_ATTEMPTS = int(os.environ.get('INGESTION_MAX_ATTEMPTS', '3'))
+INGESTION_POLL_SECONDS = float(os.environ.get('INGESTION_POLL_SECONDS', '5'))
+
+# Speech-to-text: 'groq' (API) or 'local' (openai-whisper, must be installed separately).
+# The other backend is used when the selected one is unavailable or fails.
+TRANSCRIPTION_BACKEND = os.environ.get('TRANSCRIPTION_BACKEND', 'groq')
+TRANSCRIPTION_FALLBACK = os.environ.get('TRANSCRIPTION_FALLBACK', 'True').lower() == 'true'
+TRANSCRIPTION_LOCAL_MODEL = os.environ.get('TRANSCRIPTION_LOCAL_MODEL', 'tiny')
+TRANSCRIPTION_LOCAL_WORKERS = int(os.environ.get('TRANSCRIPTION_LOCAL_WORKERS', '1'))
+TRANSCRIPTION_LOCAL_TIMEOUT_SECONDS = int(os.environ.get('TRANSCRIPTION_LOCAL_TIMEOUT_SECONDS', '300'))
+# Load the local model when the server starts instead of on the first request
+TRANSCRIPTION_PRELOAD = os.environ.get('TRANSCRIPTION_PRELOAD', 'False').lower() == 'true'
+
+# How long a cop holds a claimed triage complaint before it returns to the queue
+TRIAGE_LEASE_SECONDS = int(os.environ.get('TRIAGE_LEASE_SECONDS', '900'))
+
+# Live complaint events (/api/complaints/events/)
+LIVE_EVENTS_HEARTBEAT_SECONDS = int(os.environ.get('LIVE_EVENTS_HEARTBEAT_SECONDS', '15'))
+LIVE_EVENTS_QUEUE_SIZE = int(os.environ.get('LIVE_EVENTS_QUEUE_SIZE', '100'))
+LIVE_EVENTS_REPLAY_SIZE = int(os.environ.get('LIVE_EVENTS_REPLAY_SIZE', '500'))
+
+# Groq chat completions endpoint (point at a stub server for load tests)
+GROQ_API_URL = os.environ.get('GROQ_API_URL', 'https://api.groq.com/openai/v1/chat/completions')
+GROQ_TRANSCRIPTION_URL = os.environ.get('GROQ_TRANSCRIPTION_URL', 'https://api.groq.com/openai/v1/audio/transcriptions')
+# Outbound LLM HTTP client
+LLM_TIMEOUT_SECONDS = int(os.environ.get('LLM_TIMEOUT_SECONDS', '60'))
+LLM_MAX_CONNECTIONS = int(os.environ.get('LLM_MAX_CONNECTIONS', '100'))
+LLM_CONNECT_TIMEOUT_SECONDS = int(os.environ.get('LLM_CONNECT_TIMEOUT_SECONDS', '5'))
+# Retries of connection errors, timeouts, 429 and 5xx, with jittered exponential backoff
+LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', '2'))
+LLM_RETRY_BACKOFF_SECONDS = float(os.environ.get('LLM_RETRY_BACKOFF_SECONDS', '0.5'))
+LLM_RETRY_MAX_BACKOFF_SECONDS = int(os.environ.get('LLM_RETRY_MAX_BACKOFF_SECONDS', '8'))
+# Recent calls per model used for the latency percentiles at /api/llm/metrics/
+LLM_METRICS_WINDOW = int(os.environ.get('LLM_METRICS_WINDOW', '500'))
+
+# Cache of legal chatbot / document question answers
+LLM_CACHE_TTL_SECONDS = int(os.environ.get('LLM_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', '20000'))
+LLM_CACHE_MEMORY_SIZE = int(os.environ.get('LLM_CACHE_MEMORY_SIZE', '1024'))
+# Estimated Jaccard similarity at which a rephrased question reuses a cached answer
+LLM_CACHE_SIMILARITY_THRESHOLD = float(os.environ.get('LLM_CACHE_SIMILARITY_THRESHOLD', '0.75'))
+
+# Large documents are summarized in chunks of this many (estimated) tokens, this many chunks at a time
+LLM_SUMMARY_CHUNK_TOKENS = int(os.environ.get('LLM_SUMMARY_CHUNK_TOKENS', '3000'))
+LLM_SUMMARY_WORKERS = int(os.environ.get('LLM_SUMMARY_WORKERS', '4'))
+
+# Uploaded legal documents: PDFs of at least DOCUMENT_PARALLEL_MIN_PAGES pages are extracted
+# by a pool of DOCUMENT_EXTRACTION_WORKERS processes
+DOCUMENT_EXTRACTION_WORKERS = int(os.environ.get('DOCUMENT_EXTRACTION_WORKERS', '4'))
+DOCUMENT_PARALLEL_MIN_PAGES = int(os.environ.get('DOCUMENT_PARALLEL_MIN_PAGES', '16'))
+DOCUMENT_EXTRACTION_TIMEOUT_SECONDS = int(os.environ.get('DOCUMENT_EXTRACTION_TIMEOUT_SECONDS', '300'))
+# Larger legal document uploads are rejected before they are hashed or extracted
+DOCUMENT_MAX_UPLOAD_BYTES = int(os.environ.get('DOCUMENT_MAX_UPLOAD_BYTES', str(20 * 1024 * 1024)))
+# purge_legal_documents deletes documents unused for this many days
+LEGAL_DOCUMENT_RETENTION_DAYS = int(os.environ.get('LEGAL_DOCUMENT_RETENTION_DAYS', '30'))
+
+# Questions about documents longer than RETRIEVAL_FULL_DOCUMENT_TOKENS send only the RETRIEVAL_TOP_K
+# chunks (of RETRIEVAL_CHUNK_TOKENS each) most similar to the question
+RETRIEVAL_CHUNK_TOKENS = int(os.environ.get('RETRIEVAL_CHUNK_TOKENS', '300'))
+RETRIEVAL_TOP_K = int(os.environ.get('RETRIEVAL_TOP_K', '6'))
+RETRIEVAL_FULL_DOCUMENT_TOKENS = int(os.environ.get('RETRIEVAL_FULL_DOCUMENT_TOKENS', '3000'))
+RETRIEVAL_INDEX_CACHE_SIZE = int(os.environ.get('RETRIEVAL_INDEX_CACHE_SIZE', '32'))
+
+# Bundled IPC/BNS sections answer well-known lookups in the chatbots without an LLM call
+KNOWLEDGE_BASE_ENABLED = os.environ.get('KNOWLEDGE_BASE_ENABLED', 'True').lower() == 'true'
+KNOWLEDGE_BASE_MAX_UNMATCHED_WORDS = int(os.environ.get('KNOWLEDGE_BASE_MAX_UNMATCHED_WORDS', '1'))
+
+# 'memory' keeps throttle buckets per process, 'database' shares them between workers
+THROTTLE_STORE = os.environ.get('THROTTLE_STORE', 'memory')
+# Requests each process lets through to an upstream at once; more get 429 with Retry-After
+UPSTREAM_CONCURRENCY = {
+    'groq': int(os.environ.get('UPSTREAM_GROQ_CONCURRENCY', '32')),
+    'transcription': int(os.environ.get('UPSTREAM_TRANSCRIPTION_CONCURRENCY', '8')),
+}
+
+# Circuit breakers: a dependency failing this many calls in a row is skipped for CIRCUIT_BREAKER_RESET_SECONDS;
+# calls slower than its *_SLOW_CALL_SECONDS count as failures
+CIRCUIT_BREAKER_FAILURES = int(os.environ.get('CIRCUIT_BREAKER_FAILURES', '5'))
+CIRCUIT_BREAKER_RESET_SECONDS = int(os.environ.get('CIRCUIT_BREAKER_RESET_SECONDS', '30'))
+LLM_SLOW_CALL_SECONDS = int(os.environ.get('LLM_SLOW_CALL_SECONDS', '20'))
+TRANSLATION_SLOW_CALL_SECONDS = int(os.environ.get('TRANSLATION_SLOW_CALL_SECONDS', '5'))
+# Google Translate calls still running after this are abandoned and count as failures
+TRANSLATION_CALL_TIMEOUT_SECONDS = int(os.environ.get('TRANSLATION_CALL_TIMEOUT_SECONDS', '10'))
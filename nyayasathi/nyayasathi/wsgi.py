@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'nyayasathi.settings')
 
 application = get_wsgi_application()
+
+from complaints.transcription import preload_transcription_backends  # noqa: E402
+
+preload_transcription_backends()